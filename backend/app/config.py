@@ -39,6 +39,32 @@ class Settings:
     CRAWLER_MAX_SLEEP_SEC: float = _float(os.getenv("CRAWLER_MAX_SLEEP_SEC"), 3.0)
     MAX_REQUESTS_PER_IP: int = _int(os.getenv("MAX_REQUESTS_PER_IP"), 50)
     MAX_CONCURRENCY_NUM: int = _int(os.getenv("MAX_CONCURRENCY_NUM"), 1)
+    # 同一任务内同时爬取的平台数上限（各平台在独立线程/浏览器中运行）
+    MAX_PLATFORM_CONCURRENCY: int = _int(os.getenv("MAX_PLATFORM_CONCURRENCY"), 2)
+    # 多关键词（逗号分隔）时同一平台内同时爬取的关键词数，共用一个浏览器会话与请求限速
+    CRAWLER_KEYWORD_CONCURRENCY: int = _int(os.getenv("CRAWLER_KEYWORD_CONCURRENCY"), 3)
+    # 全局调度：每个平台同时运行的爬虫数（每个占一个浏览器），其余任务排队
+    SCHEDULER_SLOTS_PER_PLATFORM: int = _int(os.getenv("SCHEDULER_SLOTS_PER_PLATFORM"), 1)
+    # 排队（尚未开始）任务数上限，超出时 /api/search/start 返回 429
+    SCHEDULER_MAX_QUEUED_TASKS: int = _int(os.getenv("SCHEDULER_MAX_QUEUED_TASKS"), 20)
+    # 单平台爬取截止时间（秒，从拿到调度槽位起算），超时关闭浏览器，已抓到的结果保留
+    CRAWLER_PLATFORM_TIMEOUT_SEC: int = _int(os.getenv("CRAWLER_PLATFORM_TIMEOUT_SEC"), 600)
+    # dy/xhs 爬取的运行方式：thread=API 进程内的线程；process=每次平台爬取在独立子进程中运行（多核、浏览器崩溃不影响 API）；
+    # queue=按关键词拆成作业写入共享作业队列，由独立 worker（python -m app.worker）领取执行
+    CRAWLER_WORKER_MODE: str = os.getenv("CRAWLER_WORKER_MODE", "thread").strip().lower() or "thread"
+    # 作业队列后端（目前仅 sqlite）与队列文件路径（留空为 backend/data/jobs.db；须在 API 所在主机的本地磁盘上）
+    JOB_QUEUE_BACKEND: str = os.getenv("JOB_QUEUE_BACKEND", "sqlite").strip().lower() or "sqlite"
+    JOB_QUEUE_PATH: str = os.getenv("JOB_QUEUE_PATH", "").strip()
+    # worker 租约（秒）：worker 定期续租，失联超过租约的作业会被其他 worker 重新领取
+    JOB_LEASE_SEC: int = _int(os.getenv("JOB_LEASE_SEC"), 60)
+    # 单个作业最多被领取的次数（含 worker 失联后的重试）
+    JOB_MAX_ATTEMPTS: int = _int(os.getenv("JOB_MAX_ATTEMPTS"), 2)
+    # worker 经 API 进程的作业代理访问队列时的 API 地址（如 http://10.0.0.5:8000）；留空则直接打开本机队列文件
+    JOB_BROKER_URL: str = os.getenv("JOB_BROKER_URL", "").strip()
+    # 作业代理令牌：非空时 /api/jobs/* 需携带 Authorization: Bearer <令牌>，API 与 worker 配置相同的值；为空时只接受本机请求
+    JOB_BROKER_TOKEN: str = os.getenv("JOB_BROKER_TOKEN", "").strip()
+    # 爬虫线程按页推送结果时最多在途（未写入任务）的页数，超出时爬虫等待（背压）
+    RESULT_SINK_MAX_PENDING: int = _int(os.getenv("RESULT_SINK_MAX_PENDING"), 4)
     PROXY_BUFFER_SECONDS: int = _int(os.getenv("PROXY_BUFFER_SECONDS"), 30)
 
     # Crawler limits
@@ -53,8 +79,53 @@ class Settings:
     KDL_USER_NAME: str = os.getenv("KDL_USER_NAME", "") or os.getenv("kdl_user_name", "")
     KDL_USER_PWD: str = os.getenv("KDL_USER_PWD", "") or os.getenv("kdl_user_pwd", "")
 
+    # Task storage: memory | sqlite（sqlite 时任务与结果写入 WAL 数据库，重启后仍可查询）
+    TASK_STORE_BACKEND: str = os.getenv("TASK_STORE_BACKEND", "sqlite").strip().lower() or "sqlite"
+    # SQLite 文件路径（空则用 backend/data/tasks.db）
+    TASK_STORE_PATH: str = os.getenv("TASK_STORE_PATH", "").strip()
+    # 任务保留策略：内存中最多保留的已结束任务数（LRU；运行中任务始终常驻）。
+    # 仅 sqlite 时生效：超出部分只移出内存、按需从库加载；memory 时不按数量淘汰（只受 TTL 与内存预算限制）
+    TASK_HOT_CACHE_SIZE: int = _int(os.getenv("TASK_HOT_CACHE_SIZE"), 16)
+    # 已结束任务最长保留时间（秒），超时从内存与库中删除；0 表示不限
+    TASK_MAX_AGE_SEC: int = _int(os.getenv("TASK_MAX_AGE_SEC"), 7 * 24 * 3600)
+    # 常驻任务的近似内存预算（MB，按帖子/评论 JSON 字节估算），超出时按 LRU 淘汰已结束任务；0 表示不限
+    TASK_MEMORY_BUDGET_MB: int = _int(os.getenv("TASK_MEMORY_BUDGET_MB"), 256)
+
+    # 原始平台数据（raw_aweme / raw_note）压缩后单独存放，按需通过 /api/search/raw 读取
+    # 压缩算法 zstd | zlib（zstd 需安装 zstandard，未安装自动回退 zlib）
+    RAW_STORE_COMPRESSION: str = os.getenv("RAW_STORE_COMPRESSION", "zstd").strip().lower() or "zstd"
+    # 内存中保留的压缩数据上限（MB），超出时最旧的写入 RAW_STORE_DIR（留空为 backend/data/raw_payloads）
+    RAW_STORE_MEMORY_MB: int = _int(os.getenv("RAW_STORE_MEMORY_MB"), 64)
+    RAW_STORE_DIR: str = os.getenv("RAW_STORE_DIR", "").strip()
+
+    # 状态/结果接口长轮询（?wait=秒）最长等待时间，超过按此值截断
+    SEARCH_LONG_POLL_MAX_SEC: float = _float(os.getenv("SEARCH_LONG_POLL_MAX_SEC"), 30.0)
+
     # Playwright 浏览器数据目录（空则用 backend/browser_data，可设为项目外路径如 ~/.getsomehints/browser_data）
     BROWSER_DATA_DIR: str = os.getenv("BROWSER_DATA_DIR", "").strip()
+    # dy/xhs 浏览器池：每个账号一个常驻、已登录的浏览器上下文供各次搜索复用（启用代理时不生效）；空闲超过 BROWSER_POOL_IDLE_SEC 秒关闭
+    BROWSER_POOL_ENABLED: bool = _bool(os.getenv("BROWSER_POOL_ENABLED", "true"))
+    BROWSER_POOL_IDLE_SEC: int = _int(os.getenv("BROWSER_POOL_IDLE_SEC"), 300)
+    # 浏览器池上下文回收：浏览器进程树 RSS 超过 BROWSER_MAX_RSS_MB，或被借用满 BROWSER_RECYCLE_AFTER_USES 次后重建（0 表示不限）
+    BROWSER_MAX_RSS_MB: int = _int(os.getenv("BROWSER_MAX_RSS_MB"), 1536)
+    BROWSER_RECYCLE_AFTER_USES: int = _int(os.getenv("BROWSER_RECYCLE_AFTER_USES"), 100)
+    # 结束遗留的 Chromium 进程（所属 Playwright/Python 进程已退出，如超时被 kill 的爬虫子进程）
+    BROWSER_REAP_ORPHANS: bool = _bool(os.getenv("BROWSER_REAP_ORPHANS", "true"))
+    # dy/xhs 登录态验证缓存（秒）：验证成功后该时间内（且会话 cookie 未过期、未遇风控）启动爬取不再 pong；0 表示每次都验证
+    SESSION_CHECK_TTL_SEC: int = _int(os.getenv("SESSION_CHECK_TTL_SEC"), 600)
+    # dy/xhs 爬虫页面拦截的资源类型（Playwright resource_type，逗号分隔），同时拦截内置埋点域名；空表示不拦截
+    CRAWLER_BLOCK_RESOURCE_TYPES: str = os.getenv("CRAWLER_BLOCK_RESOURCE_TYPES", "image,media,font").strip()
+    # 额外拦截的 URL 关键词（逗号分隔，子串匹配）
+    CRAWLER_BLOCK_URL_KEYWORDS: str = os.getenv("CRAWLER_BLOCK_URL_KEYWORDS", "").strip()
+    # 极简签名页：另外拦截样式表，打开首页只等到 DOMContentLoaded
+    CRAWLER_MINIMAL_PAGE: bool = _bool(os.getenv("CRAWLER_MINIMAL_PAGE", "false"))
+    # dy/xhs 账号池：逗号分隔的账号名，每个账号独立浏览器数据目录（<平台>_user_data_dir_<账号名>），default 为原有目录；空则只用默认账号
+    DY_ACCOUNTS: str = os.getenv("DY_ACCOUNTS", "").strip()
+    XHS_ACCOUNTS: str = os.getenv("XHS_ACCOUNTS", "").strip()
+    # 单个账号每分钟请求上限（同账号的并发爬取合计），0 表示不限（仍受 CRAWLER_MAX_SLEEP_SEC 间隔约束）
+    ACCOUNT_REQUESTS_PER_MIN: int = _int(os.getenv("ACCOUNT_REQUESTS_PER_MIN"), 0)
+    # 账号遇验证码/封禁/登录失效后的冷却秒数，冷却期内优先分配其他账号
+    ACCOUNT_COOLDOWN_SEC: int = _int(os.getenv("ACCOUNT_COOLDOWN_SEC"), 600)
 
     # DeepSeek LLM（大模型分析潜在卖/买家，与 Nexus 配置命名一致）
     DEEPSEEK_API_KEY: str = os.getenv("DEEPSEEK_API_KEY", "").strip()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""Per-platform pool of logged-in account profiles: least-recently-used leasing, health scores and per-account rate budgets."""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from app.config import settings
+from app.crawler.anti_block import SharedRateLimiter
+from app.crawler.session_health import session_health
+
+logger = logging.getLogger(__name__)
+
+# 健康分：被风控一次扣减、正常完成一次爬取恢复，范围 [0, 1]
+_BLOCK_PENALTY = 0.5
+_SUCCESS_RECOVERY = 0.25
+# 健康分低于该值（近期被风控过）的账号排在其他可用账号之后
+_MIN_HEALTH = 0.5
+
+
+@dataclass
+class Account:
+    """一个平台账号：独立的浏览器数据目录（name 为空即原有的默认目录）、可选 Cookie、健康分与请求预算。"""
+
+    platform: str
+    name: str
+    cookies: str = ""
+    health: float = 1.0
+    in_use: int = 0
+    last_used: float = 0.0
+    cooldown_until: float = 0.0
+    last_block_at: float = 0.0
+    limiter: SharedRateLimiter = field(default_factory=lambda: SharedRateLimiter(0.0))
+
+    @property
+    def label(self) -> str:
+        return self.name or "default"
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+
+def _account_names(platform: str) -> List[str]:
+    raw = {"dy": settings.DY_ACCOUNTS, "xhs": settings.XHS_ACCOUNTS}.get(platform, "")
+    names = [n.strip() for n in raw.split(",") if n.strip()]
+    # default 指原有的单账号目录（%s_user_data_dir），已登录的状态可继续使用
+    return [("" if n == "default" else n) for n in dict.fromkeys(names)] or [""]
+
+
+def _account_cookies(name: str) -> str:
+    # 非默认账号的 Cookie 登录串：MC_COOKIES_<账号名大写>；默认账号沿用 MC_COOKIES（由 RunConfig 读取）
+    if not name:
+        return ""
+    return os.environ.get("MC_COOKIES_%s" % name.upper(), "").strip()
+
+
+class AccountPool:
+    """
+    每个平台 N 个账号（DY_ACCOUNTS / XHS_ACCOUNTS 逗号分隔），每次爬取启动时 acquire 一个：
+    在不在冷却期的账号中依次按 健康分是否达标、借用数、最久未用（LRU）选取，全部冷却时取最早解除冷却的。
+    exclusive=True（未启用浏览器池，每次爬取自行打开账号的持久化目录）时跳过正在使用的账号：
+    同一目录同一时间只能被一个浏览器打开；账号全部在用时仍借出借用数最少的并告警，此时 SCHEDULER_SLOTS_PER_PLATFORM 应不超过账号数。
+    请求遇到验证码 / 封禁 / 登录失效时 report_block：扣健康分、进入冷却期 ACCOUNT_COOLDOWN_SEC，并使登录态缓存失效。
+    每个账号一个跨爬取共用的限速器（ACCOUNT_REQUESTS_PER_MIN），同账号并发爬取合计不超过该速率。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._accounts: Dict[str, List[Account]] = {}
+
+    def _ensure(self, platform: str) -> List[Account]:
+        accounts = self._accounts.get(platform)
+        if accounts is None:
+            rpm = settings.ACCOUNT_REQUESTS_PER_MIN
+            interval = 60.0 / rpm if rpm > 0 else 0.0
+            accounts = self._accounts[platform] = [
+                Account(platform, name, _account_cookies(name), limiter=SharedRateLimiter(interval))
+                for name in _account_names(platform)
+            ]
+        return accounts
+
+    def acquire(self, platform: str, exclusive: bool = False) -> Account:
+        with self._lock:
+            accounts = self._ensure(platform)
+            now = time.time()
+            healthy = [a for a in accounts if a.healthy(now)]
+            if exclusive:
+                idle = [a for a in healthy if a.in_use == 0] or [a for a in accounts if a.in_use == 0]
+                if idle:
+                    healthy = idle
+                else:
+                    logger.warning("[AccountPool] all %s accounts in use, sharing a browser profile", platform)
+            if healthy:
+                account = min(healthy, key=lambda a: (a.health < _MIN_HEALTH, a.in_use, a.last_used))
+            else:
+                account = min(accounts, key=lambda a: a.cooldown_until)
+                logger.warning(
+                    "[AccountPool] all %s accounts cooling down, using %s (%.0fs left)",
+                    platform, account.label, account.cooldown_until - now,
+                )
+            account.in_use += 1
+            account.last_used = now
+        if len(accounts) > 1:
+            logger.info("[AccountPool] %s crawl uses account %s", platform, account.label)
+        return account
+
+    def release(self, account: Account, acquired_at: float) -> None:
+        """爬取结束时交还；借用期间未被风控则恢复部分健康分。"""
+        with self._lock:
+            account.in_use = max(0, account.in_use - 1)
+            account.last_used = time.time()
+            if account.last_block_at < acquired_at:
+                account.health = min(1.0, account.health + _SUCCESS_RECOVERY)
+
+    def report_block(self, platform: str, account: str, reason: str = "") -> None:
+        """客户端请求出现风控 / 登录失效信号时调用（account 为账号名，默认账号为空串）。"""
+        session_health.invalidate(platform, reason, account)
+        with self._lock:
+            target = next((a for a in self._ensure(platform) if a.name == account), None)
+            if target is None:
+                return
+            now = time.time()
+            first = target.cooldown_until <= now
+            target.health = max(0.0, target.health - (_BLOCK_PENALTY if first else 0.0))
+            target.last_block_at = now
+            target.cooldown_until = now + max(0, settings.ACCOUNT_COOLDOWN_SEC)
+        if first:
+            logger.warning("[AccountPool] %s account %s blocked (%s), cooling down", platform, target.label, reason)
+
+    def get_stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {
+                platform: [
+                    {
+                        "account": a.label,
+                        "health": round(a.health, 2),
+                        "in_use": a.in_use,
+                        "cooldown_sec": max(0, round(a.cooldown_until - now)),
+                    }
+                    for a in accounts
+                ]
+                for platform, accounts in self._accounts.items()
+            }
+
+
+account_pool = AccountPool()
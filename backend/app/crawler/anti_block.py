@@ -2,7 +2,9 @@
 """Anti-block: random delay, UA pool, and helpers for crawlers."""
 import asyncio
 import random
-from typing import List
+import threading
+import time
+from typing import List, Optional
 
 from app.config import settings
 
@@ -31,6 +33,44 @@ async def random_sleep() -> None:
     await asyncio.sleep(delay)
 
 
+class RateLimiter:
+    """
+    同一次爬取内多个并发协程（如多关键词）共用：相邻两次请求至少间隔 interval 秒。
+    按调用顺序预约发车时刻，无需加锁（仅在单个事件循环内使用）。
+    传入 parent（如账号级 SharedRateLimiter）时，每次还须再通过 parent 的间隔。
+    """
+
+    def __init__(self, interval: float, parent: Optional["RateLimiter"] = None) -> None:
+        self.interval = max(0.0, interval)
+        self.parent = parent
+        self._next_at = 0.0
+
+    async def wait(self) -> None:
+        now = asyncio.get_running_loop().time()
+        at = max(now, self._next_at)
+        self._next_at = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
+        if self.parent is not None:
+            await self.parent.wait()
+
+
+class SharedRateLimiter(RateLimiter):
+    """跨爬取共用的限速器（如同一账号的所有请求）：可能在不同线程/事件循环中调用，预约时加锁。"""
+
+    def __init__(self, interval: float) -> None:
+        super().__init__(interval)
+        self._lock = threading.Lock()
+
+    async def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next_at)
+            self._next_at = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
 def should_switch_ip_on_response(status_code: int) -> bool:
     """Return True if we should switch proxy after this response (403, 502, 503, etc.)."""
     return status_code in (403, 429, 502, 503)
@@ -1,13 +1,29 @@
 # -*- coding: utf-8 -*-
 """Base crawler interface and proxy/anti-block helpers."""
+import logging
 from abc import ABC, abstractmethod
-from typing import List, Optional, TYPE_CHECKING
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
 from app.schemas import UnifiedPost, UnifiedComment
 
 if TYPE_CHECKING:
     from app.proxy.proxy_ip_pool import ProxyIpPool
 
+logger = logging.getLogger(__name__)
+
+
+def raw_store_put(platform: str, post_id: str, payload: Dict[str, Any]) -> bool:
+    """原始数据（raw_aweme / raw_note）压缩后存入 raw_store，不再内联进 platform_data；返回是否存入。"""
+    if not post_id or not payload:
+        return False
+    try:
+        from app.services.raw_store import raw_store
+        raw_store.put(platform, post_id, payload)
+        return True
+    except Exception as e:
+        logger.warning("[RawStore] put %s/%s failed: %s", platform, post_id, e)
+        return False
+
 
 class BaseCrawler(ABC):
     """Abstract crawler: search and get_comments. Optional proxy pool and anti-block."""
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""Warm per-profile Playwright browser contexts, owned by a dedicated event-loop thread and leased to crawls."""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional, Tuple
+
+from app.config import settings
+from app.crawler import browser_watchdog
+
+logger = logging.getLogger(__name__)
+
+# 打开一个已就绪（已注入脚本、已打开首页）的上下文：opener(playwright) -> (context, page)
+Opener = Callable[[Any], Awaitable[Tuple[Any, Any]]]
+
+# 空闲回收检查间隔（秒）
+_REAP_INTERVAL_SEC = 30.0
+# 健康检查（页面 evaluate）超时（秒）
+_HEALTH_TIMEOUT_SEC = 5.0
+
+
+@dataclass
+class _Entry:
+    key: str
+    context: Any
+    page: Any
+    # 持久化登录目录（用于统计该浏览器进程树的内存、清理残留进程），非持久化上下文为 None
+    profile_dir: Optional[str] = None
+    leases: int = 0
+    uses: int = 0
+    rss: int = 0
+    # 内存超限 / 超时丢弃：不再借出，当前借用全部交还后由最后一个交还者关闭
+    retire: bool = False
+    last_used: float = field(default_factory=time.monotonic)
+    closed: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+@dataclass
+class BrowserLease:
+    """一次爬取借用的浏览器上下文与首页 page；爬取结束后交还 release。"""
+
+    key: str
+    context: Any
+    page: Any
+    _entry: _Entry
+
+
+class BrowserPool:
+    """
+    每个浏览器数据目录（平台 × 账号）一个常驻上下文（持久化登录目录同一时间只能被一个上下文打开），由独立线程上的事件循环持有。
+    dy/xhs 适配器把整次爬取协程提交到该循环运行（run_sync），爬虫 start 时 acquire 借用上下文，close 时 release；
+    同账号并发的爬取共用同一上下文。借出前做健康检查，失效则重建；无人借用超过 BROWSER_POOL_IDLE_SEC 关闭。
+    长期运行的 Chromium 会涨内存：进程树 RSS 超过 BROWSER_MAX_RSS_MB 或借用满 BROWSER_RECYCLE_AFTER_USES 次后重建；
+    关闭上下文后结束残留的浏览器进程，巡检时顺带清理孤儿进程（见 browser_watchdog）。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._playwright = None
+        self._entries: Dict[str, _Entry] = {}
+        self._opening: Dict[str, asyncio.Lock] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self._disabled = False
+        self._stats = {"launched": 0, "reused": 0, "discarded": 0, "idle_closed": 0, "recycled": 0, "orphans_reaped": 0}
+
+    @property
+    def enabled(self) -> bool:
+        # 代理按次轮换、启动参数随代理变化，启用代理时每次爬取仍单独启动浏览器
+        return settings.BROWSER_POOL_ENABLED and not settings.ENABLE_IP_PROXY and not self._disabled
+
+    def disable(self) -> None:
+        """短生命周期进程（如 process 模式的子进程）内关闭池化，爬取照旧自行启动浏览器。"""
+        self._disabled = True
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def run() -> None:
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name="browser-pool", daemon=True)
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+            return self._loop
+
+    def run_sync(self, coro: Coroutine) -> Any:
+        """在调用线程中阻塞：把爬取协程交给池的事件循环运行并返回其结果（异常原样抛出）。"""
+        loop = self._ensure_loop()
+        fut: Future = asyncio.run_coroutine_threadsafe(coro, loop)
+        return fut.result()
+
+    async def acquire(self, key: str, opener: Opener, profile_dir: Optional[str] = None) -> BrowserLease:
+        """在池的事件循环中调用：借出 key（浏览器数据目录名）对应的上下文，没有、已失效或到期回收时用 opener 新建。"""
+        while True:
+            async with self._key_lock(key):
+                entry = self._entries.get(key)
+                if entry is not None and entry.retire and entry.leases > 0:
+                    if entry.profile_dir:
+                        # 持久化登录目录同一时间只能被一个浏览器打开：等仍在使用旧上下文的爬取交还、关闭后再新建
+                        retiring = entry
+                    else:
+                        del self._entries[key]
+                        entry = retiring = None
+                else:
+                    retiring = None
+                if retiring is None:
+                    return await self._lease(key, entry, opener, profile_dir)
+            await retiring.closed.wait()
+
+    async def _lease(self, key: str, entry: Optional[_Entry], opener: Opener, profile_dir: Optional[str]) -> BrowserLease:
+        # 调用方已持有 key 锁
+        if entry is not None and entry.leases == 0 and self._due_for_recycle(entry):
+            logger.info("[BrowserPool] recycling %s context (uses=%d rss=%dMB)", key, entry.uses, entry.rss >> 20)
+            self._stats["recycled"] += 1
+            await self._close_entry(entry, locked=True)
+            entry = None
+        if entry is not None and not await self._healthy(entry):
+            logger.info("[BrowserPool] %s context unhealthy, relaunching", key)
+            await self._close_entry(entry, locked=True)
+            entry = None
+        if entry is None:
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+            context, page = await opener(self._playwright)
+            entry = self._entries[key] = _Entry(key, context, page, profile_dir)
+            self._stats["launched"] += 1
+        else:
+            self._stats["reused"] += 1
+        entry.leases += 1
+        entry.uses += 1
+        entry.last_used = time.monotonic()
+        if self._reaper is None:
+            self._reaper = asyncio.ensure_future(self._reap_loop())
+        return BrowserLease(key, entry.context, entry.page, entry)
+
+    async def release(self, lease: BrowserLease, discard: bool = False) -> None:
+        """
+        交还上下文。discard=True（如超时后请求可能卡住）时该上下文不再借出、下次借用重建；
+        仍有其他爬取在用时不关闭，由最后一个交还者关闭。
+        """
+        entry = lease._entry
+        entry.leases = max(0, entry.leases - 1)
+        entry.last_used = time.monotonic()
+        if discard and not entry.retire:
+            entry.retire = True
+            self._stats["discarded"] += 1
+            if entry.leases > 0 and not entry.profile_dir and self._entries.get(entry.key) is entry:
+                # 非持久化上下文可与旧上下文并存：新的借用直接新建
+                del self._entries[entry.key]
+        if entry.retire and entry.leases == 0:
+            await self._close_entry(entry)
+
+    def _key_lock(self, key: str) -> asyncio.Lock:
+        # 同一 key 的新建与关闭串行：避免清理残留进程时误杀刚为同一目录新启动的浏览器
+        return self._opening.setdefault(key, asyncio.Lock())
+
+    @staticmethod
+    def _due_for_recycle(entry: _Entry) -> bool:
+        max_uses = settings.BROWSER_RECYCLE_AFTER_USES
+        return entry.retire or (max_uses > 0 and entry.uses >= max_uses)
+
+    async def _healthy(self, entry: _Entry) -> bool:
+        if entry.leases > 0:
+            # 正在被其他爬取使用，视为可用
+            return True
+        try:
+            if entry.page.is_closed():
+                return False
+            await asyncio.wait_for(entry.page.evaluate("() => 1"), _HEALTH_TIMEOUT_SEC)
+            return True
+        except Exception as e:
+            logger.debug("[BrowserPool] health check failed: %s", e)
+            return False
+
+    async def _close_entry(self, entry: _Entry, locked: bool = False) -> None:
+        if not locked:
+            async with self._key_lock(entry.key):
+                return await self._close_entry(entry, locked=True)
+        if entry.closed.is_set():
+            return
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+        try:
+            await entry.context.close()
+        except Exception as e:
+            logger.debug("[BrowserPool] close ignored: %s", e)
+        try:
+            if entry.profile_dir and browser_watchdog.available():
+                # 关闭失败或浏览器卡死时残留的进程
+                await asyncio.to_thread(browser_watchdog.kill_browser, entry.profile_dir)
+        finally:
+            entry.closed.set()
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(_REAP_INTERVAL_SEC)
+            idle_sec = max(0, settings.BROWSER_POOL_IDLE_SEC)
+            now = time.monotonic()
+            for entry in list(self._entries.values()):
+                if entry.leases == 0 and now - entry.last_used >= idle_sec:
+                    logger.info("[BrowserPool] closing idle %s context", entry.key)
+                    self._stats["idle_closed"] += 1
+                    await self._close_entry(entry)
+                    continue
+                try:
+                    await self._check_memory(entry)
+                except Exception as e:
+                    logger.debug("[BrowserPool] memory check failed: %s", e)
+            try:
+                self._stats["orphans_reaped"] += await asyncio.to_thread(browser_watchdog.reap_orphans)
+            except Exception as e:
+                logger.debug("[BrowserPool] orphan reap failed: %s", e)
+
+    async def _check_memory(self, entry: _Entry) -> None:
+        max_mb = settings.BROWSER_MAX_RSS_MB
+        if not entry.profile_dir or max_mb <= 0 or not browser_watchdog.available():
+            return
+        entry.rss = await asyncio.to_thread(browser_watchdog.browser_rss, entry.profile_dir)
+        if entry.rss <= max_mb << 20 or entry.retire:
+            return
+        logger.warning("[BrowserPool] %s browser RSS %dMB > %dMB, recycling", entry.key, entry.rss >> 20, max_mb)
+        entry.retire = True
+        self._stats["recycled"] += 1
+        if entry.leases == 0:
+            await self._close_entry(entry)
+
+    async def _shutdown(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for entry in list(self._entries.values()):
+            await self._close_entry(entry)
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.debug("[BrowserPool] playwright stop ignored: %s", e)
+            self._playwright = None
+
+    def shutdown(self, timeout: float = 30.0) -> None:
+        """应用退出时调用（阻塞）：关闭所有上下文与 Playwright，停止池线程。"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=timeout)
+        except Exception as e:
+            logger.warning("[BrowserPool] shutdown: %s", e)
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "contexts": {
+                k: {"leases": e.leases, "uses": e.uses, "rss_mb": e.rss >> 20} for k, e in self._entries.items()
+            },
+            **self._stats,
+        }
+
+
+browser_pool = BrowserPool()
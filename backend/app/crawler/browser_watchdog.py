@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Chromium process supervision: RSS of each profile's browser tree and reaping of leftover or orphaned browsers."""
+import logging
+import os
+import signal
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:  # 可选依赖，未安装时在 Linux 上读 /proc
+    psutil = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class _Proc(NamedTuple):
+    pid: int
+    ppid: int
+    cmdline: str
+    rss: int
+
+
+def _snapshot_psutil() -> Dict[int, _Proc]:
+    procs: Dict[int, _Proc] = {}
+    for p in psutil.process_iter(["pid", "ppid", "cmdline", "memory_info"]):
+        info = p.info
+        mem = info.get("memory_info")
+        procs[info["pid"]] = _Proc(
+            info["pid"], info.get("ppid") or 0, " ".join(info.get("cmdline") or []), mem.rss if mem else 0
+        )
+    return procs
+
+
+def _snapshot_proc() -> Dict[int, _Proc]:
+    procs: Dict[int, _Proc] = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open("/proc/%s/stat" % entry.name, "rb") as f:
+                stat = f.read().decode("utf-8", "replace")
+            with open("/proc/%s/cmdline" % entry.name, "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode("utf-8", "replace").strip()
+            with open("/proc/%s/statm" % entry.name, "rb") as f:
+                rss_pages = int(f.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            # 进程已退出或无权限读取
+            continue
+        # stat 格式：pid (comm) state ppid ...；comm 可能含空格，从最后一个 ')' 之后解析
+        fields = stat[stat.rfind(")") + 2:].split()
+        pid = int(entry.name)
+        procs[pid] = _Proc(pid, int(fields[1]), cmdline, rss_pages * _PAGE_SIZE)
+    return procs
+
+
+def _snapshot() -> Dict[int, _Proc]:
+    if psutil is not None:
+        return _snapshot_psutil()
+    if sys.platform.startswith("linux"):
+        return _snapshot_proc()
+    return {}
+
+
+def available() -> bool:
+    """能否枚举进程（psutil 已安装或 Linux /proc）；否则看门狗各函数均为空操作。"""
+    return psutil is not None or sys.platform.startswith("linux")
+
+
+def _children(procs: Dict[int, _Proc]) -> Dict[int, List[int]]:
+    tree: Dict[int, List[int]] = {}
+    for p in procs.values():
+        tree.setdefault(p.ppid, []).append(p.pid)
+    return tree
+
+
+def _descendants(pid: int, tree: Dict[int, List[int]]) -> List[int]:
+    out, stack = [], [pid]
+    while stack:
+        cur = stack.pop()
+        out.append(cur)
+        stack.extend(tree.get(cur, ()))
+    return out
+
+
+def _roots(procs: Dict[int, _Proc], marker: str) -> List[int]:
+    """命令行含 marker 的进程中，父进程不含 marker 的那些（即各浏览器主进程）。"""
+    matched = {pid for pid, p in procs.items() if marker in p.cmdline + " "}
+    return [pid for pid in matched if procs[pid].ppid not in matched]
+
+
+def _profile_marker(user_data_dir: str) -> str:
+    # 以空格结尾做整参数匹配：dy_user_data_dir 不匹配 dy_user_data_dir_alt1
+    return "--user-data-dir=%s " % os.path.abspath(user_data_dir)
+
+
+def _kill(pids: List[int]) -> int:
+    killed = 0
+    for pid in pids:
+        if pid == os.getpid():
+            continue
+        try:
+            if psutil is not None:
+                psutil.Process(pid).kill()
+            else:
+                os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            killed += 1
+        except Exception:
+            # 进程已退出
+            pass
+    return killed
+
+
+def browser_rss(user_data_dir: str) -> int:
+    """该浏览器数据目录对应的 Chromium 进程树（主进程 + 渲染/GPU 等子进程）的 RSS 总和（字节）。"""
+    procs = _snapshot()
+    tree = _children(procs)
+    return sum(
+        procs[pid].rss
+        for root in _roots(procs, _profile_marker(user_data_dir))
+        for pid in _descendants(root, tree)
+        if pid in procs
+    )
+
+
+def kill_browser(user_data_dir: str) -> int:
+    """结束仍在运行的该浏览器数据目录的 Chromium 进程树（关闭上下文失败或爬取超时后调用），返回结束的进程数。"""
+    procs = _snapshot()
+    tree = _children(procs)
+    pids = [pid for root in _roots(procs, _profile_marker(user_data_dir)) for pid in _descendants(root, tree)]
+    killed = _kill(pids)
+    if killed:
+        logger.warning("[BrowserWatchdog] killed %d leftover browser process(es) for %s", killed, user_data_dir)
+    return killed
+
+
+def _is_orphan(procs: Dict[int, _Proc], root: int) -> bool:
+    # 正常情况：Chromium <- Playwright 驱动(node) <- Python 进程；驱动或 Python 进程已不在即为孤儿
+    parent = procs.get(procs[root].ppid)
+    if parent is not None and "playwright" in parent.cmdline:
+        parent = procs.get(parent.ppid)
+    if parent is None:
+        return True
+    if parent.pid == 1 and os.getpid() != 1:
+        return True
+    return "python" not in parent.cmdline.lower()
+
+
+def default_browser_data_base() -> str:
+    backend_dir = Path(__file__).resolve().parent.parent.parent
+    return settings.BROWSER_DATA_DIR or str(backend_dir / "browser_data")
+
+
+def reap_orphans(browser_data_base: Optional[str] = None) -> int:
+    """
+    结束使用本项目浏览器数据目录、但所属 Playwright 驱动 / Python 进程已退出的 Chromium 进程树
+    （如 process 模式子进程超时被 kill、进程崩溃后遗留的浏览器）。返回结束的进程数。
+    """
+    if not settings.BROWSER_REAP_ORPHANS or not available():
+        return 0
+    procs = _snapshot()
+    tree = _children(procs)
+    marker = "--user-data-dir=%s" % os.path.join(os.path.abspath(browser_data_base or default_browser_data_base()), "")
+    pids = [
+        pid
+        for root in _roots(procs, marker)
+        if _is_orphan(procs, root)
+        for pid in _descendants(root, tree)
+    ]
+    killed = _kill(pids)
+    if killed:
+        logger.warning("[BrowserWatchdog] reaped %d orphaned browser process(es)", killed)
+    return killed
@@ -4,13 +4,12 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import os
 from pathlib import Path
 from typing import List, Optional
 
 _user_log = logging.getLogger("app.douyin_crawler")
 
-from app.crawler.base import BaseCrawler
+from app.crawler.base import BaseCrawler, raw_store_put
 from app.schemas import UnifiedPost, UnifiedAuthor, UnifiedComment
 
 logger = logging.getLogger(__name__)
@@ -28,13 +27,30 @@ def _run_douyin_sync_in_thread(
     max_comments_per_note: int,
     time_range: str = "all",
     content_types: Optional[List[str]] = None,
+    sink=None,
+    cancel_token=None,
+    checkpoint=None,
 ) -> tuple[List[dict], List[tuple]]:
-    """在独立线程中运行抖音搜索（新建事件循环），避免阻塞主循环。"""
+    """
+    在独立线程中运行抖音搜索（新建事件循环），避免阻塞主循环。
+    启用浏览器池时改为交给池的事件循环运行，复用常驻的浏览器上下文。
+    """
+    from app.crawler.browser_pool import browser_pool
+
+    if browser_pool.enabled:
+        return browser_pool.run_sync(
+            _run_douyin_crawler_search(
+                keywords, max_count, max_comments_per_note, time_range, content_types, sink, cancel_token, checkpoint,
+                browser_pool=browser_pool,
+            ),
+        )
     thread_loop = asyncio.new_event_loop()
     asyncio.set_event_loop(thread_loop)
     try:
         return thread_loop.run_until_complete(
-            _run_douyin_crawler_search(keywords, max_count, max_comments_per_note, time_range, content_types),
+            _run_douyin_crawler_search(
+                keywords, max_count, max_comments_per_note, time_range, content_types, sink, cancel_token, checkpoint,
+            ),
         )
     finally:
         thread_loop.close()
@@ -90,7 +106,7 @@ def _aweme_to_unified_post(aweme_item: dict) -> UnifiedPost:
         url=f"https://www.douyin.com/video/{aweme_id}",
         image_urls=image_urls,
         video_url=video_url,
-        platform_data={"raw_aweme": aweme_item},
+        platform_data={"has_raw": raw_store_put("dy", str(aweme_id), aweme_item)},
     )
 
 
@@ -136,64 +152,98 @@ def _content_types_to_search_channel(content_types: Optional[List[str]]) -> str:
     return "aweme_general"
 
 
+def _build_run_config(
+    keywords: str,
+    max_count: int,
+    max_comments_per_note: int,
+    time_range: str = "all",
+    content_types: Optional[List[str]] = None,
+):
+    """把本次搜索参数与全局 settings 组装成不可变的 DouyinRunConfig（不修改 os.environ）。"""
+    from app.config import settings
+    from app.douyin_crawler.config import DouyinRunConfig
+
+    backend_dir = Path(__file__).resolve().parent.parent.parent
+    return DouyinRunConfig.from_env(
+        keywords=(keywords or "").strip() or "热门",
+        crawler_type="search",
+        max_notes_count=max(1, min(max_count, 100)),
+        max_comments_per_note=max(0, min(max_comments_per_note, 50)),
+        publish_time_type=_time_range_to_publish_time_type(time_range),
+        search_channel=_content_types_to_search_channel(content_types),
+        enable_ip_proxy=settings.ENABLE_IP_PROXY,
+        ip_proxy_pool_count=settings.IP_PROXY_POOL_COUNT,
+        max_sleep_sec=max(1.0, settings.CRAWLER_MAX_SLEEP_SEC),
+        max_concurrency=max(1, settings.MAX_CONCURRENCY_NUM),
+        keyword_concurrency=max(1, settings.CRAWLER_KEYWORD_CONCURRENCY),
+        enable_get_comments=getattr(settings, "ENABLE_GET_COMMENTS", True),
+        enable_get_medias=False,
+        browser_data_base=settings.BROWSER_DATA_DIR or str(backend_dir / "browser_data"),
+    )
+
+
 async def _run_douyin_crawler_search(
     keywords: str,
     max_count: int,
     max_comments_per_note: int,
     time_range: str = "all",
     content_types: Optional[List[str]] = None,
+    sink=None,
+    cancel_token=None,
+    checkpoint=None,
+    browser_pool=None,
 ) -> tuple[List[dict], List[tuple]]:
-    """使用 app.douyin_crawler 运行抖音搜索，返回 (aweme_list, comments_list)。"""
-    from app.config import settings
+    """
+    使用 app.douyin_crawler 运行抖音搜索，返回 (aweme_list, comments_list)。
+    传入 sink 时为流式模式：每页转换后 publish 到 sink，返回的列表只剩未交出的部分（通常为空）。
+    cancel_token 被取消时在下一个检查点收尾（已抓到的保留），到达截止时间则关闭浏览器并报超时。
+    """
     from app.douyin_crawler import set_collector
     from app.douyin_crawler.core import DouYinCrawler
+    from app.douyin_crawler.store import flush_page
+    from app.services.cancel_token import CrawlCancelled, run_cancellable
     from app.services.ws_broadcast import push_log_sync
 
-    backend_dir = Path(__file__).resolve().parent.parent.parent
-    old_cwd = os.getcwd()
     try:
-        os.chdir(str(backend_dir))
-        os.environ["MC_BROWSER_DATA_DIR"] = (
-            settings.BROWSER_DATA_DIR or str(backend_dir / "browser_data")
-        )
         push_log_sync("正在准备搜索…", "info", "抖音")
         _user_log.info("[抖音] 正在准备搜索…")
-        os.environ["MC_PLATFORM"] = "dy"
-        os.environ["MC_KEYWORDS"] = (keywords or "").strip() or "热门"
-        os.environ["MC_CRAWLER_TYPE"] = "search"
-        os.environ["CRAWLER_MAX_NOTES_COUNT"] = str(max(1, min(max_count, 100)))
-        os.environ["CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES"] = str(max(0, min(max_comments_per_note, 50)))  # noqa: E501
-        os.environ["MC_PUBLISH_TIME_TYPE"] = str(_time_range_to_publish_time_type(time_range))
-        os.environ["MC_SEARCH_CHANNEL"] = _content_types_to_search_channel(content_types)
-        os.environ["ENABLE_IP_PROXY"] = "true" if settings.ENABLE_IP_PROXY else "false"
-        os.environ["IP_PROXY_POOL_COUNT"] = str(settings.IP_PROXY_POOL_COUNT)
-        os.environ.setdefault("MC_LOGIN_TYPE", "qrcode")
-        os.environ.setdefault("MC_HEADLESS", "false")
-        os.environ.setdefault("MC_SAVE_LOGIN_STATE", "true")
-        os.environ.setdefault("MC_ENABLE_CDP_MODE", "false")
-        os.environ["CRAWLER_MAX_SLEEP_SEC"] = str(max(1, getattr(settings, "CRAWLER_MAX_SLEEP_SEC", 2)))
-        os.environ["ENABLE_GET_COMMENTS"] = "true" if getattr(settings, "ENABLE_GET_COMMENTS", True) else "false"
-        os.environ["ENABLE_GET_MEIDAS"] = "false"
+        run_config = _build_run_config(keywords, max_count, max_comments_per_note, time_range, content_types)
 
         notes_list: List[dict] = []
         comments_list: List[tuple] = []
-        set_collector(notes_list, comments_list)
-        crawler = DouYinCrawler()
+        on_page = None
+        if sink is not None:
+            async def on_page(page_notes: List[dict], page_comments: List[tuple]) -> None:
+                await sink.publish(_to_unified_posts(page_notes, page_comments))
+        set_collector(notes_list, comments_list, on_page)
+        crawler = DouYinCrawler(run_config, cancel_token, checkpoint, browser_pool)
         push_log_sync("正在启动浏览器（如需登录请扫码）…", "info", "抖音")
         _user_log.info("[抖音] 正在启动浏览器（如需登录请扫码）…")
-        await crawler.start()
+        cancelled: Optional[CrawlCancelled] = None
         try:
-            await crawler.close()
-        except Exception as close_err:
-            logger.warning("[Douyin] crawler.close() ignored: %s", close_err)
-        push_log_sync("搜索完成，共 %d 条" % len(notes_list), "success", "抖音")
-        _user_log.info("[抖音] 搜索完成，共 %d 条", len(notes_list))
+            await run_cancellable(crawler.start(), cancel_token)
+        except CrawlCancelled as e:
+            cancelled = e
+        finally:
+            try:
+                await crawler.close()
+            except Exception as close_err:
+                logger.warning("[Douyin] crawler.close() ignored: %s", close_err)
+        # 流式模式下交出最后未满一页的数据
+        await flush_page()
+        total = sink.count if sink is not None else len(notes_list)
+        if cancelled is not None and cancelled.timed_out:
+            raise RuntimeError("搜索超时，已保留 %d 条" % total)
+        if cancelled is not None:
+            push_log_sync("已停止，共 %d 条" % total, "info", "抖音")
+            _user_log.info("[抖音] 已停止，共 %d 条", total)
+        else:
+            push_log_sync("搜索完成，共 %d 条" % total, "success", "抖音")
+            _user_log.info("[抖音] 搜索完成，共 %d 条", total)
         return notes_list, comments_list
     except Exception as e:
         logger.exception("[Douyin] run failed: %s", e)
         raise RuntimeError(f"抖音爬虫执行失败: {e!s}") from e
-    finally:
-        os.chdir(old_cwd)
 
 
 def run_search_sync(
@@ -203,10 +253,16 @@ def run_search_sync(
     max_comments_per_note: int = 20,
     time_range: str = "all",
     content_types: Optional[List[str]] = None,
+    sink=None,
+    cancel_token=None,
+    checkpoint=None,
 ) -> List[UnifiedPost]:
     """
     平台适配器：在调用线程中运行抖音搜索，返回已挂好评论的 UnifiedPost 列表。
     供 crawler_runner 统一调用，不暴露内部 aweme/comment 结构。
+    传入 sink（app.services.result_sink.ResultSink）时每页即时推送，返回空列表。
+    传入 cancel_token（app.services.cancel_token.CancelToken）时支持停止与单平台截止时间。
+    传入 checkpoint（app.services.checkpoint.CrawlCheckpoint）时从断点继续，并在每页交出后更新断点。
     """
     notes_list, comments_list = _run_douyin_sync_in_thread(
         keywords,
@@ -214,7 +270,18 @@ def run_search_sync(
         max_comments_per_note if enable_comments else 0,
         time_range,
         content_types,
+        sink,
+        cancel_token,
+        checkpoint,
     )
+    if sink is not None:
+        sink.drain()
+        return []
+    return _to_unified_posts(notes_list, comments_list)[:max_count]
+
+
+def _to_unified_posts(notes_list: List[dict], comments_list: List[tuple]) -> List[UnifiedPost]:
+    """aweme 与评论转为已挂好评论的 UnifiedPost 列表。"""
     posts = [_aweme_to_unified_post(n) for n in notes_list]
     comment_map: dict = {}
     for aweme_id, c in comments_list:
@@ -223,7 +290,7 @@ def run_search_sync(
     for p in posts:
         p.platform_data.setdefault("comments", [])
         p.platform_data["comments"] = [c.model_dump() for c in comment_map.get(p.post_id, [])]
-    return posts[:max_count]
+    return posts
 
 
 class DouYinCrawler(BaseCrawler):
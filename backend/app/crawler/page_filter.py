@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Playwright route filter for crawler contexts: abort images, media, fonts and trackers the signing page never needs."""
+import logging
+import re
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, FrozenSet, Optional, Pattern, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 纯统计 / 广告 / 性能监控域名（子串匹配）。签名与设备指纹相关的 SDK 域名（如抖音 mssdk.bytedance.com 写入
+# localStorage xmst 作为 msToken、mcs.zijieapi.com 下发 webid）不能拦截，否则请求被风控
+_TRACKER_KEYWORDS: Tuple[str, ...] = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "mon.zijieapi.com",
+    "apm-fe.xiaohongshu.com",
+)
+
+# 各资源类型对应的 URL 特征：扩展名，以及图片 / 视频 CDN 上不带扩展名的地址
+_TYPE_EXTENSIONS: Dict[str, Tuple[str, ...]] = {
+    "image": ("png", "jpe?g", "gif", "webp", "avif", "svg", "ico", "bmp", "heic"),
+    "media": ("mp4", "m4a", "mp3", "webm", "m3u8", "ts", "flv", "ogg", "wav"),
+    "font": ("woff2?", "ttf", "otf", "eot"),
+    "stylesheet": ("css",),
+}
+_TYPE_HOSTS: Dict[str, Tuple[str, ...]] = {
+    "image": ("sns-webpic", "sns-avatar", "sns-img", "douyinpic.com"),
+    "media": ("sns-video", "douyinvod.com"),
+}
+
+
+class _FilterState:
+    def __init__(self) -> None:
+        # 登录中的爬取数：> 0 时放行全部请求（池化上下文由多个爬取共用，最后一个登录结束后恢复拦截）
+        self.paused = 0
+
+
+# 已注册路由的上下文 -> 拦截状态
+_states: "weakref.WeakKeyDictionary[Any, _FilterState]" = weakref.WeakKeyDictionary()
+
+
+def _blocked_types() -> FrozenSet[str]:
+    types = {t.strip() for t in settings.CRAWLER_BLOCK_RESOURCE_TYPES.split(",") if t.strip()}
+    if settings.CRAWLER_MINIMAL_PAGE:
+        # 极简页：签名只依赖脚本，样式表也不加载
+        types |= {"stylesheet"}
+    return frozenset(types)
+
+
+def _blocked_keywords() -> Tuple[str, ...]:
+    extra = tuple(k.strip() for k in settings.CRAWLER_BLOCK_URL_KEYWORDS.split(",") if k.strip())
+    return _TRACKER_KEYWORDS + extra
+
+
+def _route_pattern(types: FrozenSet[str], keywords: Tuple[str, ...]) -> Optional[Pattern]:
+    """只匹配可能被拦截的地址：文档、XHR、脚本等请求不经过 Python 路由处理。"""
+    parts = [re.escape(k) for k in keywords]
+    exts = [e for t in sorted(types) for e in _TYPE_EXTENSIONS.get(t, ())]
+    if exts:
+        parts.append(r"\.(?:%s)(?:[?#!]|$)" % "|".join(exts))
+    parts.extend(re.escape(h) for t in sorted(types) for h in _TYPE_HOSTS.get(t, ()))
+    return re.compile("|".join(parts), re.IGNORECASE) if parts else None
+
+
+def filter_enabled() -> bool:
+    return bool(_blocked_types())
+
+
+def goto_wait_until() -> str:
+    """打开首页时等待的事件：极简页只等 DOMContentLoaded（脚本已执行、签名函数可用）。"""
+    return "domcontentloaded" if settings.CRAWLER_MINIMAL_PAGE else "load"
+
+
+async def install_resource_filter(context: Any) -> None:
+    """
+    在浏览器上下文上注册路由（同一上下文只注册一次）：匹配到的请求按资源类型 / URL 关键词中止，其余放行。
+    CRAWLER_BLOCK_RESOURCE_TYPES 为空时不注册。
+    """
+    if not filter_enabled() or context in _states:
+        return
+    types = _blocked_types()
+    keywords = _blocked_keywords()
+    pattern = _route_pattern(types, keywords)
+    if pattern is None:
+        return
+    state = _states[context] = _FilterState()
+
+    async def handle(route) -> None:
+        request = route.request
+        if state.paused == 0 and (request.resource_type in types or any(k in request.url for k in keywords)):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route(pattern, handle)
+    logger.info("[PageFilter] blocking %s and %d tracker keywords", ",".join(sorted(types)) or "-", len(keywords))
+
+
+@asynccontextmanager
+async def resource_filter_paused(context: Any) -> AsyncIterator[None]:
+    """扫码 / 滑块验证等需要图片的登录流程在其中进行：期间放行全部请求，退出后恢复拦截（按登录中的爬取数计数）。"""
+    state = _states.get(context)
+    if state is None:
+        yield
+        return
+    state.paused += 1
+    try:
+        yield
+    finally:
+        state.paused -= 1
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Per-platform login-state cache: skip the pong round-trip at crawl start while a recent verification is still valid."""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 各平台代表登录会话的 cookie：值变化（重新登录/换号）即视为未验证，其过期时间作为缓存上限
+SESSION_COOKIES: Dict[str, str] = {
+    "xhs": "web_session",
+    "dy": "sessionid",
+}
+
+
+@dataclass
+class _Verified:
+    session: str
+    verified_at: float
+    # 会话 cookie 的过期时刻（epoch 秒），None 表示会话 cookie 或未知
+    expires: Optional[float]
+
+
+class SessionHealthCache:
+    """
+    记录各平台（多账号时为平台 × 账号）最近一次登录态验证成功的时刻与会话 cookie 过期时间。
+    在 SESSION_CHECK_TTL_SEC 内、cookie 未过期且会话 cookie 未变化时，爬虫启动可跳过 pong；
+    请求遇到验证码 / 封禁 / 未登录等信号时 invalidate，下次启动重新验证。
+    dy/xhs 爬取可能运行在不同线程（未启用浏览器池时），读写加锁。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], _Verified] = {}
+
+    @staticmethod
+    def _session_cookie(platform: str, cookies: List[Dict]) -> Optional[Dict]:
+        name = SESSION_COOKIES.get(platform)
+        for cookie in cookies:
+            if cookie.get("name") == name and cookie.get("value"):
+                return cookie
+        return None
+
+    def is_fresh(self, platform: str, cookies: List[Dict], account: str = "") -> bool:
+        """cookies 为 browser_context.cookies() 的结果；True 表示可跳过本次登录态验证。"""
+        ttl = settings.SESSION_CHECK_TTL_SEC
+        if ttl <= 0:
+            return False
+        cookie = self._session_cookie(platform, cookies)
+        with self._lock:
+            entry = self._entries.get((platform, account))
+        if entry is None or cookie is None or cookie["value"] != entry.session:
+            return False
+        now = time.time()
+        if now - entry.verified_at >= ttl:
+            return False
+        return entry.expires is None or now < entry.expires
+
+    def mark_verified(self, platform: str, cookies: List[Dict], account: str = "") -> None:
+        """pong 或登录成功后调用；没有会话 cookie 时不缓存（无法判断会话是否变化）。"""
+        cookie = self._session_cookie(platform, cookies)
+        if cookie is None:
+            return
+        expires = cookie.get("expires")
+        entry = _Verified(cookie["value"], time.time(), float(expires) if expires and expires > 0 else None)
+        with self._lock:
+            self._entries[(platform, account)] = entry
+
+    def invalidate(self, platform: str, reason: str = "", account: str = "") -> None:
+        """请求出现登录失效 / 风控信号时调用，下次爬取启动时重新 pong。"""
+        with self._lock:
+            dropped = self._entries.pop((platform, account), None)
+        if dropped is not None:
+            logger.info("[SessionHealth] %s/%s login state invalidated: %s", platform, account or "default", reason)
+
+    def get_stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {
+                "%s/%s" % (p, a or "default"): {
+                    "verified_ago_sec": round(now - e.verified_at, 1),
+                    "cookie_expires_in_sec": round(e.expires - now, 1) if e.expires is not None else None,
+                }
+                for (p, a), e in self._entries.items()
+            }
+
+
+session_health = SessionHealthCache()
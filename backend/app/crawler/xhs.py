@@ -3,12 +3,14 @@
 from __future__ import annotations
 
 import asyncio
-import os
+import logging
 from typing import List, Optional
 
-from app.crawler.base import BaseCrawler
+from app.crawler.base import BaseCrawler, raw_store_put
 from app.schemas import UnifiedPost, UnifiedAuthor, UnifiedComment
 
+logger = logging.getLogger(__name__)
+
 
 def _note_to_unified_post(note_item: dict) -> UnifiedPost:
     """将 xhs_crawler 的 note 字典转为 UnifiedPost。"""
@@ -61,7 +63,7 @@ def _note_to_unified_post(note_item: dict) -> UnifiedPost:
         url=note_url,
         image_urls=image_urls,
         video_url=video_url,
-        platform_data={"raw_note": note_item},
+        platform_data={"has_raw": raw_store_put("xhs", note_id, note_item)},
     )
 
 
@@ -109,49 +111,120 @@ def _content_types_to_note_type(content_types: Optional[List[str]]) -> str:
     return "all"
 
 
-def _run_xhs_sync_in_thread(
+def _build_run_config(
     keywords: str,
     max_count: int,
     enable_comments: bool,
     max_comments_per_note: int,
     content_types: Optional[List[str]] = None,
-) -> tuple[list, list]:
-    """在单独线程中运行小红书 MC 搜索，返回 (notes_list, comments_list)。"""
+):
+    """把本次搜索参数与全局 settings 组装成不可变的 XhsRunConfig（不修改 os.environ）。"""
     from pathlib import Path
-    notes_list: List[dict] = []
-    comments_list: List[tuple] = []
-
     from app.config import settings
+    from app.xhs_crawler.config import XhsRunConfig
+
     backend_dir = Path(__file__).resolve().parent.parent.parent
-    os.environ["MC_BROWSER_DATA_DIR"] = (
-        settings.BROWSER_DATA_DIR or str(backend_dir / "browser_data")
+    return XhsRunConfig.from_env(
+        keywords=keywords.strip() or "热门",
+        crawler_type="search",
+        note_type=_content_types_to_note_type(content_types),
+        max_notes_count=max(1, min(max_count, 100)),
+        enable_get_comments=enable_comments,
+        max_comments_per_note=max(0, min(max_comments_per_note, 50)),
+        enable_get_sub_comments=False,
+        enable_ip_proxy=settings.ENABLE_IP_PROXY,
+        ip_proxy_pool_count=settings.IP_PROXY_POOL_COUNT,
+        max_sleep_sec=max(1.0, settings.CRAWLER_MAX_SLEEP_SEC),
+        max_concurrency=max(1, settings.MAX_CONCURRENCY_NUM),
+        keyword_concurrency=max(1, settings.CRAWLER_KEYWORD_CONCURRENCY),
+        browser_data_base=settings.BROWSER_DATA_DIR or str(backend_dir / "browser_data"),
     )
-    os.environ["MC_PLATFORM"] = "xhs"
-    os.environ["MC_KEYWORDS"] = keywords.strip() or "热门"
-    os.environ["MC_CRAWLER_TYPE"] = "search"
-    os.environ["MC_NOTE_TYPE"] = _content_types_to_note_type(content_types)
-    os.environ["CRAWLER_MAX_NOTES_COUNT"] = str(max(1, min(max_count, 100)))
-    os.environ["ENABLE_GET_COMMENTS"] = "true" if enable_comments else "false"
-    os.environ["CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES"] = str(max(0, min(max_comments_per_note, 50)))
-    os.environ["ENABLE_GET_SUB_COMMENTS"] = "false"
-    os.environ.setdefault("MC_LOGIN_TYPE", "qrcode")
-    os.environ.setdefault("MC_HEADLESS", "false")
-    os.environ.setdefault("MC_SAVE_LOGIN_STATE", "true")
-    os.environ.setdefault("MC_SORT_TYPE", "general")
-    os.environ["ENABLE_IP_PROXY"] = "true" if settings.ENABLE_IP_PROXY else "false"
-    os.environ["IP_PROXY_POOL_COUNT"] = str(settings.IP_PROXY_POOL_COUNT)
+
+
+async def _run_xhs_crawler_search(
+    keywords: str,
+    max_count: int,
+    enable_comments: bool,
+    max_comments_per_note: int,
+    content_types: Optional[List[str]] = None,
+    sink=None,
+    cancel_token=None,
+    checkpoint=None,
+    browser_pool=None,
+) -> tuple[list, list]:
+    """
+    运行小红书 MC 搜索，返回 (notes_list, comments_list)。
+    传入 sink 时为流式模式：每页转换后 publish 到 sink，返回的列表只剩未交出的部分（通常为空）。
+    cancel_token 被取消时在下一个检查点收尾（已抓到的保留），到达截止时间则关闭浏览器并报超时。
+    """
+    notes_list: List[dict] = []
+    comments_list: List[tuple] = []
+    run_config = _build_run_config(keywords, max_count, enable_comments, max_comments_per_note, content_types)
 
     from app.xhs_crawler import set_collector, XiaoHongShuCrawler
-    set_collector(notes_list, comments_list)
-    crawler = XiaoHongShuCrawler()
+    from app.xhs_crawler.store import flush_page
+    from app.services.cancel_token import CrawlCancelled, run_cancellable
+    from app.services.ws_broadcast import push_log_sync
+    on_page = None
+    if sink is not None:
+        async def on_page(page_notes: List[dict], page_comments: List[tuple]) -> None:
+            await sink.publish(_to_unified_posts(page_notes, page_comments))
+    set_collector(notes_list, comments_list, on_page)
+    crawler = XiaoHongShuCrawler(run_config, cancel_token, checkpoint, browser_pool)
+    cancelled: Optional[CrawlCancelled] = None
+    try:
+        await run_cancellable(crawler.start(), cancel_token)
+    except CrawlCancelled as e:
+        cancelled = e
+    finally:
+        try:
+            await crawler.close()
+        except Exception as close_err:
+            logger.warning("[XHS] crawler.close() ignored: %s", close_err)
+    # 流式模式下交出最后未满一页的数据
+    await flush_page()
+    total = sink.count if sink is not None else len(notes_list)
+    if cancelled is not None and cancelled.timed_out:
+        raise RuntimeError("小红书搜索超时，已保留 %d 条" % total)
+    if cancelled is not None:
+        push_log_sync("已停止，共 %d 条" % total, "info", "小红书")
+    return notes_list, comments_list
+
+
+def _run_xhs_sync_in_thread(
+    keywords: str,
+    max_count: int,
+    enable_comments: bool,
+    max_comments_per_note: int,
+    content_types: Optional[List[str]] = None,
+    sink=None,
+    cancel_token=None,
+    checkpoint=None,
+) -> tuple[list, list]:
+    """
+    在单独线程中运行小红书 MC 搜索（新建事件循环），返回 (notes_list, comments_list)。
+    启用浏览器池时改为交给池的事件循环运行，复用常驻的浏览器上下文。
+    """
+    from app.crawler.browser_pool import browser_pool
+
+    if browser_pool.enabled:
+        return browser_pool.run_sync(
+            _run_xhs_crawler_search(
+                keywords, max_count, enable_comments, max_comments_per_note, content_types, sink, cancel_token,
+                checkpoint, browser_pool=browser_pool,
+            ),
+        )
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     try:
-        loop.run_until_complete(crawler.start())
-        loop.run_until_complete(crawler.close())
+        return loop.run_until_complete(
+            _run_xhs_crawler_search(
+                keywords, max_count, enable_comments, max_comments_per_note, content_types, sink, cancel_token,
+                checkpoint,
+            ),
+        )
     finally:
         loop.close()
-    return notes_list, comments_list
 
 
 def run_search_sync(
@@ -161,10 +234,16 @@ def run_search_sync(
     max_comments_per_note: int = 20,
     time_range: str = "all",
     content_types: Optional[List[str]] = None,
+    sink=None,
+    cancel_token=None,
+    checkpoint=None,
 ) -> List[UnifiedPost]:
     """
     平台适配器：在调用线程中运行小红书搜索，返回已挂好评论的 UnifiedPost 列表。
     供 crawler_runner 统一调用，不暴露内部 note/comment 结构。
+    传入 sink（app.services.result_sink.ResultSink）时每页即时推送，返回空列表。
+    传入 cancel_token（app.services.cancel_token.CancelToken）时支持停止与单平台截止时间。
+    传入 checkpoint（app.services.checkpoint.CrawlCheckpoint）时从断点继续，并在每页交出后更新断点。
     """
     notes_list, comments_list = _run_xhs_sync_in_thread(
         keywords,
@@ -172,7 +251,18 @@ def run_search_sync(
         enable_comments,
         max_comments_per_note if enable_comments else 0,
         content_types,
+        sink,
+        cancel_token,
+        checkpoint,
     )
+    if sink is not None:
+        sink.drain()
+        return []
+    return _to_unified_posts(notes_list, comments_list)[:max_count]
+
+
+def _to_unified_posts(notes_list: List[dict], comments_list: List[tuple]) -> List[UnifiedPost]:
+    """note 与评论转为已挂好评论的 UnifiedPost 列表。"""
     posts = [_note_to_unified_post(n) for n in notes_list]
     comment_map: dict = {}
     for nid, c in comments_list:
@@ -180,7 +270,7 @@ def run_search_sync(
     for p in posts:
         p.platform_data.setdefault("comments", [])
         p.platform_data["comments"] = [c.model_dump() for c in comment_map.get(p.post_id, [])]
-    return posts[:max_count]
+    return posts
 
 
 class XiaoHongShuCrawler(BaseCrawler):
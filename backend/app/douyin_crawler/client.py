@@ -9,6 +9,7 @@ from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 import httpx
 from playwright.async_api import BrowserContext
 
+from app.crawler.account_pool import account_pool
 from app.douyin_crawler.exception import DataFetchError
 from app.douyin_crawler.field import PublishTimeType, SearchChannelType, SearchSortType
 from app.douyin_crawler.help import get_a_bogus, get_web_id
@@ -30,8 +31,11 @@ class DouYinClient(ProxyRefreshMixin):
         playwright_page: Optional["Page"],
         cookie_dict: Dict,
         proxy_ip_pool=None,
+        account: str = "",
     ):
         self.proxy = proxy
+        # 账号池中的账号名（空为默认账号），风控时据此给该账号降权
+        self.account = account
         self.timeout = timeout
         self.headers = headers
         self._host = "https://www.douyin.com"
@@ -92,6 +96,8 @@ class DouYinClient(ProxyRefreshMixin):
         async with httpx.AsyncClient(proxy=self.proxy, timeout=self.timeout) as client:
             response = await client.request(method, url, **kwargs)
         if response.text in ("", "blocked"):
+            # 空响应 / blocked 通常是登录失效或被风控：该账号降权冷却，下次启动重新验证登录态
+            account_pool.report_block("dy", self.account, "response %r" % response.text)
             raise DataFetchError(f"response: {response.text}")
         try:
             return response.json()
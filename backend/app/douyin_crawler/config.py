@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
-"""抖音 MC 运行期配置，由 app/crawler/douyin 通过 os.environ 注入。"""
+"""抖音单次运行配置：由 app/crawler/douyin 构造后传入 DouYinCrawler，运行期间不可变。"""
 import os
+from dataclasses import dataclass
 
 
 def _bool(key: str, default: bool = False) -> bool:
@@ -18,27 +19,60 @@ def _int(key: str, default: int) -> int:
         return default
 
 
-# 以下由 douyin.py 在调用前设置
-PLATFORM = os.environ.get("MC_PLATFORM", "dy")
-KEYWORDS = os.environ.get("MC_KEYWORDS", "热门")
-LOGIN_TYPE = os.environ.get("MC_LOGIN_TYPE", "qrcode")
-COOKIES = os.environ.get("MC_COOKIES", "")
-CRAWLER_TYPE = os.environ.get("MC_CRAWLER_TYPE", "search")
-ENABLE_IP_PROXY = _bool("ENABLE_IP_PROXY", False)
-IP_PROXY_POOL_COUNT = _int("IP_PROXY_POOL_COUNT", 2)
-HEADLESS = _bool("MC_HEADLESS", False)
-SAVE_LOGIN_STATE = _bool("MC_SAVE_LOGIN_STATE", True)
-ENABLE_CDP_MODE = _bool("MC_ENABLE_CDP_MODE", False)
-CDP_HEADLESS = _bool("CDP_HEADLESS", False)
-USER_DATA_DIR = os.environ.get("MC_USER_DATA_DIR", "%s_user_data_dir")
-# 浏览器数据根目录，空则用 cwd/browser_data；由 app 通过 MC_BROWSER_DATA_DIR 注入
-BROWSER_DATA_BASE = os.environ.get("MC_BROWSER_DATA_DIR", os.path.join(os.getcwd(), "browser_data"))
-START_PAGE = _int("MC_START_PAGE", 1)
-CRAWLER_MAX_NOTES_COUNT = _int("CRAWLER_MAX_NOTES_COUNT", 15)
-MAX_CONCURRENCY_NUM = _int("MAX_CONCURRENCY_NUM", 1)
-ENABLE_GET_MEIDAS = _bool("ENABLE_GET_MEIDAS", False)
-ENABLE_GET_COMMENTS = _bool("ENABLE_GET_COMMENTS", True)
-ENABLE_GET_SUB_COMMENTS = _bool("ENABLE_GET_SUB_COMMENTS", False)
-CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES = _int("CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES", 10)
-CRAWLER_MAX_SLEEP_SEC = _int("CRAWLER_MAX_SLEEP_SEC", 2)
-PUBLISH_TIME_TYPE = _int("MC_PUBLISH_TIME_TYPE", 0)
+@dataclass(frozen=True)
+class DouyinRunConfig:
+    """
+    一次抖音爬取的全部参数。各次运行各持一份，互不干扰，可在多个线程/事件循环中并行。
+    部署级选项（登录方式、无头、Cookie 等）可用 from_env() 从环境变量取默认值（只读）。
+    """
+
+    keywords: str = "热门"
+    platform: str = "dy"
+    crawler_type: str = "search"
+    max_notes_count: int = 15
+    start_page: int = 1
+    publish_time_type: int = 0
+    search_channel: str = "aweme_general"
+    enable_get_comments: bool = True
+    enable_get_sub_comments: bool = False
+    max_comments_per_note: int = 10
+    enable_get_medias: bool = False
+    max_concurrency: int = 1
+    # 多关键词（逗号分隔）同时爬取的关键词数，共用一个浏览器会话
+    keyword_concurrency: int = 3
+    max_sleep_sec: float = 2.0
+    enable_ip_proxy: bool = False
+    ip_proxy_pool_count: int = 2
+    login_type: str = "qrcode"
+    cookies: str = ""
+    headless: bool = False
+    save_login_state: bool = True
+    enable_cdp_mode: bool = False
+    cdp_headless: bool = False
+    user_data_dir: str = "%s_user_data_dir"
+    # 浏览器数据根目录，空则用 backend/browser_data
+    browser_data_base: str = ""
+    # 本次爬取使用的账号（账号池分配，空为默认账号）
+    account: str = ""
+
+    @classmethod
+    def from_env(cls, **overrides) -> "DouyinRunConfig":
+        base = dict(
+            login_type=os.environ.get("MC_LOGIN_TYPE", "qrcode"),
+            cookies=os.environ.get("MC_COOKIES", ""),
+            headless=_bool("MC_HEADLESS", False),
+            save_login_state=_bool("MC_SAVE_LOGIN_STATE", True),
+            enable_cdp_mode=_bool("MC_ENABLE_CDP_MODE", False),
+            cdp_headless=_bool("CDP_HEADLESS", False),
+            user_data_dir=os.environ.get("MC_USER_DATA_DIR", "%s_user_data_dir"),
+            browser_data_base=os.environ.get("MC_BROWSER_DATA_DIR", ""),
+            start_page=_int("MC_START_PAGE", 1),
+        )
+        base.update(overrides)
+        return cls(**base)
+
+    @property
+    def profile_name(self) -> str:
+        """浏览器数据目录名（也是浏览器池的键）：默认账号为 <平台>_user_data_dir，其余账号追加 _<账号名>。"""
+        name = self.user_data_dir % self.platform
+        return "%s_%s" % (name, self.account) if self.account else name
@@ -4,11 +4,13 @@ import asyncio
 import logging
 import os
 import sys
-from typing import Any, Dict, List, Optional
+import time
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from playwright.async_api import BrowserContext, BrowserType, async_playwright
 
-from app.douyin_crawler import config
+from app.douyin_crawler.config import DouyinRunConfig
 from app.douyin_crawler.base_crawler import AbstractCrawler
 from app.douyin_crawler.client import DouYinClient
 from app.douyin_crawler.exception import DataFetchError
@@ -18,14 +20,30 @@ from app.douyin_crawler.store import (
     _extract_note_image_list,
     _extract_video_download_url,
     batch_update_dy_aweme_comments,
+    flush_page,
+    fork_collector,
     update_douyin_aweme,
 )
 from app.douyin_crawler.utils import format_proxy_info, logger
+from app.crawler.account_pool import Account, account_pool
+from app.crawler import browser_watchdog
+from app.crawler.anti_block import RateLimiter
+from app.crawler.browser_pool import BrowserLease, BrowserPool
+from app.crawler.page_filter import goto_wait_until, install_resource_filter, resource_filter_paused
+from app.crawler.session_health import session_health
+from app.services.cancel_token import CancelToken
+from app.services.checkpoint import CrawlCheckpoint
 
 # 用户可读输出：同时推送到前端实时日志 + 后台控制台
 _user_log = logging.getLogger("app.douyin_crawler")
 _last_was_progress = False
 REPLACE_ID_SEARCH_PROGRESS = "search_progress"
+# 单个关键词连续多少页没有新视频（全被其他关键词抓过）即结束该关键词
+_MAX_STALE_PAGES = 3
+# 未配置浏览器数据目录时使用 backend/browser_data（不依赖进程 cwd）
+_DEFAULT_BROWSER_DATA_BASE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "browser_data"
+)
 
 
 def _user_msg(msg: str, level: str = "info", platform: str = "抖音") -> None:
@@ -61,88 +79,164 @@ class DouYinCrawler(AbstractCrawler):
     browser_context: Optional[BrowserContext] = None
     ip_proxy_pool = None
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        run_config: Optional[DouyinRunConfig] = None,
+        cancel_token: Optional[CancelToken] = None,
+        checkpoint: Optional[CrawlCheckpoint] = None,
+        browser_pool: Optional[BrowserPool] = None,
+    ) -> None:
         self.index_url = "https://www.douyin.com"
+        self.config = run_config or DouyinRunConfig.from_env()
+        # 停止/超时检查点：每页搜索、每条详情、每页评论前
+        self.cancel_token = cancel_token or CancelToken()
+        # 断点续爬：每页交出后记录关键词进度，恢复时从断点页继续
+        self.checkpoint = checkpoint or CrawlCheckpoint()
+        # 多关键词并发时共享：已抓取的 aweme_id（含断点中已处理的）、请求限速、评论并发
+        self._seen_ids: Set[str] = self.checkpoint.processed_ids()
+        self._limiter = RateLimiter(self.config.max_sleep_sec)
+        self._comment_sem = asyncio.Semaphore(max(1, self.config.max_concurrency))
+        # 传入 browser_pool 时从池中借用常驻上下文（须在池的事件循环中运行），close 时交还
+        self.browser_pool = browser_pool
+        self._lease: Optional[BrowserLease] = None
+        # 账号池分配的账号：start 时借用，close 时交还
+        self.account: Optional[Account] = None
+        self._account_acquired_at = 0.0
 
     async def start(self) -> None:
         playwright_proxy, httpx_proxy = None, None
-        if config.ENABLE_IP_PROXY:
+        self._acquire_account()
+        config = self.config
+        if config.enable_ip_proxy:
             from app.proxy.proxy_ip_pool import create_ip_pool
             self.ip_proxy_pool = await create_ip_pool(
-                ip_pool_count=config.IP_PROXY_POOL_COUNT,
+                ip_pool_count=config.ip_proxy_pool_count,
                 enable_validate_ip=True,
             )
             ip_info = await self.ip_proxy_pool.get_proxy()
             playwright_proxy, httpx_proxy = format_proxy_info(ip_info)
 
+        if self.browser_pool is not None:
+            # 复用浏览器池中常驻的上下文：省去启动浏览器、注入脚本与打开首页
+            self._lease = await self.browser_pool.acquire(config.profile_name, self.open_browser, self._profile_dir())
+            self.browser_context, self.context_page = self._lease.context, self._lease.page
+            logger.info("[DouYinCrawler] 复用浏览器池中的上下文")
+            await self._run(httpx_proxy)
+            return
+
         async with async_playwright() as playwright:
-            chromium = playwright.chromium
             logger.info("[DouYinCrawler] 使用标准模式启动浏览器")
-            self.browser_context = await self.launch_browser(
-                chromium, playwright_proxy, None, headless=config.HEADLESS
+            self.browser_context, self.context_page = await self.open_browser(playwright, playwright_proxy)
+            await self._run(httpx_proxy)
+
+    async def open_browser(self, playwright, playwright_proxy: Optional[Dict] = None) -> Tuple[BrowserContext, Any]:
+        """启动浏览器上下文、注入 stealth 脚本并打开首页，返回 (context, page)；浏览器池新建上下文时同样调用。"""
+        config = self.config
+        browser_context = await self.launch_browser(
+            playwright.chromium, playwright_proxy, None, headless=config.headless
+        )
+        try:
+            stealth_path = os.path.join(os.path.dirname(__file__), "libs", "stealth.min.js")
+            if os.path.isfile(stealth_path):
+                await browser_context.add_init_script(path=stealth_path)
+        except Exception:
+            pass
+        # 首页只用于 cookie、localStorage 与签名：不加载图片 / 媒体 / 字体 / 埋点
+        await install_resource_filter(browser_context)
+        page = await browser_context.new_page()
+        await page.goto(self.index_url, wait_until=goto_wait_until())
+        return browser_context, page
+
+    async def _run(self, httpx_proxy: Optional[str]) -> None:
+        config = self.config
+        self.dy_client = await self._create_douyin_client(httpx_proxy)
+        if session_health.is_fresh(config.platform, await self.browser_context.cookies(), config.account):
+            logger.info("[DouYinCrawler] 登录态在缓存有效期内，跳过 pong")
+        elif await self.dy_client.pong(self.browser_context):
+            session_health.mark_verified(config.platform, await self.browser_context.cookies(), config.account)
+        else:
+            login_obj = DouYinLogin(
+                login_type=config.login_type,
+                browser_context=self.browser_context,
+                context_page=self.context_page,
+                login_phone="",
+                cookie_str=config.cookies,
             )
-            try:
-                stealth_path = os.path.join(os.path.dirname(__file__), "libs", "stealth.min.js")
-                if os.path.isfile(stealth_path):
-                    await self.browser_context.add_init_script(path=stealth_path)
-            except Exception:
-                pass
-            self.context_page = await self.browser_context.new_page()
-            await self.context_page.goto(self.index_url)
-
-            self.dy_client = await self._create_douyin_client(httpx_proxy)
-            if not await self.dy_client.pong(self.browser_context):
-                login_obj = DouYinLogin(
-                    login_type=config.LOGIN_TYPE,
-                    browser_context=self.browser_context,
-                    context_page=self.context_page,
-                    login_phone="",
-                    cookie_str=config.COOKIES,
-                )
+            # 扫码 / 滑块验证需要图片，登录期间暂停资源拦截
+            async with resource_filter_paused(self.browser_context):
                 await login_obj.begin()
-                await self.dy_client.update_cookies(self.browser_context)
+            await self.dy_client.update_cookies(self.browser_context)
 
-            from app.douyin_crawler.var import crawler_type_var
-            crawler_type_var.set(config.CRAWLER_TYPE)
+        from app.douyin_crawler.var import crawler_type_var
+        crawler_type_var.set(config.crawler_type)
 
-            if config.CRAWLER_TYPE == "search":
-                await self.search()
-            elif config.CRAWLER_TYPE == "detail":
-                await self.get_specified_awemes()
-            elif config.CRAWLER_TYPE == "creator":
-                await self.get_creators_and_videos()
+        if config.crawler_type == "search":
+            await self.search()
+        elif config.crawler_type == "detail":
+            await self.get_specified_awemes()
+        elif config.crawler_type == "creator":
+            await self.get_creators_and_videos()
 
-            _user_msg("爬取流程结束")
+        _user_msg("爬取流程结束")
 
     async def search(self) -> None:
-        from app.douyin_crawler.var import request_keyword_var, source_keyword_var
+        config = self.config
+        keywords_str = config.keywords.strip() or "热门"
+        keywords = list(dict.fromkeys(k.strip() for k in keywords_str.split(",") if k.strip())) or ["热门"]
+        # 多关键词并发：共用登录会话、去重集合与请求限速，每个关键词按配额 ceil(max_notes / 关键词数) 抓取
+        budget = -(-max(1, config.max_notes_count) // len(keywords))
+        keyword_sem = asyncio.Semaphore(max(1, config.keyword_concurrency))
 
-        # 运行时从环境变量读取，确保 douyin.py 注入的关键词/时间/条数生效（config 在 import 时已固化）
-        keywords_str = os.environ.get("MC_KEYWORDS", "热门").strip() or "热门"
-        publish_time_type = int(os.environ.get("MC_PUBLISH_TIME_TYPE", "0"))
-        max_notes = max(1, int(os.environ.get("CRAWLER_MAX_NOTES_COUNT", "15")))
-        start_page = int(os.environ.get("MC_START_PAGE", "1"))
+        async def run(keyword: str) -> None:
+            async with keyword_sem:
+                await self._search_keyword(keyword, budget)
 
         _user_msg("开始搜索关键词: %s" % keywords_str)
+        tasks = [asyncio.ensure_future(run(k)) for k in keywords]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # 任一关键词异常（含停止）时取消其余关键词，避免在浏览器关闭后继续请求
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def _search_keyword(self, keyword: str, budget: int) -> None:
+        from app.douyin_crawler.var import request_keyword_var, source_keyword_var
+
+        config = self.config
+        publish_time_type = config.publish_time_type
+        start_page = config.start_page
+        search_channel = (
+            SearchChannelType.VIDEO if config.search_channel == "aweme_video_web" else SearchChannelType.GENERAL
+        )
+        resume = self.checkpoint.get(keyword)
+        if resume.get("done"):
+            _user_msg("关键词「%s」上次已完成，跳过" % keyword)
+            return
+        fork_collector()
+        source_keyword_var.set(keyword)
+        request_keyword_var.set(keyword)
         dy_limit = 10
-        for keyword in [k.strip() for k in keywords_str.split(",") if k.strip()]:
-            source_keyword_var.set(keyword)
-            request_keyword_var.set(keyword)
+        aweme_list: List[str] = list(resume.get("ids") or [])
+        page = int(resume.get("page") or 0)
+        stale_pages = 0
+        dy_search_id = resume.get("search_id") or ""
+        if resume:
+            _user_msg("从断点继续: 「%s」第 %d 页，已有 %d 条" % (keyword, max(page, 1), len(aweme_list)))
+        else:
             _user_msg("正在搜索: 「%s」" % keyword)
-            aweme_list: List[str] = []
-            page = 0
-            dy_search_id = ""
-            while (page - start_page + 1) * dy_limit <= max_notes:
+        # 正常结束（配额满 / 无更多结果）时标记关键词完成；请求失败不标记，恢复时重试
+        finished = True
+        try:
+            while len(aweme_list) < budget:
                 if page < start_page:
                     page += 1
                     continue
+                self.cancel_token.raise_if_cancelled()
+                await self._limiter.wait()
                 try:
-                    search_channel_str = os.environ.get("MC_SEARCH_CHANNEL", "aweme_general")
-                    search_channel = (
-                        SearchChannelType.VIDEO
-                        if search_channel_str == "aweme_video_web"
-                        else SearchChannelType.GENERAL
-                    )
                     posts_res = await self.dy_client.search_info_by_keyword(
                         keyword=keyword,
                         offset=page * dy_limit - dy_limit,
@@ -153,10 +247,11 @@ class DouYinCrawler(AbstractCrawler):
                     data = posts_res.get("data")
                     if data is None or data == []:
                         # 与「获取」一致：start_page 下 page 已是 1-based 语义
-                        _user_msg("第 %d 页无结果" % page)
+                        _user_msg("「%s」第 %d 页无结果" % (keyword, page))
                         break
                 except DataFetchError:
                     _user_msg("搜索「%s」请求失败" % keyword, level="error")
+                    finished = False
                     break
 
                 # start_page 跳过导致首次请求时 page 已是 1，故直接用 page 作为 1-based 页码
@@ -166,30 +261,45 @@ class DouYinCrawler(AbstractCrawler):
                     break
                 dy_search_id = posts_res.get("extra", {}).get("logid", "")
                 data_list = posts_res.get("data", [])
-                remaining = max_notes - len(aweme_list)
-                if remaining <= 0:
-                    break
                 page_aweme_list = []
-                for post_item in data_list[:remaining]:
+                for post_item in data_list:
+                    if len(aweme_list) >= budget:
+                        break
+                    self.cancel_token.raise_if_cancelled()
                     try:
                         aweme_info = post_item.get("aweme_info") or (post_item.get("aweme_mix_info") or {}).get("mix_items", [{}])[0]
                     except (TypeError, IndexError):
                         continue
                     aweme_id = aweme_info.get("aweme_id", "")
+                    if aweme_id:
+                        # 跨关键词去重：已被其他关键词抓到的不再计入配额、不重复拉评论
+                        if aweme_id in self._seen_ids:
+                            continue
+                        self._seen_ids.add(aweme_id)
                     aweme_list.append(aweme_id)
                     page_aweme_list.append(aweme_id)
-                    _user_progress("正在搜索第 %d 条" % len(aweme_list))
+                    _user_progress("正在搜索第 %d 条" % len(self._seen_ids))
                     await update_douyin_aweme(aweme_item=aweme_info)
                     await self.get_aweme_media(aweme_item=aweme_info)
                 await self.batch_get_note_comments(page_aweme_list)
-                _user_msg("第 %d 页获取 %d 条" % (current_page_one_based, len(page_aweme_list)))
-                if len(aweme_list) >= max_notes:
+                await flush_page()
+                await self.checkpoint.save(keyword, page, dy_search_id, page_aweme_list)
+                _user_msg("「%s」第 %d 页获取 %d 条" % (keyword, current_page_one_based, len(page_aweme_list)))
+                if not posts_res.get("has_more", 1):
+                    break
+                stale_pages = 0 if page_aweme_list else stale_pages + 1
+                if stale_pages >= _MAX_STALE_PAGES:
+                    _user_msg("「%s」连续 %d 页无新结果" % (keyword, stale_pages))
                     break
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-            _user_msg("关键词「%s」共 %d 条" % (keyword, len(aweme_list)), level="success")
+        finally:
+            # 本关键词未交出的半页（停止/异常时）
+            await flush_page()
+        if finished:
+            await self.checkpoint.save(keyword, page, dy_search_id, [], done=True)
+        _user_msg("关键词「%s」共 %d 条" % (keyword, len(aweme_list)), level="success")
 
     async def get_aweme_media(self, aweme_item: Dict) -> None:
-        if not config.ENABLE_GET_MEIDAS:
+        if not self.config.enable_get_medias:
             return
         note_urls = _extract_note_image_list(aweme_item)
         video_url = _extract_video_download_url(aweme_item)
@@ -199,7 +309,7 @@ class DouYinCrawler(AbstractCrawler):
             await self._get_aweme_video(aweme_item)
 
     async def _get_aweme_images(self, aweme_item: Dict) -> None:
-        if not config.ENABLE_GET_MEIDAS:
+        if not self.config.enable_get_medias:
             return
         from app.douyin_crawler.store import update_dy_aweme_image
         aweme_id = aweme_item.get("aweme_id")
@@ -212,7 +322,7 @@ class DouYinCrawler(AbstractCrawler):
                 await update_dy_aweme_image(aweme_id, content, f"{i:>03d}.jpeg")
 
     async def _get_aweme_video(self, aweme_item: Dict) -> None:
-        if not config.ENABLE_GET_MEIDAS:
+        if not self.config.enable_get_medias:
             return
         from app.douyin_crawler.store import update_dy_aweme_video
         aweme_id = aweme_item.get("aweme_id")
@@ -224,27 +334,34 @@ class DouYinCrawler(AbstractCrawler):
             await update_dy_aweme_video(aweme_id, content, "video.mp4")
 
     async def batch_get_note_comments(self, aweme_list: List[str]) -> None:
-        if not config.ENABLE_GET_COMMENTS:
+        if not self.config.enable_get_comments:
             return
-        sem = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-        tasks = [self.get_comments(aid, sem) for aid in aweme_list]
+        tasks = [self.get_comments(aid, self._comment_sem) for aid in aweme_list]
         if tasks:
             await asyncio.gather(*tasks)
 
     async def get_comments(self, aweme_id: str, semaphore: asyncio.Semaphore) -> None:
+        config = self.config
         async with semaphore:
+            self.cancel_token.raise_if_cancelled()
+            await self._limiter.wait()
             try:
                 await self.dy_client.get_aweme_all_comments(
                     aweme_id=aweme_id,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
-                    is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
-                    callback=batch_update_dy_aweme_comments,
-                    max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                    crawl_interval=config.max_sleep_sec,
+                    is_fetch_sub_comments=config.enable_get_sub_comments,
+                    callback=self._store_comments,
+                    max_count=config.max_comments_per_note,
                 )
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+                await asyncio.sleep(config.max_sleep_sec)
             except DataFetchError as e:
                 logger.error("[DouYinCrawler.get_comments] aweme_id %s failed: %s", aweme_id, e)
 
+    async def _store_comments(self, aweme_id: str, comments: List[Dict]) -> None:
+        """评论分页回调：先保存本页，再检查停止，已拉到的评论不丢。"""
+        await batch_update_dy_aweme_comments(aweme_id, comments)
+        self.cancel_token.raise_if_cancelled()
+
     async def get_specified_awemes(self) -> None:
         pass  # 需要 DY_SPECIFIED_ID_LIST 等，可后续扩展
 
@@ -269,8 +386,15 @@ class DouYinCrawler(AbstractCrawler):
             playwright_page=self.context_page,
             cookie_dict=cookie_dict,
             proxy_ip_pool=self.ip_proxy_pool,
+            account=self.config.account,
         )
 
+    def _profile_dir(self) -> Optional[str]:
+        """当前账号的持久化浏览器数据目录；不保存登录态（非持久化上下文）时为 None。"""
+        if not self.config.save_login_state:
+            return None
+        return os.path.join(self.config.browser_data_base or _DEFAULT_BROWSER_DATA_BASE, self.config.profile_name)
+
     async def launch_browser(
         self,
         chromium: BrowserType,
@@ -278,10 +402,10 @@ class DouYinCrawler(AbstractCrawler):
         user_agent: Optional[str],
         headless: bool = True,
     ) -> BrowserContext:
-        if config.SAVE_LOGIN_STATE:
-            user_data_dir = os.path.join(config.BROWSER_DATA_BASE, config.USER_DATA_DIR % config.PLATFORM)
+        config = self.config
+        if config.save_login_state:
             return await chromium.launch_persistent_context(
-                user_data_dir=user_data_dir,
+                user_data_dir=self._profile_dir(),
                 accept_downloads=True,
                 headless=headless,
                 proxy=playwright_proxy,
@@ -291,11 +415,39 @@ class DouYinCrawler(AbstractCrawler):
         browser = await chromium.launch(headless=headless, proxy=playwright_proxy)
         return await browser.new_context(viewport={"width": 1920, "height": 1080}, user_agent=user_agent)
 
+    def _acquire_account(self) -> None:
+        """从账号池借用一个账号：切换到该账号的浏览器数据目录与 Cookie，请求再受账号级速率预算限制。"""
+        # 未启用浏览器池时每次爬取自行打开账号目录，同一目录不能被两个浏览器同时打开
+        self.account = account_pool.acquire(self.config.platform, exclusive=self.browser_pool is None)
+        self._account_acquired_at = time.time()
+        self.config = replace(
+            self.config,
+            account=self.account.name,
+            cookies=self.account.cookies if self.account.name else self.config.cookies,
+        )
+        self._limiter.parent = self.account.limiter
+
     async def close(self) -> None:
+        if self.account is not None:
+            account, self.account = self.account, None
+            account_pool.release(account, self._account_acquired_at)
+        if self._lease is not None:
+            # 池中的上下文不关闭；超时（请求可能卡住）时丢弃，下次借用重建
+            lease, self._lease = self._lease, None
+            self.browser_context = None
+            await self.browser_pool.release(lease, discard=self.cancel_token.expired)
+            logger.info("[DouYinCrawler.close] Browser context returned to pool")
+            return
+        close_failed = False
         if self.browser_context:
             try:
                 await self.browser_context.close()
             except Exception as e:
                 logger.debug("[DouYinCrawler.close] close ignored: %s", e)
+                close_failed = True
             self.browser_context = None
+        profile_dir = self._profile_dir()
+        if (close_failed or self.cancel_token.expired) and profile_dir and browser_watchdog.available():
+            # 关闭失败或超时中断时，浏览器进程可能残留（驱动已退出），按数据目录清理
+            await asyncio.to_thread(browser_watchdog.kill_browser, profile_dir)
         logger.info("[DouYinCrawler.close] Browser context closed ...")
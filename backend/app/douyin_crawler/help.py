@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 """抖音 a_bogus 签名与 URL 解析（仅供学习研究）。"""
+import asyncio
 import os
 import random
 import re
+import threading
 
 from app.douyin_crawler.crawler_util import extract_url_params_to_dict
 from app.douyin_crawler.model import CreatorUrlInfo, VideoUrlInfo
@@ -10,14 +12,17 @@ from app.douyin_crawler.model import CreatorUrlInfo, VideoUrlInfo
 _js_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "libs")
 _js_path = os.path.join(_js_dir, "douyin.js")
 _douyin_sign_obj = None
+# 签名在线程池中执行，首次编译加锁
+_sign_lock = threading.Lock()
 
 
 def _get_sign_obj():
     global _douyin_sign_obj
-    if _douyin_sign_obj is None:
-        import execjs
-        with open(_js_path, encoding="utf-8-sig") as f:
-            _douyin_sign_obj = execjs.compile(f.read())
+    with _sign_lock:
+        if _douyin_sign_obj is None:
+            import execjs
+            with open(_js_path, encoding="utf-8-sig") as f:
+                _douyin_sign_obj = execjs.compile(f.read())
     return _douyin_sign_obj
 
 
@@ -37,7 +42,8 @@ def get_a_bogus_from_js(url: str, params: str, user_agent: str) -> str:
 
 
 async def get_a_bogus(url: str, params: str, post_data: dict, user_agent: str, page=None) -> str:
-    return get_a_bogus_from_js(url, params, user_agent)
+    # execjs 同步调用 JS 运行时：放到线程池执行，避免阻塞共用的事件循环（浏览器池中各爬取共用一个循环）
+    return await asyncio.to_thread(get_a_bogus_from_js, url, params, user_agent)
 
 
 def parse_video_info_from_url(url: str) -> VideoUrlInfo:
@@ -9,7 +9,6 @@ from playwright.async_api import BrowserContext, Page
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from tenacity import RetryError, retry, retry_if_result, stop_after_attempt, wait_fixed
 
-from app.douyin_crawler import config as config_module
 from app.douyin_crawler.utils import (
     Slide,
     convert_cookies,
@@ -30,7 +29,7 @@ class DouYinLogin:
         login_phone: Optional[str] = "",
         cookie_str: Optional[str] = "",
     ):
-        config_module.LOGIN_TYPE = login_type
+        self.login_type = login_type
         self.browser_context = browser_context
         self.context_page = context_page
         self.login_phone = login_phone
@@ -39,11 +38,11 @@ class DouYinLogin:
 
     async def begin(self) -> None:
         await self.popup_login_dialog()
-        if config_module.LOGIN_TYPE == "qrcode":
+        if self.login_type == "qrcode":
             await self.login_by_qrcode()
-        elif config_module.LOGIN_TYPE == "phone":
+        elif self.login_type == "phone":
             await self.login_by_mobile()
-        elif config_module.LOGIN_TYPE == "cookie":
+        elif self.login_type == "cookie":
             await self.login_by_cookies()
         else:
             raise ValueError("[DouYinLogin.begin] Invalid Login Type (qrcode | phone | cookie)")
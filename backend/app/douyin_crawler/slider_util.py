@@ -13,7 +13,10 @@ class Slide:
     """识别滑块缺口位置，返回需要滑动的 x 距离。"""
 
     def __init__(self, gap: str, bg: str, gap_size=None, bg_size=None, out=None):
-        self.img_dir = os.path.join(os.getcwd(), "temp_image")
+        # 固定在 backend/temp_image，不依赖进程 cwd
+        self.img_dir = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "temp_image"
+        )
         os.makedirs(self.img_dir, exist_ok=True)
         bg_resize = bg_size if bg_size else (340, 212)
         gap_size = gap_size if gap_size else (68, 68)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 """FastAPI entry: CORS, mount search router."""
+import asyncio
 import logging
 import sys
 from pathlib import Path
@@ -29,7 +30,7 @@ logging.getLogger("MediaCrawler").setLevel(logging.WARNING)
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import search, analysis, ws
+from app.routers import search, analysis, ws, jobs
 
 app = FastAPI(
     title="GetSomeHints API",
@@ -38,9 +39,26 @@ app = FastAPI(
 )
 
 @app.on_event("startup")
-def startup():
-    import os
-    pid = os.getpid()
+async def startup():
+    from app.config import settings
+    from app.crawler.browser_watchdog import reap_orphans
+    from app.services.ws_broadcast import ensure_log_dispatcher
+    # 爬虫线程日志 -> 主循环 -> WebSocket 的常驻转发任务
+    ensure_log_dispatcher()
+    # 上次进程崩溃 / 被强杀后遗留的浏览器
+    await asyncio.to_thread(reap_orphans)
+    if settings.CRAWLER_WORKER_MODE == "queue" and not settings.JOB_BROKER_TOKEN:
+        logger.warning("JOB_BROKER_TOKEN 未配置：作业代理 /api/jobs/* 只接受本机请求，其他机器上的 worker 无法连接")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    from app.crawler.browser_pool import browser_pool
+    from app.services.task_manager import task_manager
+    from app.services.ws_broadcast import stop_log_dispatcher
+    await stop_log_dispatcher()
+    await asyncio.to_thread(browser_pool.shutdown)
+    task_manager.close()
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -51,7 +69,7 @@ async def log_requests(request: Request, call_next):
     pid = os.getpid()
     is_poll = method == "GET" and (
         path.startswith("/api/search/status/") or path.startswith("/api/search/results/")
-    )
+    ) or path.startswith("/api/jobs/")
     if not is_poll:
         logger.info("%s %s", method, path)
     response = await call_next(request)
@@ -69,12 +87,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Server-PID"],
+    expose_headers=["X-Server-PID", "ETag"],
 )
 
 app.include_router(search.router, prefix="/api")
 app.include_router(analysis.router, prefix="/api")
 app.include_router(ws.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
 
 
 @app.get("/api/health")
@@ -89,6 +108,29 @@ async def debug_whoami():
     return {"pid": os.getpid(), "msg": "对比 /tmp/getsomehints_debug.log 里的 pid= 可知是否同一进程"}
 
 
+@app.get("/api/debug/tasks")
+async def debug_tasks():
+    """任务存储与保留策略状态：常驻任务数、近似内存、淘汰计数。"""
+    from app.services.task_manager import task_manager
+    return task_manager.get_retention_stats()
+
+
+@app.get("/api/debug/scheduler")
+async def debug_scheduler():
+    """全局爬虫调度状态：各平台运行中/排队数、排队任务数。"""
+    from app.services.scheduler import scheduler
+    return scheduler.stats()
+
+
+@app.get("/api/debug/browser-pool")
+async def debug_browser_pool():
+    """浏览器池状态：各平台常驻上下文与借用数、启动/复用/丢弃/空闲关闭计数，以及登录态验证缓存与账号池。"""
+    from app.crawler.account_pool import account_pool
+    from app.crawler.browser_pool import browser_pool
+    from app.crawler.session_health import session_health
+    return {**browser_pool.get_stats(), "sessions": session_health.get_stats(), "accounts": account_pool.get_stats()}
+
+
 @app.get("/api/config/proxy")
 async def proxy_config_status():
     """代理配置状态（不返回密钥）。"""
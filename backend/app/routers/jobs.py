@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Job broker for remote crawl workers: claim, heartbeat, events and complete over HTTP against the local job queue."""
+import asyncio
+import base64
+import binascii
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+
+from app.config import settings
+from app.schemas import JobClaimRequest, JobCompleteRequest, JobEventRequest, JobHeartbeatRequest
+from app.services.crawler_remote import get_job_queue
+
+
+_LOOPBACK = ("127.0.0.1", "::1", "localhost")
+
+
+def _check_broker(request: Request, authorization: Optional[str] = Header(None)) -> None:
+    """
+    仅 queue 模式下开放。配置了 JOB_BROKER_TOKEN 时校验 Bearer 令牌；未配置时只接受本机（回环地址）的请求，
+    否则任何能访问 API 的客户端都能领取作业或向任务注入结果。
+    """
+    if settings.CRAWLER_WORKER_MODE != "queue":
+        raise HTTPException(status_code=404, detail="job broker disabled (CRAWLER_WORKER_MODE != queue)")
+    token = settings.JOB_BROKER_TOKEN
+    if token:
+        if not hmac.compare_digest(authorization or "", "Bearer %s" % token):
+            raise HTTPException(status_code=401, detail="invalid job broker token")
+        return
+    host = request.client.host if request.client else ""
+    if host not in _LOOPBACK:
+        raise HTTPException(status_code=403, detail="job broker only accepts loopback clients unless JOB_BROKER_TOKEN is set")
+
+
+router = APIRouter(prefix="/jobs", tags=["jobs"], dependencies=[Depends(_check_broker)])
+
+
+@router.post("/claim")
+async def job_claim(body: JobClaimRequest):
+    """领取一个作业；没有可领取的作业时 job 为 null。"""
+    job = await asyncio.to_thread(get_job_queue().claim, body.worker_id, body.platforms, body.lease_sec)
+    return {"job": job}
+
+
+@router.post("/{job_id}/heartbeat")
+async def job_heartbeat(job_id: str, body: JobHeartbeatRequest):
+    ok = await asyncio.to_thread(get_job_queue().heartbeat, job_id, body.worker_id, body.lease_sec)
+    return {"ok": ok}
+
+
+@router.post("/{job_id}/events")
+async def job_event(job_id: str, body: JobEventRequest):
+    try:
+        blob = base64.b64decode(body.blob, validate=True) if body.blob is not None else None
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="blob must be base64")
+    await asyncio.to_thread(get_job_queue().push_event, job_id, body.kind, body.data, blob)
+    return {"ok": True}
+
+
+@router.post("/{job_id}/complete")
+async def job_complete(job_id: str, body: JobCompleteRequest):
+    await asyncio.to_thread(get_job_queue().complete, job_id, body.worker_id, body.error)
+    return {"ok": True}
@@ -2,13 +2,15 @@
 """Search API: start, status, results, stop, comments (match frontend contract)."""
 import asyncio
 import logging
-from typing import List, Optional
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
-from app.schemas import SearchStartRequest, SearchResponse, UnifiedPost, UnifiedComment
+from app.config import settings
+from app.schemas import SearchStartRequest, SearchResponse, SearchResultsPage, UnifiedPost, UnifiedComment
 from app.services.task_manager import task_manager
 from app.services.crawler_runner import start_search_background
+from app.services.scheduler import scheduler
 
 router = APIRouter(prefix="/search", tags=["search"])
 logger = logging.getLogger(__name__)
@@ -22,10 +24,12 @@ async def search_start(body: SearchStartRequest):
     if not body.platforms:
         raise HTTPException(status_code=400, detail="at least one platform required")
 
+    if not scheduler.has_capacity():
+        raise HTTPException(status_code=429, detail="too many queued search tasks, retry later")
+
     logger.info("搜索请求 关键词=%s 平台=%s max_count=%s", body.keywords.strip(), body.platforms, body.max_count or 50)
-    task_id = task_manager.create_task()
-    start_search_background(
-        task_id=task_id,
+    task_id = await task_manager.create_task()
+    params = dict(
         keywords=body.keywords.strip(),
         platforms=body.platforms,
         max_count=body.max_count or 50,
@@ -33,7 +37,11 @@ async def search_start(body: SearchStartRequest):
         enable_sub_comments=body.enable_sub_comments if body.enable_sub_comments is not None else False,
         time_range=body.time_range or "all",
         content_types=body.content_types,
+        priority=body.priority or 0,
     )
+    # 记录参数，任务中断后可经 /resume 从断点继续
+    await task_manager.set_search_params(task_id, params)
+    start_search_background(task_id=task_id, **params)
     # 让出事件循环，确保后台任务已启动
     await asyncio.sleep(0)
     resp = task_manager.get_status_response(task_id) or {}
@@ -44,40 +52,132 @@ async def search_start(body: SearchStartRequest):
         by_platform=resp.get("by_platform", {}),
         progress=resp.get("progress", 0),
         message=resp.get("message", "started"),
+        queue_position=scheduler.queue_position(task_id),
     )
 
 
+async def _etag(task_id: str) -> str:
+    t = await task_manager.get_task(task_id)
+    return f'"{t.version}"' if t else ""
+
+
+async def _not_modified(request: Request, task_id: str, wait: float) -> Optional[Response]:
+    """
+    条件请求：If-None-Match 与当前版本一致时返回 304。
+    带 wait 时先挂起等待版本变化（长轮询），期间有变化则返回 None 由调用方输出新内容。
+    """
+    t = await task_manager.get_task(task_id)
+    if not t:
+        raise HTTPException(status_code=404, detail="task not found")
+    etag = f'"{t.version}"'
+    if request.headers.get("if-none-match") != etag:
+        return None
+    wait = min(wait, settings.SEARCH_LONG_POLL_MAX_SEC)
+    if wait > 0 and not t.finished and await task_manager.wait_for_change(task_id, t.version, wait):
+        return None
+    return Response(status_code=304, headers={"ETag": etag})
+
+
 @router.get("/status/{task_id}", response_model=SearchResponse)
-async def search_status(task_id: str):
-    """Get task status."""
+async def search_status(
+    task_id: str,
+    request: Request,
+    response: Response,
+    wait: float = Query(0, ge=0),
+):
+    """
+    Get task status.
+    响应带 ETag（任务版本号）；If-None-Match 命中返回 304，配合 ?wait=秒 为长轮询。
+    排队中的任务带 queue_position（从 1 开始），位置变化同样递增版本号。
+    """
+    not_modified = await _not_modified(request, task_id, wait)
+    if not_modified is not None:
+        return not_modified
     resp = task_manager.get_status_response(task_id)
     if not resp:
         raise HTTPException(status_code=404, detail="task not found")
-    return SearchResponse(**resp)
+    response.headers["ETag"] = await _etag(task_id)
+    return SearchResponse(**resp, queue_position=scheduler.queue_position(task_id))
 
 
-@router.get("/results/{task_id}", response_model=List[UnifiedPost])
-async def search_results(task_id: str, platform: Optional[str] = None):
-    """Get search results (optionally filter by platform)."""
-    if not task_manager.get_task(task_id):
+@router.get("/results/{task_id}", response_model=Union[SearchResultsPage, List[UnifiedPost]])
+async def search_results(
+    task_id: str,
+    request: Request,
+    platform: Optional[str] = None,
+    since_seq: Optional[int] = Query(None, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    wait: float = Query(0, ge=0),
+):
+    """
+    Get search results (optionally filter by platform).
+    传 since_seq 时为增量游标模式：只返回该序号之后新追加的帖子及 next_seq；不传则返回全量列表。
+    帖子 JSON 在入库时已序列化，这里直接拼接字节返回，不经 response_model 重新校验。
+    ETag / If-None-Match / ?wait= 语义同 status 接口。
+    """
+    not_modified = await _not_modified(request, task_id, wait)
+    if not_modified is not None:
+        return not_modified
+    if since_seq is not None:
+        body = task_manager.get_results_since_json(task_id, since_seq, limit, platform)
+    else:
+        body = task_manager.get_results_json(task_id, platform)
+    if body is None:
         raise HTTPException(status_code=404, detail="task not found")
-    return task_manager.get_results(task_id, platform)
+    return Response(content=body, media_type="application/json", headers={"ETag": await _etag(task_id)})
+
+
+@router.get("/raw/{platform}/{post_id}")
+async def get_raw_payload(platform: str, post_id: str):
+    """按需获取帖子的原始平台数据（raw_aweme / raw_note），结果列表中只带 platform_data.has_raw 标记。"""
+    from app.services.raw_store import raw_store
+    payload = raw_store.get(platform, post_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="raw payload not found")
+    return payload
 
 
 @router.post("/stop/{task_id}")
 async def search_stop(task_id: str):
-    """Request stop for the task."""
-    if not task_manager.get_task(task_id):
+    """Request stop for the task. 仍在排队（未启动任何平台）的任务直接取消。"""
+    if not await task_manager.get_task(task_id):
         raise HTTPException(status_code=404, detail="task not found")
     task_manager.request_stop(task_id)
+    if scheduler.cancel_if_queued(task_id):
+        # 让出事件循环，使取消后的 set_stopped 先于响应生效
+        await asyncio.sleep(0)
     resp = task_manager.get_status_response(task_id) or {}
     return {"status": "ok", "task_id": task_id, **resp}
 
 
+@router.post("/resume/{task_id}", response_model=SearchResponse)
+async def search_resume(task_id: str):
+    """
+    从断点继续已结束（停止 / 失败 / 超时 / 服务重启中断）的任务：沿用原搜索参数，
+    各平台 × 关键词从上次交出的页之后继续，已抓到的帖子不再拉详情与评论，结果追加到同一任务。
+    """
+    t = await task_manager.get_task(task_id)
+    if not t:
+        raise HTTPException(status_code=404, detail="task not found")
+    if not t.finished:
+        raise HTTPException(status_code=409, detail="task is still running")
+    if not t.search_params:
+        raise HTTPException(status_code=400, detail="task has no resumable checkpoint")
+    if not scheduler.has_capacity():
+        raise HTTPException(status_code=429, detail="too many queued search tasks, retry later")
+    if not await task_manager.prepare_resume(task_id):
+        raise HTTPException(status_code=409, detail="task is still running")
+    logger.info("恢复搜索 task_id=%s 关键词=%s", task_id[:8], t.search_params.get("keywords"))
+    start_search_background(task_id=task_id, **t.search_params)
+    await asyncio.sleep(0)
+    resp = task_manager.get_status_response(task_id) or {}
+    return SearchResponse(**resp, queue_position=scheduler.queue_position(task_id))
+
+
 @router.get("/comments/{platform}/{post_id}", response_model=List[UnifiedComment])
 async def get_post_comments(platform: str, post_id: str, task_id: Optional[str] = None):
     """Get comments for a post. May use task_id for cached comments."""
-    if task_id and task_manager.get_task(task_id):
+    if task_id and await task_manager.get_task(task_id):
         cached = task_manager.get_cached_comments(task_id, platform, post_id)
         if cached is not None:
             return cached
@@ -89,5 +189,5 @@ async def get_post_comments(platform: str, post_id: str, task_id: Optional[str]
     crawler = crawler_cls()
     comments = await crawler.get_comments(platform, post_id, max_count=20, enable_sub=False)
     if task_id and comments:
-        task_manager.cache_comments(task_id, platform, post_id, comments)
+        await task_manager.cache_comments(task_id, platform, post_id, comments)
     return comments
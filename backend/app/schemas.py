@@ -18,6 +18,7 @@ class SearchStartRequest(BaseModel):
     sort_type: Optional[str] = None
     time_range: Optional[str] = "all"  # all, 1day, 1week, 1month, 3months, 6months
     content_types: Optional[List[str]] = None  # video, image_text, link
+    priority: Optional[int] = 0  # 调度优先级，越大越先拿到平台槽位；同级先到先得
 
 
 class UnifiedAuthor(BaseModel):
@@ -61,6 +62,14 @@ class UnifiedComment(BaseModel):
     sub_comment_count: int = 0
 
 
+class SearchResultsPage(BaseModel):
+    """GET /api/search/results/{task_id}?since_seq= 增量响应：只含 since_seq 之后新追加的帖子。"""
+    items: List[UnifiedPost] = Field(default_factory=list)
+    next_seq: int = 0  # 下次轮询传入的 since_seq
+    has_more: bool = False  # 受 limit 截断时为 True，可立即再取
+    total: int = 0  # 任务当前结果总数
+
+
 class SearchResponse(BaseModel):
     """Search status/start response."""
     task_id: str
@@ -69,6 +78,7 @@ class SearchResponse(BaseModel):
     by_platform: Dict[str, int] = Field(default_factory=dict)
     progress: Optional[int] = None
     message: str = ""
+    queue_position: Optional[int] = None  # 排队中时从 1 开始，运行/结束后为 None
 
 
 # --- LLM Leads Analysis API ---
@@ -116,3 +126,29 @@ class LlmLeadsResult(BaseModel):
     potential_buyers: List[PotentialBuyer] = Field(default_factory=list)
     contacts_summary: List[ContactSummary] = Field(default_factory=list)
     analysis_summary: Optional[str] = None
+
+
+class JobClaimRequest(BaseModel):
+    """POST /api/jobs/claim body（worker 经作业代理领取作业）."""
+    worker_id: str
+    platforms: List[str]
+    lease_sec: float
+
+
+class JobHeartbeatRequest(BaseModel):
+    """POST /api/jobs/{job_id}/heartbeat body."""
+    worker_id: str
+    lease_sec: float
+
+
+class JobEventRequest(BaseModel):
+    """POST /api/jobs/{job_id}/events body；blob 为 base64 编码的二进制附件（原始数据）."""
+    kind: str
+    data: str
+    blob: Optional[str] = None
+
+
+class JobCompleteRequest(BaseModel):
+    """POST /api/jobs/{job_id}/complete body."""
+    worker_id: str
+    error: Optional[str] = None
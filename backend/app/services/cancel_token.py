@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Thread-safe cancellation token with an optional deadline, shared between the main loop and crawler threads."""
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CrawlCancelled(Exception):
+    """爬取被停止（timed_out=True 表示到达单平台截止时间）。"""
+
+    def __init__(self, timed_out: bool = False) -> None:
+        super().__init__("crawl deadline exceeded" if timed_out else "crawl cancelled")
+        self.timed_out = timed_out
+
+
+class CancelToken:
+    """
+    主循环 cancel()（或 should_stop() 返回 True、或超过 deadline）后，爬虫线程在翻页、拉详情、拉评论前
+    调用 raise_if_cancelled() 即停止。deadline 为 time.monotonic() 时间点。
+    """
+
+    def __init__(self, deadline: Optional[float] = None, should_stop: Optional[Callable[[], bool]] = None) -> None:
+        self._event = threading.Event()
+        self.deadline = deadline
+        self._should_stop = should_stop
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set() or self.expired:
+            return True
+        if self._should_stop is not None and self._should_stop():
+            self._event.set()
+            return True
+        return False
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise CrawlCancelled(timed_out=self.expired)
+
+
+async def run_cancellable(aw: Awaitable[T], token: Optional[CancelToken], grace: float = 3.0, poll: float = 0.5) -> T:
+    """
+    在爬虫线程的事件循环中运行 aw，并看守 token：取消后先留 grace 秒让协作检查点正常收尾，
+    仍未结束则直接 cancel（退出 async_playwright 上下文即关闭浏览器），抛出 CrawlCancelled。
+    """
+    task = asyncio.ensure_future(aw)
+    if token is None:
+        return await task
+    cancelled_at: Optional[float] = None
+    while not task.done():
+        await asyncio.wait({task}, timeout=poll)
+        if task.done() or not token.cancelled:
+            continue
+        now = time.monotonic()
+        if cancelled_at is None:
+            cancelled_at = now
+        elif now - cancelled_at >= grace:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+            raise CrawlCancelled(timed_out=token.expired)
+    return task.result()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Per-platform crawl checkpoint: keyword → page / search_id / processed post ids, saved after every delivered page."""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+# (keyword, state) -> 持久化；流式模式下由 sink.checkpoint 提供，排在同一页帖子写入之后
+SaveCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class CrawlCheckpoint:
+    """
+    单平台一次爬取的断点。每个关键词一条状态：
+    page（下一次请求的页码，平台自身语义）、search_id（平台搜索会话 id）、ids（已交出详情与评论的帖子 id）、
+    done（该关键词已结束：配额满或没有更多结果）。爬虫每交出一页后 save；恢复时从 page 继续，ids 内的帖子不再拉详情和评论。
+    """
+
+    def __init__(self, keywords: Optional[Dict[str, Dict[str, Any]]] = None, on_save: Optional[SaveCallback] = None) -> None:
+        self._keywords: Dict[str, Dict[str, Any]] = {k: dict(v) for k, v in (keywords or {}).items()}
+        self._on_save = on_save
+
+    @property
+    def state(self) -> Dict[str, Dict[str, Any]]:
+        return {k: dict(v) for k, v in self._keywords.items()}
+
+    def get(self, keyword: str) -> Dict[str, Any]:
+        """该关键词的断点（副本），无断点时为空 dict。"""
+        return dict(self._keywords.get(keyword) or {})
+
+    def processed_ids(self) -> Set[str]:
+        return {i for st in self._keywords.values() for i in st.get("ids") or ()}
+
+    async def save(self, keyword: str, page: int, search_id: str, new_ids: List[str], done: bool = False) -> None:
+        st = self._keywords.setdefault(keyword, {})
+        st["page"] = page
+        st["search_id"] = search_id
+        st["ids"] = list(st.get("ids") or []) + [i for i in new_ids if i]
+        st["done"] = done
+        if self._on_save is not None:
+            await self._on_save(keyword, dict(st))
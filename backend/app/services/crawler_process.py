@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""Optional process isolation for platform crawls: each run in a spawned worker process, streaming results over IPC."""
+import asyncio
+import logging
+import multiprocessing as mp
+import queue
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.crawler import browser_watchdog
+from app.schemas import UnifiedPost
+from app.services.cancel_token import CancelToken
+from app.services.checkpoint import CrawlCheckpoint
+from app.services.result_sink import ResultSink
+
+logger = logging.getLogger(__name__)
+
+# 子进程收到停止/超时后留给它收尾（关闭浏览器、交出最后一页）的时间，超过即强制结束
+_EXIT_GRACE_SEC = 15.0
+# 除结果页外，IPC 队列为日志消息预留的容量
+_LOG_HEADROOM = 256
+
+# spawn：子进程不继承主进程的事件循环、线程与 Playwright 状态，各平台均可用
+_ctx = mp.get_context("spawn")
+
+
+class _QueueSink:
+    """
+    子进程内替代 ResultSink：每页帖子序列化为 JSON，连同原始数据 blob 一起发回主进程。
+    队列有上限，主进程来不及写入时 publish 等待（背压）。
+    """
+
+    def __init__(self, q, limit: int) -> None:
+        self._q = q
+        self._limit = limit
+        self.count = 0
+
+    async def publish(self, posts: List[UnifiedPost]) -> None:
+        from app.services.raw_store import raw_keys, raw_store
+
+        if self._limit > 0:
+            keep = max(0, self._limit - self.count)
+            # 超出条数上限被截掉的帖子不会发回主进程，其原始数据随之丢弃（含已写入磁盘的）
+            for platform, post_id in raw_keys(posts[keep:]):
+                raw_store.pop_blob(platform, post_id)
+            posts = posts[:keep]
+        if not posts:
+            return
+        self.count += len(posts)
+        blobs: List[Tuple[str, str, bytes]] = []
+        for p in posts:
+            if p.platform_data.get("has_raw"):
+                blob = raw_store.pop_blob(p.platform, p.post_id)
+                if blob is not None:
+                    blobs.append((p.platform, p.post_id, blob))
+        msg = ("posts", [p.model_dump_json() for p in posts], blobs)
+        await asyncio.to_thread(self._q.put, msg)
+
+    async def checkpoint(self, keyword: str, state: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._q.put, ("checkpoint", keyword, state))
+
+    def drain(self, timeout: float = 60.0) -> None:
+        """结果已在 publish 时交给队列，这里无需等待。"""
+
+
+def _child_main(
+    platform: str, args: tuple, q, stop_event, timeout_sec: float, limit: int, resume_state: Dict[str, Dict[str, Any]]
+) -> None:
+    """子进程入口：运行平台适配器 run_search_sync（流式模式），日志、结果与结束状态经 q 发回。"""
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s %(message)s")
+    logging.getLogger("app").setLevel(logging.INFO)
+    from app.crawler.browser_pool import browser_pool
+    from app.crawler.registry import get_crawler
+    from app.services.ws_broadcast import set_log_forwarder
+
+    # 子进程只跑一次爬取，常驻浏览器池没有意义
+    browser_pool.disable()
+
+    set_log_forwarder(lambda item: q.put(("log", item)))
+    token = CancelToken(deadline=time.monotonic() + timeout_sec, should_stop=stop_event.is_set)
+    try:
+        crawler_cls = get_crawler(platform)
+        sink = _QueueSink(q, limit)
+        checkpoint = CrawlCheckpoint(resume_state, on_save=sink.checkpoint)
+        crawler_cls.run_search_sync(*args, sink=sink, cancel_token=token, checkpoint=checkpoint)
+        q.put(("done", None))
+    except BaseException as e:
+        q.put(("error", str(e) or type(e).__name__))
+
+
+def run_search_in_process(
+    platform: str,
+    args: tuple,
+    sink: ResultSink,
+    cancel_token: CancelToken,
+    limit: int,
+    resume_state: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[UnifiedPost]:
+    """
+    在调用线程中阻塞运行（由 crawler_runner 经 asyncio.to_thread 调用）：启动子进程执行 run_search_sync(*args)，
+    把收到的结果页与断点经 sink 写入任务、日志转发到 WebSocket，返回空列表（与流式适配器一致）。
+    停止/超时先通知子进程协作收尾，超过 _EXIT_GRACE_SEC 仍未退出则强制结束；子进程崩溃只影响本平台。
+    """
+    from app.services.raw_store import raw_store
+    from app.services.ws_broadcast import push_log_sync
+
+    q = _ctx.Queue(maxsize=max(1, settings.RESULT_SINK_MAX_PENDING) + _LOG_HEADROOM)
+    stop_event = _ctx.Event()
+    if cancel_token.deadline is not None:
+        timeout_sec = max(1.0, cancel_token.deadline - time.monotonic())
+    else:
+        timeout_sec = float(settings.CRAWLER_PLATFORM_TIMEOUT_SEC)
+    proc = _ctx.Process(
+        target=_child_main,
+        args=(platform, args, q, stop_event, timeout_sec, limit, resume_state or {}),
+        name=f"crawler-{platform}",
+        daemon=True,
+    )
+    proc.start()
+    logger.info("[CrawlerProcess] platform=%s pid=%s started", platform, proc.pid)
+
+    loop = asyncio.new_event_loop()
+    kill_at: Optional[float] = None
+    error: Optional[str] = None
+    killed = False
+    try:
+        while True:
+            if kill_at is None and cancel_token.cancelled:
+                stop_event.set()
+                kill_at = time.monotonic() + _EXIT_GRACE_SEC
+            try:
+                kind, *payload = q.get(timeout=0.5)
+            except queue.Empty:
+                if not proc.is_alive():
+                    error = "爬虫进程异常退出（exitcode=%s）" % proc.exitcode
+                    break
+                if kill_at is not None and time.monotonic() >= kill_at:
+                    logger.warning("[CrawlerProcess] platform=%s pid=%s did not exit, killing", platform, proc.pid)
+                    proc.kill()
+                    killed = True
+                    break
+                continue
+            if kind == "posts":
+                jsons, blobs = payload
+                for blob_platform, post_id, blob in blobs:
+                    raw_store.put_blob(blob_platform, post_id, blob)
+                loop.run_until_complete(sink.publish([UnifiedPost.model_validate_json(j) for j in jsons]))
+            elif kind == "checkpoint":
+                loop.run_until_complete(sink.checkpoint(*payload))
+            elif kind == "log":
+                push_log_sync(*payload[0])
+            else:
+                if kind == "error":
+                    error = payload[0]
+                break
+    finally:
+        loop.close()
+        proc.join(timeout=5)
+        if proc.is_alive():
+            proc.kill()
+            proc.join(timeout=5)
+        q.close()
+        logger.info("[CrawlerProcess] platform=%s pid=%s exited code=%s", platform, proc.pid, proc.exitcode)
+        if proc.exitcode:
+            # 子进程被强杀 / 崩溃时其 Playwright 驱动与浏览器可能残留
+            browser_watchdog.reap_orphans()
+
+    sink.drain()
+    if killed and cancel_token.expired:
+        raise RuntimeError("搜索超时，已保留 %d 条" % sink.count)
+    if error and not killed:
+        raise RuntimeError(error)
+    return []
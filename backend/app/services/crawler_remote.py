@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Queue mode: the API enqueues per-keyword crawl jobs and streams results back from remote workers (app.worker)."""
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.schemas import UnifiedPost
+from app.services.cancel_token import CancelToken
+from app.services.job_queue import FINISHED, JobQueue, create_job_queue
+from app.services.result_sink import ResultSink
+
+logger = logging.getLogger(__name__)
+
+# 停止/超时后等待 worker 收尾并交回最后一批事件的时间
+_CANCEL_GRACE_SEC = 15.0
+_POLL_SEC = 0.5
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = create_job_queue()
+        return _queue
+
+
+def run_search_via_queue(
+    task_id: str,
+    platform: str,
+    args: tuple,
+    sink: ResultSink,
+    cancel_token: CancelToken,
+    priority: int = 0,
+    resume_state: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[UnifiedPost]:
+    """
+    在调用线程中阻塞运行（由 crawler_runner 经 asyncio.to_thread 调用）：把 run_search_sync(*args) 按逗号分隔的关键词
+    拆成若干作业入队（每个关键词配额 ceil(条数/关键词数)），轮询作业事件，把结果与断点经 sink 写入任务、日志转发到 WebSocket。
+    resume_state 为该平台的断点，随作业下发；已完成的关键词不再入队。
+    返回空列表（与流式适配器一致）；全部作业失败时抛出第一个错误。
+    """
+    from app.services.raw_store import raw_store
+    from app.services.ws_broadcast import push_log_sync
+
+    keywords, limit, enable_comments, max_comments_per_note, time_range, content_types = args
+    words = list(dict.fromkeys(k.strip() for k in (keywords or "").split(",") if k.strip())) or [keywords]
+    budget = -(-max(1, limit) // len(words))
+    if cancel_token.deadline is not None:
+        timeout_sec = max(1.0, cancel_token.deadline - time.monotonic())
+    else:
+        timeout_sec = float(settings.CRAWLER_PLATFORM_TIMEOUT_SEC)
+
+    resume_state = resume_state or {}
+    words = [w for w in words if not (resume_state.get(w) or {}).get("done")]
+    if not words:
+        return []
+    q = get_job_queue()
+    job_ids = [
+        q.enqueue(
+            task_id,
+            platform,
+            {
+                "keywords": word,
+                "max_count": budget,
+                "enable_comments": enable_comments,
+                "max_comments_per_note": max_comments_per_note,
+                "time_range": time_range,
+                "content_types": content_types,
+                "timeout_sec": timeout_sec,
+                # 整个平台的断点：含其他关键词已处理的帖子 id，用于跨关键词去重
+                "checkpoint": resume_state,
+            },
+            priority=priority,
+        )
+        for word in words
+    ]
+    logger.info("[CrawlerRemote] task_id=%s platform=%s enqueued %d job(s)", task_id[:8], platform, len(job_ids))
+
+    loop = asyncio.new_event_loop()
+    after_id = 0
+    cancelled_at: Optional[float] = None
+    try:
+        while True:
+            if cancelled_at is None and cancel_token.cancelled:
+                q.cancel(job_ids)
+                cancelled_at = time.monotonic()
+            events = q.fetch_events(job_ids, after_id)
+            for event_id, _job_id, kind, data, blob in events:
+                after_id = event_id
+                if kind == "raw" and blob is not None:
+                    blob_platform, post_id = json.loads(data)
+                    raw_store.put_blob(blob_platform, post_id, blob)
+                elif kind == "posts":
+                    posts = [UnifiedPost.model_validate(p) for p in json.loads(data)]
+                    loop.run_until_complete(sink.publish(posts))
+                elif kind == "checkpoint":
+                    loop.run_until_complete(sink.checkpoint(*json.loads(data)))
+                elif kind == "log":
+                    push_log_sync(*json.loads(data))
+            if events:
+                q.ack_events(job_ids, after_id)
+                continue
+            statuses = q.statuses(job_ids)
+            if all(status in FINISHED for status, _ in statuses.values()):
+                # 作业结束后可能还有刚写入的事件，再读一轮为空才退出
+                if not q.fetch_events(job_ids, after_id, limit=1):
+                    break
+                continue
+            # 取消后执行中的作业为 cancelling（未结束）：等 worker 交回最后一批结果并 complete，最多等宽限时间
+            if cancelled_at is not None and time.monotonic() - cancelled_at >= _CANCEL_GRACE_SEC:
+                logger.warning("[CrawlerRemote] task_id=%s platform=%s workers did not finish after cancel", task_id[:8], platform)
+                break
+            time.sleep(_POLL_SEC)
+        statuses = q.statuses(job_ids)
+    finally:
+        loop.close()
+        # 作业行与未消费的事件不再需要；仍在收尾的 worker 续租失败后停止，之后的事件被队列拒收
+        try:
+            q.purge(job_ids)
+        except Exception as e:
+            logger.warning("[CrawlerRemote] purge jobs failed: %s", e)
+
+    sink.drain()
+    if cancel_token.expired:
+        raise RuntimeError("搜索超时，已保留 %d 条" % sink.count)
+    errors = [error for status, error in statuses.values() if status == "failed"]
+    if errors and len(errors) == len(job_ids):
+        raise RuntimeError(errors[0] or "worker failed")
+    if errors:
+        push_log_sync("%d 个关键词作业失败：%s" % (len(errors), errors[0]), "error", platform)
+    return []
@@ -2,16 +2,77 @@
 """Runs crawlers per platform and updates task state."""
 import asyncio
 import logging
-from typing import List
+import time
+from typing import Dict, List, Optional
 
 from app.config import settings
+from app.schemas import UnifiedPost
+from app.services.cancel_token import CancelToken
+from app.services.checkpoint import CrawlCheckpoint
+from app.services.result_sink import ResultSink
+from app.services.scheduler import scheduler
 from app.services.task_manager import task_manager
-from app.services.ws_broadcast import broadcast, drain_pending_logs
+from app.services.ws_broadcast import broadcast, ensure_log_dispatcher
 
 logger = logging.getLogger(__name__)
 
 PLATFORM_LABEL = {"dy": "抖音", "xhs": "小红书"}
 
+# 单平台搜索超时（秒），避免 MC 浏览器/登录卡住导致任务一直 running
+SEARCH_TIMEOUT = settings.CRAWLER_PLATFORM_TIMEOUT_SEC
+
+
+async def _crawl_platform(
+    crawler_cls,
+    platform: str,
+    keywords: str,
+    max_count: int,
+    enable_comments: bool,
+    time_range: str,
+    content_types: List[str],
+    proxy_pool,
+    sink: ResultSink,
+    cancel_token: CancelToken,
+    task_id: str = "",
+    priority: int = 0,
+    checkpoint: Optional[CrawlCheckpoint] = None,
+) -> List[UnifiedPost]:
+    """运行单个平台的爬虫，返回未经 sink 推送的 UnifiedPost 列表。"""
+    limit = min(max_count, settings.CRAWLER_MAX_NOTES_COUNT)
+    run_sync = getattr(crawler_cls, "run_search_sync", None)
+    if callable(run_sync):
+        # 使用平台适配器：dy/xhs 等在独立线程中运行，每页结果经 sink 即时写入任务，返回空列表；
+        # 停止与超时由 cancel_token 在爬虫线程内协作检查，超过截止时间关闭浏览器
+        args = (keywords, limit, enable_comments, 20 if enable_comments else 0, time_range, content_types)
+        checkpoint = checkpoint or CrawlCheckpoint(on_save=sink.checkpoint)
+        if settings.CRAWLER_WORKER_MODE == "process":
+            # 子进程模式：浏览器与解析在独立进程中运行，本线程只负责转发结果与日志
+            from app.services.crawler_process import run_search_in_process
+            return await asyncio.to_thread(
+                run_search_in_process, platform, args, sink, cancel_token, limit, checkpoint.state
+            )
+        if settings.CRAWLER_WORKER_MODE == "queue":
+            # 队列模式：按关键词拆成作业交给独立 worker（python -m app.worker），本线程只负责转发结果与日志
+            from app.services.crawler_remote import run_search_via_queue
+            return await asyncio.to_thread(
+                run_search_via_queue, task_id, platform, args, sink, cancel_token, priority, checkpoint.state
+            )
+        return await asyncio.to_thread(run_sync, *args, sink=sink, cancel_token=cancel_token, checkpoint=checkpoint)
+    crawler = crawler_cls(proxy_pool=proxy_pool)
+    try:
+        return await asyncio.wait_for(
+            crawler.search(
+                keywords=keywords,
+                max_count=limit,
+                time_range=time_range,
+                content_types=content_types,
+            ),
+            timeout=SEARCH_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("[Crawler] platform=%s search timeout after %ss", platform, SEARCH_TIMEOUT)
+        raise RuntimeError(f"平台 {platform} 搜索超时（{SEARCH_TIMEOUT}秒），请检查浏览器/登录是否卡住")
+
 
 async def run_search_task(
     task_id: str,
@@ -22,20 +83,22 @@ async def run_search_task(
     enable_sub_comments: bool = False,
     time_range: str = "all",
     content_types: List[str] | None = None,
+    priority: int = 0,
 ) -> None:
     """
     Background task: run crawlers for each platform, update task_manager.
-    Serial execution (MAX_CONCURRENCY_NUM=1). Current crawlers are stubs (no Playwright).
+    各平台并发执行（同时运行的平台数上限 MAX_PLATFORM_CONCURRENCY），
+    每个平台还需从全局调度器拿到槽位，拿到第一个槽位前任务保持 pending（排队中）。
+    进度按已结束的平台数计算，单个平台失败不影响其他平台。
     """
-    await task_manager.set_running(task_id)
+    # 爬虫线程的日志经 push_log_sync 直接投递到主循环，由常驻 dispatcher 推送（应用启动时已启动，这里兜底）
+    ensure_log_dispatcher()
     platform_names = "、".join(PLATFORM_LABEL.get(p, p) for p in platforms)
     await broadcast("搜索开始：关键词「%s」 平台 %s" % (keywords, platform_names), "info")
     logger.info("搜索开始 task_id=%s 关键词=%s 平台=%s max_count=%d", task_id[:8], keywords, platforms, max_count)
-    total = 0
-    by_platform: dict = {p: 0 for p in platforms}
-
-    # 单平台搜索超时（秒），避免 MC 浏览器/登录卡住导致任务一直 running
-    SEARCH_TIMEOUT = 600
+    # 恢复的任务从已有条数起算
+    by_platform: dict = {p: task_manager.platform_result_count(task_id, p) for p in platforms}
+    content_types = content_types or ["video", "image_text", "link"]
 
     proxy_pool = None
     if settings.ENABLE_IP_PROXY:
@@ -50,94 +113,105 @@ async def run_search_task(
             logger.warning("[Crawler] proxy pool failed: %s, continuing without proxy", e)
             proxy_pool = None
 
-    consecutive_failures = 0
+    # 每个平台的结果：pending -> running -> done | failed | skipped
+    platform_state: Dict[str, str] = {p: "pending" for p in platforms}
     max_failures_before_skip = 3
+    semaphore = asyncio.Semaphore(max(1, settings.MAX_PLATFORM_CONCURRENCY))
 
-    try:
-        for platform in platforms:
-            if task_manager.is_stop_requested(task_id):
-                await task_manager.set_stopped(task_id)
-                return
+    loop = asyncio.get_running_loop()
+
+    async def run_platform(platform: str) -> None:
+        platform_label = PLATFORM_LABEL.get(platform, platform)
+        # 断点续爬：上次已写入的条数计入配额，关键词从断点页继续
+        base = by_platform[platform]
+        resume_state = await task_manager.get_checkpoints(task_id, platform)
+        remaining = min(max_count, settings.CRAWLER_MAX_NOTES_COUNT) - base
 
+        async def deliver(posts: List[UnifiedPost]) -> None:
+            # 爬虫线程每页推送一次：立即入库并刷新 total_found，前端几秒内可见
+            await task_manager.append_results(task_id, posts)
+            by_platform[platform] = base + sink.count
+            await task_manager.set_progress(task_id, task_manager.result_count(task_id), by_platform, progress=-1)
+
+        async def save_checkpoint(keyword: str, state: dict) -> None:
+            await task_manager.save_checkpoint(task_id, platform, keyword, state)
+
+        sink = ResultSink(
+            loop,
+            deliver,
+            max_pending=settings.RESULT_SINK_MAX_PENDING,
+            limit=max(1, remaining),
+            on_checkpoint=save_checkpoint,
+        )
+        async with semaphore, scheduler.slot(platform, task_id, priority):
+            t = await task_manager.get_task(task_id)
+            if t and t.status == "pending":
+                await task_manager.set_running(task_id)
+            failures = sum(1 for v in platform_state.values() if v == "failed")
+            if task_manager.is_stop_requested(task_id) or failures >= max_failures_before_skip:
+                platform_state[platform] = "skipped"
+                return
+            if resume_state and remaining <= 0:
+                # 恢复的任务中该平台上次已抓满
+                platform_state[platform] = "done"
+                return
+            platform_state[platform] = "running"
+            # 停止请求与单平台截止时间（从拿到槽位起算）
+            cancel_token = CancelToken(
+                deadline=time.monotonic() + SEARCH_TIMEOUT,
+                should_stop=lambda: task_manager.is_stop_requested(task_id),
+            )
             try:
                 from app.crawler.registry import get_crawler
                 crawler_cls = get_crawler(platform)
                 if crawler_cls:
-                    platform_label = PLATFORM_LABEL.get(platform, platform)
                     await broadcast(f"开始爬取 {platform_label}...", "info", platform=platform_label)
                     logger.info("开始爬取 %s…", platform_label)
-                    posts = []
-                    run_sync = getattr(crawler_cls, "run_search_sync", None)
-                    if callable(run_sync):
-                        # 使用平台适配器：dy/xhs 等在独立线程中运行，返回已挂评论的 UnifiedPost
-                        limit = min(max_count, settings.CRAWLER_MAX_NOTES_COUNT)
-                        task = asyncio.create_task(
-                            asyncio.to_thread(
-                                run_sync,
-                                keywords,
-                                limit,
-                                enable_comments,
-                                20 if enable_comments else 0,
-                                time_range,
-                                content_types or ["video", "image_text", "link"],
-                            )
-                        )
-                        while not task.done():
-                            for item in drain_pending_logs():
-                                msg, level, plat = item[0], item[1], item[2]
-                                rid = item[3] if len(item) > 3 else None
-                                await broadcast(msg, level, plat, rid)
-                            await asyncio.sleep(0.4)
-                        posts = task.result()
-                    else:
-                        crawler = crawler_cls(proxy_pool=proxy_pool)
-                        try:
-                            posts = await asyncio.wait_for(
-                                crawler.search(
-                                    keywords=keywords,
-                                    max_count=min(max_count, settings.CRAWLER_MAX_NOTES_COUNT),
-                                    time_range=time_range,
-                                    content_types=content_types or ["video", "image_text", "link"],
-                                ),
-                                timeout=SEARCH_TIMEOUT,
-                            )
-                        except asyncio.TimeoutError:
-                            logger.warning("[Crawler] platform=%s search timeout after %ss", platform, SEARCH_TIMEOUT)
-                            raise RuntimeError(f"平台 {platform} 搜索超时（{SEARCH_TIMEOUT}秒），请检查浏览器/登录是否卡住")
+                    posts = await _crawl_platform(
+                        crawler_cls, platform, keywords, max_count, enable_comments,
+                        time_range, content_types, proxy_pool, sink, cancel_token,
+                        task_id=task_id, priority=priority,
+                        checkpoint=CrawlCheckpoint(resume_state, on_save=sink.checkpoint),
+                    )
                     if posts:
                         await task_manager.append_results(task_id, posts)
-                        count = len(posts)
+                    count = base + sink.count + len(posts)
+                    if count:
                         by_platform[platform] = count
-                        total += count
                         await broadcast(f"{platform_label} 已获取 {count} 条", "success", platform=platform_label)
                         logger.info("%s 已获取 %d 条", platform_label, count)
                     else:
                         await broadcast(f"{platform_label} 本页无新结果", "info", platform=platform_label)
                         logger.info("%s 本页无新结果", platform_label)
-                    consecutive_failures = 0
-                else:
-                    pass
-                idx = platforms.index(platform) + 1
-                progress = int(100 * idx / len(platforms)) if platforms else 0
-                # 使用去重后的实际条数作为 total_found，与前端「本页结果」一致
-                actual_total = len(task_manager.get_results(task_id))
-                await task_manager.set_progress(task_id, actual_total, by_platform, progress=progress)
+                platform_state[platform] = "done"
+            except asyncio.CancelledError:
+                cancel_token.cancel()
+                raise
             except Exception as e:
                 logger.exception("[Crawler] platform %s failed: %s", platform, e)
-                platform_label = PLATFORM_LABEL.get(platform, platform)
                 await broadcast("%s 爬取失败: %s" % (platform_label, e), "error", platform=platform_label)
                 logger.warning("%s 爬取失败: %s", platform_label, e)
-                consecutive_failures += 1
+                platform_state[platform] = "failed"
                 if proxy_pool:
                     proxy_pool.invalidate_current()
-                by_platform[platform] = 0
-                actual_total = len(task_manager.get_results(task_id))
-                await task_manager.set_progress(task_id, actual_total, by_platform)
-                if consecutive_failures >= max_failures_before_skip:
-                    break
-
-        actual_total = len(task_manager.get_results(task_id))
-        await task_manager.set_completed(task_id, actual_total, by_platform)
+                # 失败前已流式写入的结果保留在任务中
+                by_platform[platform] = base + sink.count
+            finished = sum(1 for v in platform_state.values() if v in ("done", "failed", "skipped"))
+            progress = int(100 * finished / len(platforms)) if platforms else 0
+            # 使用去重后的实际条数作为 total_found，与前端「本页结果」一致
+            actual_total = task_manager.result_count(task_id)
+            await task_manager.set_progress(task_id, actual_total, by_platform, progress=progress)
+
+    try:
+        await asyncio.gather(*(run_platform(p) for p in platforms))
+
+        if task_manager.is_stop_requested(task_id):
+            await task_manager.set_stopped(task_id)
+            return
+        actual_total = task_manager.result_count(task_id)
+        failed = [PLATFORM_LABEL.get(p, p) for p, v in platform_state.items() if v == "failed"]
+        message = "completed" if not failed else "completed（失败平台：%s）" % "、".join(failed)
+        await task_manager.set_completed(task_id, actual_total, by_platform, message=message)
         await broadcast("爬取结束，共 %d 条" % actual_total, "success")
         logger.info("爬取结束 task_id=%s 共 %d 条 %s", task_id[:8], actual_total, by_platform)
     except asyncio.CancelledError:
@@ -157,9 +231,11 @@ def start_search_background(
     enable_sub_comments: bool = False,
     time_range: str = "all",
     content_types: List[str] | None = None,
+    priority: int = 0,
 ) -> asyncio.Task:
-    """Start run_search_task in background; return the asyncio Task."""
-    return asyncio.create_task(
+    """Submit run_search_task to the scheduler; return the asyncio Task. 排队已满时抛出 SchedulerFull。"""
+    return scheduler.submit(
+        task_id,
         run_search_task(
             task_id=task_id,
             keywords=keywords,
@@ -169,5 +245,6 @@ def start_search_background(
             enable_sub_comments=enable_sub_comments,
             time_range=time_range or "all",
             content_types=content_types,
-        )
+            priority=priority,
+        ),
     )
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""Pluggable crawl job queue shared by the API (producer) and standalone crawl workers (app.worker)."""
+import base64
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 已结束的 job 状态；执行中的作业被取消时先进入 cancelling，worker 收尾 complete 后才变为 cancelled
+FINISHED = ("done", "failed", "cancelled")
+
+
+class JobSource(ABC):
+    """worker 侧的作业队列接口：claim 作业、续租、上报事件（posts / raw / log）并 complete。"""
+
+    @abstractmethod
+    def claim(self, worker_id: str, platforms: List[str], lease_sec: float) -> Optional[Dict[str, Any]]:
+        """领取一个排队中（或租约过期）的作业，返回 {job_id, task_id, platform, params, attempts} 或 None。"""
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str, lease_sec: float) -> bool:
+        """续租；返回 False 表示作业已被取消或不再属于该 worker，worker 应尽快停止。"""
+
+    @abstractmethod
+    def push_event(self, job_id: str, kind: str, data: str, blob: Optional[bytes] = None) -> None:
+        """worker 上报一个事件（posts / raw / log / checkpoint），blob 为可选的二进制附件。"""
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, error: Optional[str] = None) -> None:
+        """作业结束；error 非空时标记为失败。"""
+
+    def close(self) -> None:
+        """释放连接等资源。"""
+
+
+class JobQueue(JobSource):
+    """
+    爬取作业队列。API 端按平台 × 关键词 enqueue 作业并读取事件流；worker 端经 JobSource 接口领取执行。
+    worker 失联（租约过期）的作业会被其他 worker 重新领取。
+    """
+
+    @abstractmethod
+    def enqueue(self, task_id: str, platform: str, params: Dict[str, Any], priority: int = 0) -> str:
+        """写入一个排队中的作业，返回 job_id。"""
+
+    @abstractmethod
+    def fetch_events(self, job_ids: List[str], after_id: int, limit: int = 500) -> List[Tuple[int, str, str, str, Optional[bytes]]]:
+        """返回 id > after_id 的事件 [(id, job_id, kind, data, blob)]，按 id 升序。"""
+
+    def ack_events(self, job_ids: List[str], upto_id: int) -> None:
+        """删除已消费的事件。"""
+
+    @abstractmethod
+    def cancel(self, job_ids: List[str]) -> None:
+        """取消作业：排队中的直接取消，执行中的进入 cancelling，由 worker 交回已抓到的结果后 complete。"""
+
+    @abstractmethod
+    def purge(self, job_ids: List[str]) -> None:
+        """删除作业及其剩余事件（任务的平台爬取结束后调用）。"""
+
+    @abstractmethod
+    def statuses(self, job_ids: List[str]) -> Dict[str, Tuple[str, str]]:
+        """{job_id: (status, error)}"""
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    params TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    worker_id TEXT NOT NULL DEFAULT '',
+    lease_until REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, platform, priority, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL,
+    blob BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events(job_id, id);
+"""
+
+
+class SqliteJobQueue(JobQueue):
+    """
+    基于 SQLite 文件（WAL）的队列，仅供同一台主机上的进程共享：WAL 依赖共享内存，队列文件须放在本地磁盘，
+    不能经 NFS / SMB 等网络文件系统多机共享。其他机器上的 worker 经 API 进程的作业代理（HttpJobSource）访问。
+    领取用 BEGIN IMMEDIATE 串行化，同一作业只会被一个 worker 领到。
+    """
+
+    def __init__(self, path: str, max_attempts: int = 2) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, task_id: str, platform: str, params: Dict[str, Any], priority: int = 0) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, task_id, platform, params, priority, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, task_id, platform, json.dumps(params, ensure_ascii=False), priority, now, now),
+            )
+        return job_id
+
+    def claim(self, worker_id: str, platforms: List[str], lease_sec: float) -> Optional[Dict[str, Any]]:
+        if not platforms:
+            return None
+        now = time.time()
+        marks = ",".join("?" * len(platforms))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 租约过期且重试次数用完的作业直接判失败
+                self._conn.execute(
+                    "UPDATE jobs SET status='failed', error='worker lost', updated_at=? "
+                    "WHERE status='running' AND lease_until < ? AND attempts >= ?",
+                    (now, now, self._max_attempts),
+                )
+                # 取消后 worker 失联、未能收尾的作业
+                self._conn.execute(
+                    "UPDATE jobs SET status='cancelled', updated_at=? WHERE status='cancelling' AND lease_until < ?",
+                    (now, now),
+                )
+                row = self._conn.execute(
+                    f"SELECT job_id, task_id, platform, params, attempts FROM jobs "
+                    f"WHERE platform IN ({marks}) AND (status='queued' OR (status='running' AND lease_until < ?)) "
+                    f"ORDER BY priority DESC, created_at LIMIT 1",
+                    (*platforms, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status='running', worker_id=?, lease_until=?, attempts=attempts+1, updated_at=? "
+                        "WHERE job_id=?",
+                        (worker_id, now + lease_sec, now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "task_id": row[1],
+            "platform": row[2],
+            "params": json.loads(row[3]),
+            "attempts": row[4] + 1,
+        }
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_sec: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET lease_until=?, updated_at=? WHERE job_id=? AND worker_id=? AND status='running'",
+                (now + lease_sec, now, job_id, worker_id),
+            )
+        return cur.rowcount > 0
+
+    def push_event(self, job_id: str, kind: str, data: str, blob: Optional[bytes] = None) -> None:
+        # 只接受执行中（含取消收尾中）作业的事件：已结束或已删除的作业不再堆积事件
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO job_events (job_id, kind, data, blob) SELECT ?, ?, ?, ? "
+                "WHERE EXISTS (SELECT 1 FROM jobs WHERE job_id=? AND status IN ('running', 'cancelling'))",
+                (job_id, kind, data, blob, job_id),
+            )
+
+    def fetch_events(self, job_ids: List[str], after_id: int, limit: int = 500) -> List[Tuple[int, str, str, str, Optional[bytes]]]:
+        if not job_ids:
+            return []
+        marks = ",".join("?" * len(job_ids))
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT id, job_id, kind, data, blob FROM job_events WHERE job_id IN ({marks}) AND id > ? "
+                f"ORDER BY id LIMIT ?",
+                (*job_ids, after_id, limit),
+            ).fetchall()
+
+    def ack_events(self, job_ids: List[str], upto_id: int) -> None:
+        if not job_ids:
+            return
+        marks = ",".join("?" * len(job_ids))
+        with self._lock:
+            self._conn.execute(f"DELETE FROM job_events WHERE job_id IN ({marks}) AND id <= ?", (*job_ids, upto_id))
+
+    def complete(self, job_id: str, worker_id: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status=CASE WHEN status='cancelling' THEN 'cancelled' ELSE ? END, error=?, updated_at=? "
+                "WHERE job_id=? AND worker_id=? AND status IN ('running', 'cancelling')",
+                ("failed" if error else "done", error or "", time.time(), job_id, worker_id),
+            )
+
+    def cancel(self, job_ids: List[str]) -> None:
+        if not job_ids:
+            return
+        marks = ",".join("?" * len(job_ids))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET status='cancelled', updated_at=? WHERE job_id IN ({marks}) AND status='queued'",
+                (now, *job_ids),
+            )
+            self._conn.execute(
+                f"UPDATE jobs SET status='cancelling', updated_at=? WHERE job_id IN ({marks}) AND status='running'",
+                (now, *job_ids),
+            )
+
+    def purge(self, job_ids: List[str]) -> None:
+        if not job_ids:
+            return
+        marks = ",".join("?" * len(job_ids))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(f"DELETE FROM job_events WHERE job_id IN ({marks})", job_ids)
+                self._conn.execute(f"DELETE FROM jobs WHERE job_id IN ({marks})", job_ids)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def statuses(self, job_ids: List[str]) -> Dict[str, Tuple[str, str]]:
+        if not job_ids:
+            return {}
+        marks = ",".join("?" * len(job_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT job_id, status, error FROM jobs WHERE job_id IN ({marks})", job_ids
+            ).fetchall()
+        return {r[0]: (r[1], r[2]) for r in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception as e:
+                logger.debug("[JobQueue] close ignored: %s", e)
+
+
+class HttpJobSource(JobSource):
+    """经 API 进程上的作业代理（/api/jobs/*，见 app.routers.jobs）领取与上报作业，供其他机器上的 worker 使用。"""
+
+    def __init__(self, base_url: str, token: str = "", timeout: float = 30.0) -> None:
+        import httpx
+
+        headers = {"Authorization": "Bearer %s" % token} if token else {}
+        self._client = httpx.Client(base_url=base_url.rstrip("/") + "/api/jobs", headers=headers, timeout=timeout)
+
+    def _post(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        resp = self._client.post(path, json=body)
+        resp.raise_for_status()
+        return resp.json()
+
+    def claim(self, worker_id: str, platforms: List[str], lease_sec: float) -> Optional[Dict[str, Any]]:
+        if not platforms:
+            return None
+        return self._post("/claim", {"worker_id": worker_id, "platforms": platforms, "lease_sec": lease_sec}).get("job")
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_sec: float) -> bool:
+        return bool(self._post("/%s/heartbeat" % job_id, {"worker_id": worker_id, "lease_sec": lease_sec}).get("ok"))
+
+    def push_event(self, job_id: str, kind: str, data: str, blob: Optional[bytes] = None) -> None:
+        body = {"kind": kind, "data": data, "blob": base64.b64encode(blob).decode("ascii") if blob is not None else None}
+        self._post("/%s/events" % job_id, body)
+
+    def complete(self, job_id: str, worker_id: str, error: Optional[str] = None) -> None:
+        self._post("/%s/complete" % job_id, {"worker_id": worker_id, "error": error})
+
+    def close(self) -> None:
+        try:
+            self._client.close()
+        except Exception as e:
+            logger.debug("[JobQueue] close ignored: %s", e)
+
+
+def _default_queue_path() -> str:
+    backend_dir = Path(__file__).resolve().parent.parent.parent
+    return str(backend_dir / "data" / "jobs.db")
+
+
+def create_job_queue() -> JobQueue:
+    """Build the queue selected by settings.JOB_QUEUE_BACKEND (sqlite)."""
+    backend = settings.JOB_QUEUE_BACKEND
+    if backend != "sqlite":
+        logger.warning("[JobQueue] unknown JOB_QUEUE_BACKEND=%s, using sqlite", backend)
+    path = settings.JOB_QUEUE_PATH or _default_queue_path()
+    return SqliteJobQueue(path, max_attempts=settings.JOB_MAX_ATTEMPTS)
+
+
+def create_job_source(broker_url: str = "") -> JobSource:
+    """worker 使用：配置了作业代理地址（JOB_BROKER_URL）时经 API 进程访问队列，否则直接打开本机的队列文件。"""
+    url = broker_url or settings.JOB_BROKER_URL
+    if url:
+        return HttpJobSource(url, settings.JOB_BROKER_TOKEN)
+    return create_job_queue()
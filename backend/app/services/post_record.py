@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Compact internal post representation; converted to UnifiedPost only at the API edge."""
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from app.schemas import UnifiedAuthor, UnifiedPost
+
+# UnifiedAuthor 中多数帖子为空的可选字段，只在有值时存入 author_extra（作者 platform 与帖子不同时也记在这里）
+_AUTHOR_EXTRA_FIELDS = ("user_unique_id", "short_user_id", "sec_uid", "signature", "ip_location")
+
+
+class PostRecord:
+    """
+    任务内部存储的帖子：__slots__ 扁平字段，无 pydantic 开销，作者信息内联。
+    计数字段为普通 int 属性，统计 / 排序 / 大模型摘要直接读取；API 出口再 to_post()。
+    fragment 为入库时序列化好的 UnifiedPost JSON（bytes），结果接口直接拼接，不再逐条 model_dump。
+    """
+
+    __slots__ = (
+        "platform",
+        "post_id",
+        "title",
+        "content",
+        "author_id",
+        "author_name",
+        "author_avatar",
+        "author_extra",
+        "publish_time",
+        "like_count",
+        "comment_count",
+        "share_count",
+        "collect_count",
+        "url",
+        "image_urls",
+        "video_url",
+        "platform_data",
+        "fragment",
+    )
+
+    def __init__(
+        self,
+        platform: str,
+        post_id: str,
+        title: str = "",
+        content: str = "",
+        author_id: str = "",
+        author_name: str = "",
+        author_avatar: Optional[str] = None,
+        author_extra: Optional[Dict[str, str]] = None,
+        publish_time: str = "",
+        like_count: int = 0,
+        comment_count: int = 0,
+        share_count: int = 0,
+        collect_count: Optional[int] = None,
+        url: str = "",
+        image_urls: Tuple[str, ...] = (),
+        video_url: Optional[str] = None,
+        platform_data: Optional[Dict[str, Any]] = None,
+        fragment: bytes = b"",
+    ) -> None:
+        self.platform = platform
+        self.post_id = post_id
+        self.title = title
+        self.content = content
+        self.author_id = author_id
+        self.author_name = author_name
+        self.author_avatar = author_avatar
+        self.author_extra = author_extra
+        self.publish_time = publish_time
+        self.like_count = like_count
+        self.comment_count = comment_count
+        self.share_count = share_count
+        self.collect_count = collect_count
+        self.url = url
+        self.image_urls = image_urls
+        self.video_url = video_url
+        self.platform_data = platform_data if platform_data is not None else {}
+        self.fragment = fragment
+
+    @classmethod
+    def from_post(cls, p: UnifiedPost, fragment: bytes = b"") -> "PostRecord":
+        a = p.author
+        extra = {k: v for k in _AUTHOR_EXTRA_FIELDS if (v := getattr(a, k)) is not None}
+        if a.platform != p.platform:
+            extra["platform"] = a.platform
+        return cls(
+            platform=p.platform,
+            post_id=p.post_id,
+            title=p.title,
+            content=p.content,
+            author_id=a.author_id,
+            author_name=a.author_name,
+            author_avatar=a.author_avatar,
+            author_extra=extra or None,
+            publish_time=p.publish_time,
+            like_count=p.like_count,
+            comment_count=p.comment_count,
+            share_count=p.share_count,
+            collect_count=p.collect_count,
+            url=p.url,
+            image_urls=tuple(p.image_urls),
+            video_url=p.video_url,
+            platform_data=p.platform_data,
+            fragment=fragment or p.model_dump_json().encode("utf-8"),
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "PostRecord":
+        """从 task_store 中的 JSON 行构建，原文即 fragment，无需重新序列化。"""
+        rec = cls.from_dict(json.loads(data))
+        rec.fragment = data.encode("utf-8")
+        return rec
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "PostRecord":
+        """从 UnifiedPost 的 JSON 字典（如 task_store 中的行）构建，不经 pydantic 校验。"""
+        a = d.get("author") or {}
+        extra = {k: a[k] for k in _AUTHOR_EXTRA_FIELDS if a.get(k) is not None}
+        if a.get("platform", "") != d.get("platform", ""):
+            extra["platform"] = a.get("platform", "")
+        return cls(
+            platform=d.get("platform", ""),
+            post_id=d.get("post_id", ""),
+            title=d.get("title", ""),
+            content=d.get("content", ""),
+            author_id=a.get("author_id", ""),
+            author_name=a.get("author_name", ""),
+            author_avatar=a.get("author_avatar"),
+            author_extra=extra or None,
+            publish_time=d.get("publish_time", ""),
+            like_count=d.get("like_count", 0),
+            comment_count=d.get("comment_count", 0),
+            share_count=d.get("share_count", 0),
+            collect_count=d.get("collect_count"),
+            url=d.get("url", ""),
+            image_urls=tuple(d.get("image_urls") or ()),
+            video_url=d.get("video_url"),
+            platform_data=d.get("platform_data") or {},
+        )
+
+    def to_post(self) -> UnifiedPost:
+        """转为 API 模型。数据在入库时已校验，用 model_construct 跳过重复校验。"""
+        extra = self.author_extra or {}
+        author = UnifiedAuthor.model_construct(
+            author_id=self.author_id,
+            author_name=self.author_name,
+            author_avatar=self.author_avatar,
+            platform=extra.get("platform", self.platform),
+            **{k: extra.get(k) for k in _AUTHOR_EXTRA_FIELDS},
+        )
+        return UnifiedPost.model_construct(
+            platform=self.platform,
+            post_id=self.post_id,
+            title=self.title,
+            content=self.content,
+            author=author,
+            publish_time=self.publish_time,
+            like_count=self.like_count,
+            comment_count=self.comment_count,
+            share_count=self.share_count,
+            collect_count=self.collect_count,
+            url=self.url,
+            image_urls=list(self.image_urls),
+            video_url=self.video_url,
+            platform_data=self.platform_data,
+        )
+
+    def refresh_fragment(self) -> bytes:
+        """计数 / 评论合并后重新序列化，返回新的 fragment。"""
+        self.fragment = self.to_post().model_dump_json().encode("utf-8")
+        return self.fragment
+
+
+def join_fragments(records) -> bytes:
+    """把各记录的 fragment 拼成 JSON 数组（只做字节拼接）。"""
+    return b"[" + b",".join(r.fragment for r in records) + b"]"
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""Out-of-line compressed storage for raw platform payloads (raw_aweme / raw_note), keyed by (platform, post_id)."""
+import json
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard as _zstd
+except ImportError:  # 可选依赖，未安装时用 zlib
+    _zstd = None
+
+_CODEC_ZLIB = b"z"
+_CODEC_ZSTD = b"s"
+
+
+def _compress(data: bytes) -> bytes:
+    if _zstd is not None and settings.RAW_STORE_COMPRESSION == "zstd":
+        return _CODEC_ZSTD + _zstd.ZstdCompressor(level=3).compress(data)
+    return _CODEC_ZLIB + zlib.compress(data, 6)
+
+
+def _decompress(blob: bytes) -> bytes:
+    codec, body = blob[:1], blob[1:]
+    if codec == _CODEC_ZSTD:
+        if _zstd is None:
+            raise RuntimeError("zstandard not installed, cannot read zstd payload")
+        return _zstd.ZstdDecompressor().decompress(body)
+    return zlib.decompress(body)
+
+
+class RawPayloadStore:
+    """
+    线程安全的原始数据存储：爬虫线程写入，API 按需读取。
+    内存中保留压缩后的 blob，超出 RAW_STORE_MEMORY_MB 时最旧的写入 RAW_STORE_DIR（默认 backend/data/raw_payloads）。
+    任务收到帖子时 retain 登记引用，任务数据被删除时 release_task：不再被任何任务引用的 blob（含磁盘文件）随之释放。
+    """
+
+    def __init__(self, memory_budget_bytes: int, spill_dir: str = "") -> None:
+        self._blobs: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._budget = memory_budget_bytes
+        self._spill_dir = Path(spill_dir) if spill_dir else None
+        self._lock = threading.Lock()
+        # 引用：(platform, post_id) -> 引用它的 task_id；task_id -> 其引用的 key
+        self._owners: Dict[Tuple[str, str], Set[str]] = {}
+        self._task_keys: Dict[str, List[Tuple[str, str]]] = {}
+        self.stats: Dict[str, int] = {"put": 0, "raw_bytes": 0, "stored_bytes": 0, "spilled": 0, "dropped": 0, "freed": 0}
+
+    def _spill_path(self, platform: str, post_id: str) -> Optional[Path]:
+        if not self._spill_dir:
+            return None
+        safe_id = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in post_id)
+        return self._spill_dir / platform / f"{safe_id}.bin"
+
+    def put(self, platform: str, post_id: str, payload: Dict[str, Any]) -> None:
+        raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._put_blob(platform, post_id, _compress(raw), len(raw))
+
+    def put_blob(self, platform: str, post_id: str, blob: bytes) -> None:
+        """写入已压缩的 blob（来自爬虫子进程，见 pop_blob）。"""
+        self._put_blob(platform, post_id, blob, 0)
+
+    def pop_blob(self, platform: str, post_id: str) -> Optional[bytes]:
+        """取出并移除压缩 blob（含已写入磁盘的）；爬虫子进程 / worker 用它把原始数据随帖子一起发回主进程。"""
+        with self._lock:
+            blob = self._blobs.pop((platform, str(post_id)), None)
+            if blob is not None:
+                self._bytes -= len(blob)
+                return blob
+        path = self._spill_path(platform, str(post_id))
+        if path is None:
+            return None
+        try:
+            blob = path.read_bytes()
+            path.unlink()
+        except OSError:
+            return None
+        return blob
+
+    def _put_blob(self, platform: str, post_id: str, blob: bytes, raw_len: int) -> None:
+        key = (platform, str(post_id))
+        with self._lock:
+            old = self._blobs.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._blobs[key] = blob
+            self._bytes += len(blob)
+            self.stats["put"] += 1
+            self.stats["raw_bytes"] += raw_len
+            self.stats["stored_bytes"] += len(blob)
+            evicted = []
+            while self._budget > 0 and self._bytes > self._budget and len(self._blobs) > 1:
+                k, b = self._blobs.popitem(last=False)
+                self._bytes -= len(b)
+                evicted.append((k, b))
+        for (pl, pid), b in evicted:
+            path = self._spill_path(pl, pid)
+            if path is None:
+                self.stats["dropped"] += 1
+                continue
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(b)
+                self.stats["spilled"] += 1
+            except OSError as e:
+                logger.warning("[RawStore] spill %s/%s failed: %s", pl, pid, e)
+                self.stats["dropped"] += 1
+
+    def retain(self, task_id: str, keys: Iterable[Tuple[str, str]]) -> None:
+        """任务收到带 has_raw 的帖子时调用，登记 task_id 对这些 (platform, post_id) 的引用；同一帖子可被多个任务引用。"""
+        with self._lock:
+            for platform, post_id in keys:
+                key = (platform, str(post_id))
+                owners = self._owners.setdefault(key, set())
+                if task_id not in owners:
+                    owners.add(task_id)
+                    self._task_keys.setdefault(task_id, []).append(key)
+
+    def release_task(self, task_id: str) -> int:
+        """memory store 下任务被淘汰时调用：释放不再被其他任务引用的 blob，返回释放数。"""
+        with self._lock:
+            keys = list(self._task_keys.get(task_id, ()))
+        return self.release_keys(task_id, keys)
+
+    def release_keys(self, task_id: str, keys: Iterable[Tuple[str, str]]) -> int:
+        """
+        任务被删除时调用，keys 为该任务不再被其他任务引用的帖子（持久化 store 由库中帖子表判断，
+        含重启后未重新加载、未登记引用的任务）：仍被内存中其他任务登记引用的保留，其余连同磁盘文件释放。
+        """
+        with self._lock:
+            # 先撤销该任务登记过的全部引用：仍被库中其他任务使用的帖子不在 keys 中，blob 保留
+            for key in self._task_keys.pop(task_id, []):
+                owners = self._owners.get(key)
+                if owners is not None:
+                    owners.discard(task_id)
+                    if not owners:
+                        del self._owners[key]
+            freed = [(pl, str(pid)) for pl, pid in keys if (pl, str(pid)) not in self._owners]
+        return self._free(freed)
+
+    def discard(self, keys: Iterable[Tuple[str, str]]) -> int:
+        """丢弃没有任务引用的 blob：帖子超出条数上限被截掉、不会写入任务时调用。"""
+        with self._lock:
+            unowned = [(pl, str(pid)) for pl, pid in keys if (pl, str(pid)) not in self._owners]
+        return self._free(unowned)
+
+    def _free(self, keys: List[Tuple[str, str]]) -> int:
+        freed = 0
+        with self._lock:
+            for key in keys:
+                blob = self._blobs.pop(key, None)
+                if blob is not None:
+                    self._bytes -= len(blob)
+                    freed += 1
+        for pl, pid in keys:
+            path = self._spill_path(pl, pid)
+            if path is None:
+                continue
+            try:
+                path.unlink()
+                freed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.debug("[RawStore] unlink %s failed: %s", path, e)
+        with self._lock:
+            self.stats["freed"] += freed
+        return freed
+
+    def contains(self, platform: str, post_id: str) -> bool:
+        key = (platform, str(post_id))
+        with self._lock:
+            if key in self._blobs:
+                return True
+        path = self._spill_path(platform, str(post_id))
+        return path is not None and path.is_file()
+
+    def flush(self) -> int:
+        """把内存中的 blob 全部写入磁盘（持久化 task store 下进程退出前调用，重启后原始数据仍可读取），返回写入数。"""
+        if not self._spill_dir:
+            return 0
+        with self._lock:
+            items = list(self._blobs.items())
+        written = 0
+        for (pl, pid), blob in items:
+            path = self._spill_path(pl, pid)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(blob)
+                written += 1
+            except OSError as e:
+                logger.warning("[RawStore] flush %s/%s failed: %s", pl, pid, e)
+        return written
+
+    def get(self, platform: str, post_id: str) -> Optional[Dict[str, Any]]:
+        key = (platform, str(post_id))
+        with self._lock:
+            blob = self._blobs.get(key)
+        if blob is None:
+            path = self._spill_path(platform, str(post_id))
+            if path is None or not path.is_file():
+                return None
+            blob = path.read_bytes()
+        return json.loads(_decompress(blob))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "resident_blobs": len(self._blobs),
+                "resident_bytes": self._bytes,
+                "codec": "zstd" if _zstd is not None and settings.RAW_STORE_COMPRESSION == "zstd" else "zlib",
+            }
+
+
+def raw_keys(posts: Iterable[Any]) -> List[Tuple[str, str]]:
+    """带 platform_data.has_raw 标记的帖子（UnifiedPost / PostRecord）的 (platform, post_id)。"""
+    return [(p.platform, str(p.post_id)) for p in posts if p.platform_data.get("has_raw")]
+
+
+def _default_spill_dir() -> str:
+    backend_dir = Path(__file__).resolve().parent.parent.parent
+    return str(backend_dir / "data" / "raw_payloads")
+
+
+raw_store = RawPayloadStore(
+    memory_budget_bytes=settings.RAW_STORE_MEMORY_MB * 1024 * 1024,
+    spill_dir=settings.RAW_STORE_DIR or _default_spill_dir(),
+)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Per-run, thread-safe channel that streams crawled posts from a crawler thread into the main event loop."""
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.schemas import UnifiedPost
+from app.services.raw_store import raw_keys, raw_store
+
+logger = logging.getLogger(__name__)
+
+
+class ResultSink:
+    """
+    爬虫线程每抓完一页（帖子 + 评论）就 publish 一批 UnifiedPost，由主循环的 deliver 写入任务。
+    在途批次数上限为 max_pending：主循环跟不上时 publish 挂起（背压），爬虫线程内存只保留当前页。
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        deliver: Callable[[List[UnifiedPost]], Awaitable[None]],
+        max_pending: int = 4,
+        limit: int = 0,
+        on_checkpoint: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None,
+    ) -> None:
+        self._loop = loop
+        self._deliver = deliver
+        self._on_checkpoint = on_checkpoint
+        self._max_pending = max(1, max_pending)
+        self._limit = limit
+        self._pending: Deque[Future] = deque()
+        self._lock = threading.Lock()
+        self.count = 0
+
+    async def publish(self, posts: List[UnifiedPost]) -> None:
+        """在爬虫线程的事件循环中调用：提交一批帖子，超出在途上限时等待最早的批次写完。"""
+        with self._lock:
+            if self._limit > 0:
+                keep = max(0, self._limit - self.count)
+                # 超出条数上限被截掉的帖子不会写入任务，也就不会登记引用：其原始数据在此丢弃
+                raw_store.discard(raw_keys(posts[keep:]))
+                posts = posts[:keep]
+            if not posts:
+                return
+            self.count += len(posts)
+            fut = asyncio.run_coroutine_threadsafe(self._deliver(posts), self._loop)
+            self._pending.append(fut)
+        while True:
+            with self._lock:
+                if len(self._pending) <= self._max_pending:
+                    break
+                oldest = self._pending.popleft()
+            await asyncio.wrap_future(oldest)
+
+    async def checkpoint(self, keyword: str, state: Dict[str, Any]) -> None:
+        """在爬虫线程的事件循环中调用：提交关键词断点，与帖子批次同序写入（排在已提交的页之后）。"""
+        if self._on_checkpoint is None:
+            return
+        with self._lock:
+            self._pending.append(asyncio.run_coroutine_threadsafe(self._on_checkpoint(keyword, state), self._loop))
+
+    def drain(self, timeout: float = 60.0) -> None:
+        """爬虫线程结束前调用：等待所有在途批次写入完成（deliver 的异常在此抛出）。"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                fut = self._pending.popleft()
+            fut.result(timeout=timeout)
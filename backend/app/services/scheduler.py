@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Process-wide crawl scheduler: bounded per-platform slots, priority/FIFO queue, admission control."""
+import asyncio
+import heapq
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Coroutine, Dict, List, Optional, Set
+
+from app.config import settings
+from app.services.task_manager import task_manager
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerFull(Exception):
+    """排队任务数已达上限，拒绝新任务。"""
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "task_id", "future")
+
+    def __init__(self, priority: int, seq: int, task_id: str, future: asyncio.Future) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.task_id = task_id
+        self.future = future
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        # priority 大者优先，同优先级按提交顺序（FIFO）
+        return (-self.priority, self.seq) < (-other.priority, other.seq)
+
+
+class CrawlScheduler:
+    """
+    每个平台最多 slots_per_platform 个爬虫同时运行（每个占一个浏览器），其余平台请求按优先级/FIFO 排队。
+    任务提交即登记；在拿到第一个平台槽位前算作排队中，排队任务数超过 max_queued 时拒绝新任务。
+    排队位置变化时递增任务版本，status 长轮询可及时看到。
+    """
+
+    def __init__(self, slots_per_platform: int = 1, max_queued: int = 20) -> None:
+        self._slots = max(1, slots_per_platform)
+        self._max_queued = max(0, max_queued)
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, List[_Waiter]] = {}
+        self._seq = itertools.count()
+        self._jobs: Dict[str, asyncio.Task] = {}
+        self._started: Set[str] = set()
+
+    def queued_count(self) -> int:
+        return sum(1 for tid in self._jobs if tid not in self._started)
+
+    def has_capacity(self) -> bool:
+        return self.queued_count() < self._max_queued
+
+    def submit(self, task_id: str, coro: Coroutine) -> asyncio.Task:
+        """登记并启动任务协程（协程内通过 slot() 申请平台槽位）。"""
+        if not self.has_capacity():
+            coro.close()
+            raise SchedulerFull(f"排队任务已达上限 {self._max_queued}")
+        job = asyncio.create_task(coro)
+        self._jobs[task_id] = job
+        job.add_done_callback(lambda j: self._forget(task_id, j))
+        return job
+
+    def _forget(self, task_id: str, job: asyncio.Task) -> None:
+        # 同一任务恢复（/resume）后会重新登记，只清理属于本次运行的记录
+        if self._jobs.get(task_id) is job:
+            del self._jobs[task_id]
+            self._started.discard(task_id)
+
+    def cancel_if_queued(self, task_id: str) -> bool:
+        """任务尚未拿到任何平台槽位时直接取消（不会启动浏览器）；已在运行的任务返回 False。"""
+        job = self._jobs.get(task_id)
+        if job is None or task_id in self._started or job.done():
+            return False
+        job.cancel()
+        return True
+
+    def queue_position(self, task_id: str) -> Optional[int]:
+        """排队中的任务返回从 1 开始的位置（取其各平台队列中最靠前者），否则 None。"""
+        if task_id not in self._jobs or task_id in self._started:
+            return None
+        best = None
+        for waiters in self._waiters_sorted():
+            for i, w in enumerate(waiters):
+                if w.task_id == task_id:
+                    best = i + 1 if best is None else min(best, i + 1)
+                    break
+        return best
+
+    def _waiters_sorted(self):
+        return (sorted(ws) for ws in self._waiting.values() if ws)
+
+    def _notify(self, platform: str) -> None:
+        for w in self._waiting.get(platform, ()):
+            task_manager.notify_changed(w.task_id)
+
+    def _release(self, platform: str) -> None:
+        waiters = self._waiting.get(platform)
+        while waiters:
+            w = heapq.heappop(waiters)
+            if not w.future.done():
+                # 槽位直接转交给队首，运行数不变
+                w.future.set_result(None)
+                self._notify(platform)
+                return
+        self._running[platform] -= 1
+
+    @asynccontextmanager
+    async def slot(self, platform: str, task_id: str, priority: int = 0) -> AsyncIterator[None]:
+        """占用一个平台槽位；无空位时按优先级排队。取消时移出队列。"""
+        waiters = self._waiting.setdefault(platform, [])
+        if self._running.get(platform, 0) < self._slots and not waiters:
+            self._running[platform] = self._running.get(platform, 0) + 1
+        else:
+            w = _Waiter(priority, next(self._seq), task_id, asyncio.get_running_loop().create_future())
+            heapq.heappush(waiters, w)
+            self._notify(platform)
+            logger.info("[Scheduler] task_id=%s 排队等待平台 %s", task_id[:8], platform)
+            try:
+                await w.future
+            except asyncio.CancelledError:
+                if w.future.done() and not w.future.cancelled():
+                    # 已被转交槽位但随即取消：交还给下一个
+                    self._release(platform)
+                else:
+                    w.future.cancel()
+                    waiters.remove(w)
+                    heapq.heapify(waiters)
+                    self._notify(platform)
+                raise
+        if task_id not in self._started:
+            self._started.add(task_id)
+            task_manager.notify_changed(task_id)
+        try:
+            yield
+        finally:
+            self._release(platform)
+
+    def stats(self) -> dict:
+        return {
+            "slots_per_platform": self._slots,
+            "running": {p: n for p, n in self._running.items() if n},
+            "waiting": {p: len(ws) for p, ws in self._waiting.items() if ws},
+            "queued_tasks": self.queued_count(),
+            "max_queued_tasks": self._max_queued,
+        }
+
+
+scheduler = CrawlScheduler(
+    slots_per_platform=settings.SCHEDULER_SLOTS_PER_PLATFORM,
+    max_queued=settings.SCHEDULER_MAX_QUEUED_TASKS,
+)
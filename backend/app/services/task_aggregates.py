@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Per-task aggregates maintained on append, so analysis endpoints read in O(1) / O(K)."""
+import bisect
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.services.post_record import PostRecord
+
+LIKE_BUCKETS = ("0-100", "101-1k", "1k-10k", "10k+")
+COMMENT_BUCKETS = ("0-10", "11-100", "101-1k", "1k+")
+
+
+def post_content_type(p: PostRecord) -> str:
+    """根据帖子推断内容类型: video | image_text | link。"""
+    if p.video_url:
+        return "video"
+    if p.image_urls and len(p.image_urls) > 0:
+        return "image_text"
+    return "link"
+
+
+def parse_publish_date(publish_time: str) -> Optional[str]:
+    """从 publish_time 解析出 YYYY-MM-DD，用于趋势聚合。"""
+    if not publish_time or not isinstance(publish_time, str):
+        return None
+    s = publish_time.strip()
+    # 纯数字视为 Unix 时间戳（秒或毫秒）
+    if re.match(r"^\d+$", s):
+        try:
+            ts = int(s)
+            if ts > 1e12:
+                ts = ts // 1000
+            dt = datetime.utcfromtimestamp(ts)
+            return dt.strftime("%Y-%m-%d")
+        except (ValueError, OSError):
+            return None
+    # ISO 或 YYYY-MM-DD 前缀
+    if len(s) >= 10 and s[4] == "-" and s[7] == "-":
+        try:
+            datetime.strptime(s[:10], "%Y-%m-%d")
+            return s[:10]
+        except ValueError:
+            pass
+    return None
+
+
+def _like_bucket(n: int) -> str:
+    if n <= 100:
+        return "0-100"
+    if n <= 1000:
+        return "101-1k"
+    if n <= 10000:
+        return "1k-10k"
+    return "10k+"
+
+
+def _comment_bucket(n: int) -> str:
+    if n <= 10:
+        return "0-10"
+    if n <= 100:
+        return "11-100"
+    if n <= 1000:
+        return "101-1k"
+    return "1k+"
+
+
+class _PlatformAgg:
+    __slots__ = ("post_count", "comment_sum", "like_sum", "author_count")
+
+    def __init__(self) -> None:
+        self.post_count = 0
+        self.comment_sum = 0
+        self.like_sum = 0
+        self.author_count = 0
+
+
+class TaskAggregates:
+    """
+    随 append_results 增量维护的统计：总数、分平台计数、点赞/评论分段、按日直方图、作者计数与排行。
+    排行用有序列表（bisect）而非堆：limit 由请求决定，且合并时计数可能变小，有序列表可直接删改，读取为 O(K)。
+    排序键带追加序号 / 首次出现序号，并列时与原先 sorted()/most_common() 的稳定顺序一致。
+    """
+
+    def __init__(self) -> None:
+        self.total_posts = 0
+        self.total_comments = 0
+        self.platforms: Dict[str, _PlatformAgg] = {}
+        self.content_types: Counter = Counter()
+        self.like_buckets: Dict[str, int] = dict.fromkeys(LIKE_BUCKETS, 0)
+        self.comment_buckets: Dict[str, int] = dict.fromkeys(COMMENT_BUCKETS, 0)
+        self.days: Counter = Counter()
+        # (author_id, platform) -> [post_count, first_seen, author_name]
+        self.authors: Dict[Tuple[str, str], list] = {}
+        self._author_rank: List[Tuple[int, int, Tuple[str, str]]] = []  # (-post_count, first_seen, key)
+        self._by_likes: List[Tuple[int, int]] = []  # (-like_count, idx)
+        self._by_comments: List[Tuple[int, int]] = []  # (-comment_count, idx)
+
+    @classmethod
+    def build(cls, records: List[PostRecord]) -> "TaskAggregates":
+        agg = cls()
+        for i, r in enumerate(records):
+            agg.add(i, r)
+        return agg
+
+    def add(self, idx: int, r: PostRecord) -> None:
+        """新帖子（results[idx]）入库。"""
+        self.total_posts += 1
+        self.total_comments += r.comment_count
+        pa = self.platforms.get(r.platform)
+        if pa is None:
+            pa = self.platforms[r.platform] = _PlatformAgg()
+        pa.post_count += 1
+        pa.comment_sum += r.comment_count
+        pa.like_sum += r.like_count
+        self.content_types[post_content_type(r)] += 1
+        self.like_buckets[_like_bucket(r.like_count)] += 1
+        self.comment_buckets[_comment_bucket(r.comment_count)] += 1
+        day = parse_publish_date(r.publish_time)
+        if day:
+            self.days[day] += 1
+
+        key = (r.author_id, r.platform)
+        entry = self.authors.get(key)
+        if entry is None:
+            entry = self.authors[key] = [0, len(self.authors), r.author_name or r.author_id]
+            pa.author_count += 1
+        else:
+            del self._author_rank[bisect.bisect_left(self._author_rank, (-entry[0], entry[1], key))]
+        entry[0] += 1
+        bisect.insort(self._author_rank, (-entry[0], entry[1], key))
+
+        bisect.insort(self._by_likes, (-r.like_count, idx))
+        bisect.insort(self._by_comments, (-r.comment_count, idx))
+
+    def update_counts(self, idx: int, r: PostRecord, old_likes: int, old_comments: int) -> None:
+        """合并后计数变化（可能变小）：修正总数、分段与排行。作者、日期、内容类型不随合并变化。"""
+        pa = self.platforms[r.platform]
+        if r.comment_count != old_comments:
+            self.total_comments += r.comment_count - old_comments
+            pa.comment_sum += r.comment_count - old_comments
+            self.comment_buckets[_comment_bucket(old_comments)] -= 1
+            self.comment_buckets[_comment_bucket(r.comment_count)] += 1
+            del self._by_comments[bisect.bisect_left(self._by_comments, (-old_comments, idx))]
+            bisect.insort(self._by_comments, (-r.comment_count, idx))
+        if r.like_count != old_likes:
+            pa.like_sum += r.like_count - old_likes
+            self.like_buckets[_like_bucket(old_likes)] -= 1
+            self.like_buckets[_like_bucket(r.like_count)] += 1
+            del self._by_likes[bisect.bisect_left(self._by_likes, (-old_likes, idx))]
+            bisect.insort(self._by_likes, (-r.like_count, idx))
+
+    def stats(self) -> dict:
+        platform_stats = []
+        for platform in sorted(self.platforms):
+            pa = self.platforms[platform]
+            platform_stats.append({
+                "platform": platform,
+                "post_count": pa.post_count,
+                "comment_count": pa.comment_sum,
+                "author_count": pa.author_count,
+                "avg_likes": pa.like_sum / pa.post_count if pa.post_count else 0,
+                "avg_comments": pa.comment_sum / pa.post_count if pa.post_count else 0,
+            })
+        return {
+            "total_posts": self.total_posts,
+            "total_comments": self.total_comments,
+            "total_authors": len(self.authors),
+            "platform_stats": platform_stats,
+            "time_range": {},
+            "content_type_distribution": {k: v for k, v in self.content_types.items() if v},
+            "like_buckets": dict(self.like_buckets),
+            "comment_buckets": dict(self.comment_buckets),
+        }
+
+    def trends(self) -> Dict[str, int]:
+        return dict(sorted(self.days.items()))
+
+    def top_authors(self, limit: int) -> List[dict]:
+        out = []
+        for neg_count, _, key in self._author_rank[:max(0, limit)]:
+            out.append({
+                "author": {"author_id": key[0], "author_name": self.authors[key][2], "platform": key[1]},
+                "post_count": -neg_count,
+            })
+        return out
+
+    def top_post_indexes(self, limit: int, sort_by: str = "likes") -> List[int]:
+        ranked = self._by_comments if sort_by == "comments" else self._by_likes
+        return [idx for _, idx in ranked[:max(0, limit)]]
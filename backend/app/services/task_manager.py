@@ -1,11 +1,20 @@
 # -*- coding: utf-8 -*-
-"""In-memory task state and results storage."""
+"""Task state and results storage: in-memory hot cache in front of a pluggable TaskStore."""
 import asyncio
+import bisect
+import json
+import time
 import uuid
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from app.config import settings
 from app.schemas import UnifiedPost, UnifiedComment
+from app.services.post_record import PostRecord, join_fragments
+from app.services.raw_store import raw_keys, raw_store
+from app.services.task_aggregates import TaskAggregates
+from app.services.task_store import TaskStore, create_task_store
 
 
 @dataclass
@@ -17,30 +26,264 @@ class TaskState:
     by_platform: Dict[str, int] = field(default_factory=dict)
     progress: int = 0
     message: str = ""
-    results: List[UnifiedPost] = field(default_factory=list)
+    results: List[PostRecord] = field(default_factory=list)  # 紧凑内部表示，API 出口再转 UnifiedPost
     comments_cache: Dict[str, List[UnifiedComment]] = field(default_factory=dict)  # key: f"{platform}_{post_id}"
+    # 去重索引：(platform, post_id) -> results 下标，随 append 增量维护
+    post_index: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    # 按平台的二级索引：platform -> results 下标列表（递增），随 append 维护
+    platform_index: Dict[str, List[int]] = field(default_factory=dict)
+    # 分析接口用的增量统计，随 append 维护
+    aggregates: TaskAggregates = field(default_factory=TaskAggregates)
     stop_requested: bool = False
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    # 近似常驻字节数（帖子/评论 JSON 长度之和），用于内存预算淘汰
+    approx_bytes: int = 0
+    # 单调递增的版本号：状态或结果每次变化 +1，作为状态/结果接口的 ETag
+    version: int = 0
+    # 断点续爬：启动时的搜索参数，与各平台 × 关键词的爬取断点（platform -> keyword -> state）
+    search_params: Dict[str, Any] = field(default_factory=dict)
+    checkpoints: Dict[str, Dict[str, Dict[str, Any]]] = field(default_factory=dict)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "stopped")
+
+    def rebuild_index(self) -> None:
+        self.post_index = {}
+        self.platform_index = {}
+        for i, p in enumerate(self.results):
+            self.post_index[(p.platform, p.post_id)] = i
+            self.platform_index.setdefault(p.platform, []).append(i)
+        self.aggregates = TaskAggregates.build(self.results)
+
+    def posts_for_platform(self, platform: str) -> List[PostRecord]:
+        """O(k)：只取该平台的帖子。"""
+        return [self.results[i] for i in self.platform_index.get(platform, ())]
+
+
+_COUNT_FIELDS = ("like_count", "comment_count", "share_count", "collect_count")
+
+
+def _merge_post(old: PostRecord, new: UnifiedPost) -> bool:
+    """同一帖子被重复抓取时，用新抓到的互动数与评论覆盖旧值；返回是否有变化。"""
+    changed = False
+    for name in _COUNT_FIELDS:
+        val = getattr(new, name)
+        if val and val != getattr(old, name):
+            setattr(old, name, val)
+            changed = True
+    new_comments = (new.platform_data or {}).get("comments")
+    if new_comments and len(new_comments) > len(old.platform_data.get("comments") or []):
+        old.platform_data["comments"] = new_comments
+        changed = True
+    return changed
 
 
 class TaskManager:
     """Singleton task manager: create task, update status/results, stop."""
 
-    def __init__(self) -> None:
-        self._tasks: Dict[str, TaskState] = {}
+    def __init__(self, store: Optional[TaskStore] = None) -> None:
+        # 热缓存：运行中任务常驻，已结束任务按保留策略（TTL / LRU 数量（仅持久化 store）/ 内存预算）淘汰
+        self._tasks: "OrderedDict[str, TaskState]" = OrderedDict()
         self._lock = asyncio.Lock()
+        self._store = store if store is not None else create_task_store()
+        self._evictions: Dict[str, int] = {"ttl": 0, "lru": 0, "memory": 0, "purged": 0}
+        # 长轮询：task_id -> 等待下一次版本变化的 Event（变化时 set 并移除）
+        self._waiters: Dict[str, asyncio.Event] = {}
+        # 按需加载：task_id -> 加载锁，同一任务的并发请求只读库一次
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+
+    def _meta(self, t: TaskState) -> dict:
+        return {
+            "task_id": t.task_id,
+            "status": t.status,
+            "total_found": t.total_found,
+            "by_platform": t.by_platform,
+            "progress": t.progress,
+            "message": t.message,
+            "created_at": t.created_at,
+            "updated_at": t.updated_at,
+        }
+
+    def _touch(self, t: TaskState) -> None:
+        t.version += 1
+        ev = self._waiters.pop(t.task_id, None)
+        if ev is not None:
+            ev.set()
+
+    async def _write(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """持锁调用：持久化 store 的同步写入放到线程中执行，不阻塞事件循环；锁保证写入顺序与调用顺序一致。"""
+        if self._store.persistent:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def _save_async(self, t: TaskState) -> None:
+        t.updated_at = time.time()
+        self._touch(t)
+        await self._write(self._store.save_task, self._meta(t))
 
-    def create_task(self) -> str:
+    def _evict(self, task_id: str, reason: str) -> None:
+        """移出内存：持久化 store 下数据仍在库中（按需重新加载），memory store 下即释放（含原始数据）。"""
+        if self._tasks.pop(task_id, None) is not None:
+            self._evictions[reason] += 1
+        self._waiters.pop(task_id, None)
+        if not self._store.persistent:
+            raw_store.release_task(task_id)
+
+    def _delete(self, task_id: str) -> None:
+        keys = self._store.delete_task(task_id)
+        if self._store.persistent:
+            raw_store.release_keys(task_id, keys)
+        else:
+            raw_store.release_task(task_id)
+
+    async def _enforce_retention(self) -> None:
+        """
+        按 TTL、已结束任务数（LRU）、近似内存预算依次淘汰已结束任务；运行中任务不淘汰。
+        数量上限只在持久化 store 下生效（淘汰后可从库中重新加载）；memory store 下淘汰即丢失结果，只按 TTL 与内存预算淘汰。
+        """
+        now = time.time()
+        if settings.TASK_MAX_AGE_SEC > 0:
+            cutoff = now - settings.TASK_MAX_AGE_SEC
+            for tid in [tid for tid, t in self._tasks.items() if t.finished and t.updated_at < cutoff]:
+                self._evict(tid, "ttl")
+                await self._write(self._delete, tid)
+        if self._store.persistent:
+            finished = [tid for tid, t in self._tasks.items() if t.finished]  # LRU 顺序，最久未访问在前
+            excess = len(finished) - max(0, settings.TASK_HOT_CACHE_SIZE)
+            for tid in finished[:max(0, excess)]:
+                self._evict(tid, "lru")
+        budget = settings.TASK_MEMORY_BUDGET_MB * 1024 * 1024
+        if budget > 0:
+            resident = sum(t.approx_bytes for t in self._tasks.values())
+            for tid in [tid for tid, t in self._tasks.items() if t.finished]:
+                if resident <= budget:
+                    break
+                resident -= self._tasks[tid].approx_bytes
+                self._evict(tid, "memory")
+
+    def _purge_expired(self) -> int:
+        """删除库中过期的已结束任务（含未加载到内存的）并释放其原始数据，返回删除数。"""
+        if settings.TASK_MAX_AGE_SEC <= 0:
+            return 0
+        purged = self._store.purge_finished_before(time.time() - settings.TASK_MAX_AGE_SEC)
+        for tid, keys in purged.items():
+            raw_store.release_keys(tid, keys)
+        return len(purged)
+
+    async def create_task(self) -> str:
         """Create a new task, return task_id."""
         task_id = str(uuid.uuid4())
-        self._tasks[task_id] = TaskState(
+        t = TaskState(
             task_id=task_id,
             status="pending",
             by_platform={},
         )
+        async with self._lock:
+            self._tasks[task_id] = t
+            await self._save_async(t)
+            self._evictions["purged"] += await self._write(self._purge_expired)
+            await self._enforce_retention()
         return task_id
 
-    def get_task(self, task_id: str) -> Optional[TaskState]:
-        return self._tasks.get(task_id)
+    def _resident(self, task_id: str) -> Optional[TaskState]:
+        """热缓存中的任务（更新 LRU 顺序）。同步读取接口只看常驻任务：路由先 await get_task 确保已加载。"""
+        t = self._tasks.get(task_id)
+        if t:
+            self._tasks.move_to_end(task_id)
+        return t
+
+    async def get_task(self, task_id: str) -> Optional[TaskState]:
+        """
+        取任务；不在热缓存时从 store 加载：库读取与 JSON 解析在线程中执行，不阻塞事件循环，
+        同一任务的并发请求共用一把加载锁，只读一次库。
+        """
+        t = self._resident(task_id)
+        if t or not self._store.persistent:
+            return t
+        lock = self._load_locks.setdefault(task_id, asyncio.Lock())
+        try:
+            async with lock:
+                t = self._resident(task_id)
+                if t:
+                    return t
+                t = await asyncio.to_thread(self._load, task_id)
+                if not t:
+                    return None
+                self._tasks[task_id] = t
+                async with self._lock:
+                    await self._enforce_retention()
+                return t
+        finally:
+            self._load_locks.pop(task_id, None)
+
+    def _load(self, task_id: str) -> Optional[TaskState]:
+        """在线程中执行：从 store 读出任务并重建内存状态（不修改热缓存）。"""
+        loaded = self._store.load_task(task_id)
+        if not loaded:
+            return None
+        meta, posts, comments = loaded
+        t = TaskState(
+            task_id=meta["task_id"],
+            status=meta["status"],
+            total_found=meta["total_found"],
+            by_platform=meta["by_platform"],
+            progress=meta["progress"],
+            message=meta["message"],
+            results=[PostRecord.from_json(d) for d in posts],
+            comments_cache=comments,
+            created_at=meta["created_at"],
+            updated_at=meta["updated_at"],
+            approx_bytes=meta.get("approx_bytes", 0),
+            # 重新加载后计数从毫秒时间戳起，保证与淘汰前客户端持有的 ETag 不会撞上
+            version=int(time.time() * 1000),
+        )
+        t.search_params, t.checkpoints = self._store.load_resume_state(task_id)
+        # 原始数据已不存在（上次退出前未写入磁盘）的帖子去掉 has_raw 标记，避免 /raw 返回 404
+        for r in t.results:
+            if r.platform_data.get("has_raw") and not raw_store.contains(r.platform, r.post_id):
+                r.platform_data = {**r.platform_data, "has_raw": False}
+                r.refresh_fragment()
+        t.rebuild_index()
+        # 重启后引用登记已丢失：重新登记，任务过期删除时才能释放已写入磁盘的原始数据
+        raw_store.retain(task_id, raw_keys(t.results))
+        return t
+
+    async def set_search_params(self, task_id: str, params: Dict[str, Any]) -> None:
+        """记录任务的搜索参数（恢复时按原参数重跑）。"""
+        async with self._lock:
+            t = self._tasks.get(task_id)
+            if t:
+                t.search_params = dict(params)
+                await self._write(self._store.save_search_params, task_id, t.search_params)
+
+    async def save_checkpoint(self, task_id: str, platform: str, keyword: str, state: Dict[str, Any]) -> None:
+        """爬虫每交出一页后调用；与 append_results 共用锁，排在同一页帖子写入之后。"""
+        async with self._lock:
+            t = self._tasks.get(task_id)
+            if t:
+                t.checkpoints.setdefault(platform, {})[keyword] = dict(state)
+                await self._write(self._store.save_checkpoint, task_id, platform, keyword, state)
+
+    async def get_checkpoints(self, task_id: str, platform: str) -> Dict[str, Dict[str, Any]]:
+        t = await self.get_task(task_id)
+        return {k: dict(v) for k, v in t.checkpoints.get(platform, {}).items()} if t else {}
+
+    async def prepare_resume(self, task_id: str) -> bool:
+        """已结束（stopped / failed / completed）的任务重置为 pending 以便从断点继续；运行中返回 False。"""
+        if not await self.get_task(task_id):
+            return False
+        async with self._lock:
+            t = self._tasks.get(task_id)
+            if not t or not t.finished:
+                return False
+            t.status = "pending"
+            t.progress = 0
+            t.message = "resuming"
+            t.stop_requested = False
+            await self._save_async(t)
+            return True
 
     async def set_running(self, task_id: str) -> None:
         async with self._lock:
@@ -48,6 +291,7 @@ class TaskManager:
             if t:
                 t.status = "running"
                 t.progress = 0
+                await self._save_async(t)
 
     async def set_progress(self, task_id: str, total_found: int, by_platform: Dict[str, int], progress: int = 0) -> None:
         async with self._lock:
@@ -57,18 +301,42 @@ class TaskManager:
                 t.by_platform = dict(by_platform)
                 if progress >= 0:
                     t.progress = progress
+                await self._save_async(t)
 
     async def append_results(self, task_id: str, posts: List[UnifiedPost]) -> None:
         async with self._lock:
             t = self._tasks.get(task_id)
             if t:
-                seen = {p.post_id for p in t.results}
+                rows = []
+                raw_store.retain(task_id, raw_keys(posts))
                 for p in posts:
-                    if p.post_id not in seen:
-                        seen.add(p.post_id)
-                        t.results.append(p)
+                    key = (p.platform, p.post_id)
+                    idx = t.post_index.get(key)
+                    if idx is None:
+                        t.post_index[key] = len(t.results)
+                        t.platform_index.setdefault(p.platform, []).append(len(t.results))
+                        # 入库时序列化一次，fragment 同时用于结果接口与 store 行
+                        data = p.model_dump_json()
+                        t.results.append(PostRecord.from_post(p, data.encode("utf-8")))
+                        t.aggregates.add(len(t.results) - 1, t.results[-1])
+                        t.approx_bytes += len(data)
+                        rows.append((len(t.results), p.platform, p.post_id, data))
+                        continue
+                    merged = t.results[idx]
+                    old_likes, old_comments = merged.like_count, merged.comment_count
+                    if _merge_post(merged, p):
+                        # 合并只改计数/评论，重新生成 fragment；字节估算不再调整
+                        t.aggregates.update_counts(idx, merged, old_likes, old_comments)
+                        data = merged.refresh_fragment().decode("utf-8")
+                        rows.append((idx + 1, merged.platform, merged.post_id, data))
+                # 一次 append 只写一个事务（executemany），新增与合并一起 upsert
+                if rows:
+                    await self._write(self._store.upsert_posts, task_id, rows)
+                    self._touch(t)
 
-    async def set_completed(self, task_id: str, total_found: int, by_platform: Dict[str, int]) -> None:
+    async def set_completed(
+        self, task_id: str, total_found: int, by_platform: Dict[str, int], message: str = "completed"
+    ) -> None:
         async with self._lock:
             t = self._tasks.get(task_id)
             if t:
@@ -76,7 +344,9 @@ class TaskManager:
                 t.progress = 100
                 t.total_found = total_found
                 t.by_platform = dict(by_platform)
-                t.message = "completed"
+                t.message = message
+                await self._save_async(t)
+                await self._enforce_retention()
 
     async def set_failed(self, task_id: str, message: str = "failed") -> None:
         async with self._lock:
@@ -84,6 +354,8 @@ class TaskManager:
             if t:
                 t.status = "failed"
                 t.message = message
+                await self._save_async(t)
+                await self._enforce_retention()
 
     async def set_stopped(self, task_id: str) -> None:
         async with self._lock:
@@ -91,6 +363,28 @@ class TaskManager:
             if t:
                 t.status = "stopped"
                 t.message = "stopped"
+                await self._save_async(t)
+                await self._enforce_retention()
+
+    async def wait_for_change(self, task_id: str, version: int, timeout: float) -> bool:
+        """长轮询：等待任务版本离开 version，最多 timeout 秒；返回是否已变化。"""
+        t = self._tasks.get(task_id)
+        if not t or t.version != version:
+            return True
+        ev = self._waiters.get(task_id)
+        if ev is None:
+            ev = self._waiters[task_id] = asyncio.Event()
+        try:
+            await asyncio.wait_for(ev.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def notify_changed(self, task_id: str) -> None:
+        """任务外部状态（如排队位置）变化：只递增版本并唤醒长轮询，不落库。"""
+        t = self._tasks.get(task_id)
+        if t:
+            self._touch(t)
 
     def request_stop(self, task_id: str) -> None:
         t = self._tasks.get(task_id)
@@ -101,16 +395,86 @@ class TaskManager:
         t = self._tasks.get(task_id)
         return t.stop_requested if t else True
 
-    def get_results(self, task_id: str, platform: Optional[str] = None) -> List[UnifiedPost]:
-        t = self._tasks.get(task_id)
+    def get_records(self, task_id: str, platform: Optional[str] = None) -> List[PostRecord]:
+        """内部读取（统计、分析）：返回紧凑记录，不做模型转换。"""
+        t = self._resident(task_id)
         if not t:
             return []
         if platform:
-            return [p for p in t.results if p.platform == platform]
+            return t.posts_for_platform(platform)
         return list(t.results)
 
+    def get_results(self, task_id: str, platform: Optional[str] = None) -> List[UnifiedPost]:
+        return [r.to_post() for r in self.get_records(task_id, platform)]
+
+    def result_count(self, task_id: str) -> int:
+        t = self._resident(task_id)
+        return len(t.results) if t else 0
+
+    def platform_result_count(self, task_id: str, platform: str) -> int:
+        t = self._resident(task_id)
+        return len(t.platform_index.get(platform, ())) if t else 0
+
+    def get_results_json(self, task_id: str, platform: Optional[str] = None) -> Optional[bytes]:
+        """全量结果的 JSON 数组，由缓存的 fragment 直接拼接。"""
+        t = self._resident(task_id)
+        if not t:
+            return None
+        return join_fragments(t.posts_for_platform(platform) if platform else t.results)
+
+    def _slice_since(
+        self, t: TaskState, since_seq: int, limit: int, platform: Optional[str]
+    ) -> Tuple[List[PostRecord], int, bool, int]:
+        total = len(t.results)
+        start = max(0, min(since_seq, total))
+        limit = max(1, limit)
+        if not platform:
+            picked = t.results[start:start + limit]
+            next_seq = start + len(picked)
+            return picked, next_seq, next_seq < total, total
+        offsets = t.platform_index.get(platform, [])
+        lo = bisect.bisect_left(offsets, start)
+        idxs = offsets[lo:lo + limit]
+        has_more = lo + limit < len(offsets)
+        # 未截断时游标直接推进到末尾，避免下次重复扫描其他平台的新增
+        next_seq = idxs[-1] + 1 if has_more else total
+        return [t.results[i] for i in idxs], next_seq, has_more, total
+
+    def get_results_since(
+        self,
+        task_id: str,
+        since_seq: int = 0,
+        limit: int = 500,
+        platform: Optional[str] = None,
+    ) -> Optional[dict]:
+        """
+        增量读取：返回追加序号 > since_seq 的帖子（seq 为 1 起的追加序号，即 results 下标 + 1）。
+        results 只追加不删除，切片代价与新增条数成正比；合并更新的帖子不会重复下发。
+        按平台过滤时在平台索引上二分定位，同样只与该平台新增条数成正比。
+        """
+        t = self._resident(task_id)
+        if not t:
+            return None
+        records, next_seq, has_more, total = self._slice_since(t, since_seq, limit, platform)
+        return {"items": [r.to_post() for r in records], "next_seq": next_seq, "has_more": has_more, "total": total}
+
+    def get_results_since_json(
+        self,
+        task_id: str,
+        since_seq: int = 0,
+        limit: int = 500,
+        platform: Optional[str] = None,
+    ) -> Optional[bytes]:
+        """同 get_results_since，但直接输出 SearchResultsPage 的 JSON（items 由 fragment 拼接）。"""
+        t = self._resident(task_id)
+        if not t:
+            return None
+        records, next_seq, has_more, total = self._slice_since(t, since_seq, limit, platform)
+        tail = json.dumps({"next_seq": next_seq, "has_more": has_more, "total": total})
+        return b'{"items":' + join_fragments(records) + b"," + tail[1:].encode("ascii")
+
     def get_status_response(self, task_id: str) -> Optional[dict]:
-        t = self._tasks.get(task_id)
+        t = self._resident(task_id)
         if not t:
             return None
         return {
@@ -122,18 +486,44 @@ class TaskManager:
             "message": t.message,
         }
 
-    def cache_comments(self, task_id: str, platform: str, post_id: str, comments: List[UnifiedComment]) -> None:
-        t = self._tasks.get(task_id)
-        if t:
-            key = f"{platform}_{post_id}"
-            t.comments_cache[key] = comments
+    async def cache_comments(self, task_id: str, platform: str, post_id: str, comments: List[UnifiedComment]) -> None:
+        if not await self.get_task(task_id):
+            return
+        async with self._lock:
+            t = self._tasks.get(task_id)
+            if t:
+                key = f"{platform}_{post_id}"
+                t.comments_cache[key] = comments
+                t.approx_bytes += sum(len(c.content) for c in comments) + 200 * len(comments)
+                await self._write(self._store.save_comments, task_id, platform, post_id, comments)
 
     def get_cached_comments(self, task_id: str, platform: str, post_id: str) -> Optional[List[UnifiedComment]]:
-        t = self._tasks.get(task_id)
+        t = self._resident(task_id)
         if not t:
             return None
         key = f"{platform}_{post_id}"
         return t.comments_cache.get(key)
 
+    def get_retention_stats(self) -> dict:
+        """保留策略状态：常驻任务数、近似字节数、各原因淘汰计数。"""
+        return {
+            "store": type(self._store).__name__,
+            "persistent": self._store.persistent,
+            "resident_tasks": len(self._tasks),
+            "running_tasks": sum(1 for t in self._tasks.values() if not t.finished),
+            "resident_bytes": sum(t.approx_bytes for t in self._tasks.values()),
+            "memory_budget_bytes": settings.TASK_MEMORY_BUDGET_MB * 1024 * 1024,
+            "max_finished_tasks": settings.TASK_HOT_CACHE_SIZE,
+            "max_age_sec": settings.TASK_MAX_AGE_SEC,
+            "evictions": dict(self._evictions),
+            "raw_store": raw_store.get_stats(),
+        }
+
+    def close(self) -> None:
+        if self._store.persistent:
+            # 任务已持久化：内存中的原始数据也写入磁盘，重启后 has_raw 的帖子仍可读取
+            raw_store.flush()
+        self._store.close()
+
 
 task_manager = TaskManager()
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""Pluggable storage backends for TaskManager: in-memory (default dict) or SQLite (WAL)."""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.schemas import UnifiedComment
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStore(ABC):
+    """
+    Storage interface. TaskManager keeps a hot cache of TaskState in memory and
+    writes through to the store; non-persistent stores simply do nothing.
+    """
+
+    persistent: bool = False
+
+    @abstractmethod
+    def save_task(self, meta: Dict[str, Any]) -> None:
+        """Insert or update task metadata (status, counters, message, timestamps)."""
+
+    @abstractmethod
+    def upsert_posts(self, task_id: str, rows: List[Tuple[int, str, str, str]]) -> None:
+        """Batch insert or replace (seq, platform, post_id, post_json) rows for a task."""
+
+    @abstractmethod
+    def save_comments(self, task_id: str, platform: str, post_id: str, comments: List[UnifiedComment]) -> None:
+        """Insert or replace cached comments for a post."""
+
+    @abstractmethod
+    def load_task(self, task_id: str) -> Optional[Tuple[Dict[str, Any], List[str], Dict[str, List[UnifiedComment]]]]:
+        """Return (meta, post JSON strings in seq order, comments_cache) or None if unknown."""
+
+    @abstractmethod
+    def save_search_params(self, task_id: str, params: Dict[str, Any]) -> None:
+        """Store the search request a task was started with (needed to resume it)."""
+
+    @abstractmethod
+    def save_checkpoint(self, task_id: str, platform: str, keyword: str, state: Dict[str, Any]) -> None:
+        """Insert or replace the crawl checkpoint of one platform × keyword."""
+
+    @abstractmethod
+    def load_resume_state(self, task_id: str) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Dict[str, Any]]]]:
+        """Return (search params, {platform: {keyword: checkpoint}}); empty when unknown."""
+
+    @abstractmethod
+    def delete_task(self, task_id: str) -> List[Tuple[str, str]]:
+        """Remove a task and all its rows; return the (platform, post_id) of its raw-payload posts no other task holds."""
+
+    @abstractmethod
+    def purge_finished_before(self, ts: float) -> Dict[str, List[Tuple[str, str]]]:
+        """Delete finished tasks last updated before ts; return {removed task id: its unshared raw-payload keys}."""
+
+    def close(self) -> None:
+        """Release connections and other resources."""
+
+
+class MemoryTaskStore(TaskStore):
+    """No-op store: TaskManager's in-memory dict is the only copy (lost on restart)."""
+
+    def save_task(self, meta: Dict[str, Any]) -> None:
+        pass
+
+    def upsert_posts(self, task_id: str, rows: List[Tuple[int, str, str, str]]) -> None:
+        pass
+
+    def save_comments(self, task_id: str, platform: str, post_id: str, comments: List[UnifiedComment]) -> None:
+        pass
+
+    def load_task(self, task_id: str) -> Optional[Tuple[Dict[str, Any], List[str], Dict[str, List[UnifiedComment]]]]:
+        return None
+
+    def save_search_params(self, task_id: str, params: Dict[str, Any]) -> None:
+        pass
+
+    def save_checkpoint(self, task_id: str, platform: str, keyword: str, state: Dict[str, Any]) -> None:
+        pass
+
+    def load_resume_state(self, task_id: str) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Dict[str, Any]]]]:
+        return {}, {}
+
+    def delete_task(self, task_id: str) -> List[Tuple[str, str]]:
+        return []
+
+    def purge_finished_before(self, ts: float) -> Dict[str, List[Tuple[str, str]]]:
+        return {}
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total_found INTEGER NOT NULL DEFAULT 0,
+    by_platform TEXT NOT NULL DEFAULT '{}',
+    progress INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks(updated_at);
+CREATE TABLE IF NOT EXISTS posts (
+    task_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    platform TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (task_id, seq)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_key ON posts(task_id, platform, post_id);
+CREATE INDEX IF NOT EXISTS idx_posts_post ON posts(platform, post_id);
+CREATE TABLE IF NOT EXISTS comments (
+    task_id TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (task_id, platform, post_id)
+);
+CREATE TABLE IF NOT EXISTS search_params (
+    task_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    task_id TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (task_id, platform, keyword)
+);
+"""
+
+
+class SqliteTaskStore(TaskStore):
+    """SQLite store in WAL mode: one connection guarded by a lock, batched inserts per append."""
+
+    persistent = True
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._mark_interrupted()
+
+    def _mark_interrupted(self) -> None:
+        """上次进程退出时仍在运行的任务无法继续，标记为 failed，避免前端一直轮询。"""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE tasks SET status='failed', message='interrupted (server restarted)', updated_at=? "
+                "WHERE status IN ('pending', 'running')",
+                (time.time(),),
+            )
+        if cur.rowcount:
+            logger.info("[TaskStore] marked %d interrupted task(s) as failed", cur.rowcount)
+
+    def save_task(self, meta: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO tasks (task_id, status, total_found, by_platform, progress, message, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(task_id) DO UPDATE SET status=excluded.status, total_found=excluded.total_found, "
+                "by_platform=excluded.by_platform, progress=excluded.progress, message=excluded.message, "
+                "updated_at=excluded.updated_at",
+                (
+                    meta["task_id"],
+                    meta["status"],
+                    meta.get("total_found", 0),
+                    json.dumps(meta.get("by_platform") or {}, ensure_ascii=False),
+                    meta.get("progress", 0),
+                    meta.get("message", ""),
+                    meta.get("created_at") or time.time(),
+                    meta.get("updated_at") or time.time(),
+                ),
+            )
+
+    def upsert_posts(self, task_id: str, rows: List[Tuple[int, str, str, str]]) -> None:
+        if not rows:
+            return
+        rows = [(task_id,) + tuple(r) for r in rows]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO posts (task_id, seq, platform, post_id, data) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def save_comments(self, task_id: str, platform: str, post_id: str, comments: List[UnifiedComment]) -> None:
+        data = json.dumps([c.model_dump() for c in comments], ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO comments (task_id, platform, post_id, data) VALUES (?, ?, ?, ?)",
+                (task_id, platform, post_id, data),
+            )
+
+    def load_task(self, task_id: str) -> Optional[Tuple[Dict[str, Any], List[str], Dict[str, List[UnifiedComment]]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT task_id, status, total_found, by_platform, progress, message, created_at, updated_at "
+                "FROM tasks WHERE task_id=?",
+                (task_id,),
+            ).fetchone()
+            if not row:
+                return None
+            post_rows = self._conn.execute(
+                "SELECT data FROM posts WHERE task_id=? ORDER BY seq", (task_id,)
+            ).fetchall()
+            post_bytes = sum(len(r[0]) for r in post_rows)
+            comment_rows = self._conn.execute(
+                "SELECT platform, post_id, data FROM comments WHERE task_id=?", (task_id,)
+            ).fetchall()
+        meta = {
+            "task_id": row[0],
+            "status": row[1],
+            "total_found": row[2],
+            "by_platform": json.loads(row[3] or "{}"),
+            "progress": row[4],
+            "message": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+            "approx_bytes": post_bytes + sum(len(r[2]) for r in comment_rows),
+        }
+        posts = [r[0] for r in post_rows]
+        comments = {
+            f"{platform}_{post_id}": [UnifiedComment.model_validate(c) for c in json.loads(data)]
+            for platform, post_id, data in comment_rows
+        }
+        return meta, posts, comments
+
+    def save_search_params(self, task_id: str, params: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_params (task_id, data) VALUES (?, ?)",
+                (task_id, json.dumps(params, ensure_ascii=False)),
+            )
+
+    def save_checkpoint(self, task_id: str, platform: str, keyword: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (task_id, platform, keyword, data) VALUES (?, ?, ?, ?)",
+                (task_id, platform, keyword, json.dumps(state, ensure_ascii=False)),
+            )
+
+    def load_resume_state(self, task_id: str) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Dict[str, Any]]]]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM search_params WHERE task_id=?", (task_id,)).fetchone()
+            cp_rows = self._conn.execute(
+                "SELECT platform, keyword, data FROM checkpoints WHERE task_id=?", (task_id,)
+            ).fetchall()
+        checkpoints: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for platform, keyword, data in cp_rows:
+            checkpoints.setdefault(platform, {})[keyword] = json.loads(data)
+        return (json.loads(row[0]) if row else {}), checkpoints
+
+    def delete_task(self, task_id: str) -> List[Tuple[str, str]]:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # 带原始数据的帖子（has_raw），删除后不再出现在任何任务中的即可释放其 blob
+                keys = self._conn.execute(
+                    "SELECT platform, post_id FROM posts WHERE task_id=? AND instr(data, '\"has_raw\":true') > 0",
+                    (task_id,),
+                ).fetchall()
+                for table in ("posts", "comments", "search_params", "checkpoints", "tasks"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE task_id=?", (task_id,))
+                unshared = [
+                    (platform, post_id)
+                    for platform, post_id in keys
+                    if self._conn.execute(
+                        "SELECT 1 FROM posts WHERE platform=? AND post_id=? LIMIT 1", (platform, post_id)
+                    ).fetchone() is None
+                ]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return unshared
+
+    def purge_finished_before(self, ts: float) -> Dict[str, List[Tuple[str, str]]]:
+        with self._lock:
+            ids = [
+                r[0]
+                for r in self._conn.execute(
+                    "SELECT task_id FROM tasks WHERE updated_at < ? AND status IN ('completed', 'failed', 'stopped')",
+                    (ts,),
+                ).fetchall()
+            ]
+        return {task_id: self.delete_task(task_id) for task_id in ids}
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception as e:
+                logger.debug("[TaskStore] close ignored: %s", e)
+
+
+def _default_store_path() -> str:
+    backend_dir = Path(__file__).resolve().parent.parent.parent
+    return str(backend_dir / "data" / "tasks.db")
+
+
+def create_task_store() -> TaskStore:
+    """Build the store selected by settings.TASK_STORE_BACKEND (memory | sqlite)."""
+    backend = settings.TASK_STORE_BACKEND
+    if backend == "sqlite":
+        path = settings.TASK_STORE_PATH or _default_store_path()
+        try:
+            store = SqliteTaskStore(path)
+            logger.info("[TaskStore] sqlite store at %s", path)
+            return store
+        except Exception as e:
+            logger.warning("[TaskStore] sqlite store unavailable (%s), falling back to memory", e)
+            return MemoryTaskStore()
+    if backend != "memory":
+        logger.warning("[TaskStore] unknown TASK_STORE_BACKEND=%s, using memory", backend)
+    return MemoryTaskStore()
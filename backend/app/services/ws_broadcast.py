@@ -3,9 +3,10 @@
 import asyncio
 import json
 import logging
-import queue
+import threading
+from collections import deque
 from datetime import datetime, timezone
-from typing import List, Set, Tuple
+from typing import Callable, Deque, Optional, Set, Tuple
 
 from fastapi import WebSocket
 
@@ -15,9 +16,23 @@ logger = logging.getLogger(__name__)
 _connections: Set[WebSocket] = set()
 _lock = asyncio.Lock()
 
-# 供爬虫线程写入的日志队列，主循环定时 drain 并 broadcast（线程安全）
-# 项为 (message, level, platform, replace_id|None)，replace_id 表示前端/控制台原地更新该行
-_log_queue: queue.Queue[Tuple[str, str, str | None, str | None]] = queue.Queue()
+# 日志项 (message, level, platform, replace_id|None)，replace_id 表示前端/控制台原地更新该行
+_LogItem = Tuple[str, str, str | None, str | None]
+
+# 爬虫线程经 loop.call_soon_threadsafe 把日志投递到主循环的 asyncio.Queue，由常驻 dispatcher 逐条 broadcast；
+# dispatcher 启动前的日志先缓存在 _early（有上限），启动时按序转入队列
+_bridge_lock = threading.Lock()
+_loop: asyncio.AbstractEventLoop | None = None
+_queue: asyncio.Queue | None = None
+_dispatcher: asyncio.Task | None = None
+_early: Deque[_LogItem] = deque(maxlen=1000)
+# 爬虫子进程中设置：日志改为经 IPC 发回主进程（见 app.services.crawler_process）
+_forwarder: Optional[Callable[[_LogItem], None]] = None
+
+
+def set_log_forwarder(forwarder: Optional[Callable[[_LogItem], None]]) -> None:
+    global _forwarder
+    _forwarder = forwarder
 
 
 def push_log_sync(
@@ -26,22 +41,56 @@ def push_log_sync(
     platform: str | None = None,
     replace_id: str | None = None,
 ) -> None:
-    """从任意线程调用，将一条日志放入队列。replace_id 非空时前端与控制台会原地更新该行。"""
+    """从任意线程调用，将一条日志交给主循环立即推送。replace_id 非空时前端与控制台会原地更新该行。"""
+    item = (message, level, platform, replace_id)
     try:
-        _log_queue.put_nowait((message, level, platform, replace_id))
+        if _forwarder is not None:
+            _forwarder(item)
+            return
+        with _bridge_lock:
+            if _loop is None:
+                _early.append(item)
+            else:
+                _loop.call_soon_threadsafe(_queue.put_nowait, item)
     except Exception:
+        # 主循环已关闭（进程退出中）：丢弃
         pass
 
 
-def drain_pending_logs() -> List[Tuple[str, str, str | None, str | None]]:
-    """主循环调用：取出当前队列中所有日志，返回 [(message, level, platform, replace_id), ...]。"""
-    out: List[Tuple[str, str, str | None, str | None]] = []
-    try:
-        while True:
-            out.append(_log_queue.get_nowait())
-    except queue.Empty:
-        pass
-    return out
+async def _dispatch(q: asyncio.Queue) -> None:
+    while True:
+        item = await q.get()
+        try:
+            await broadcast(*item)
+        except Exception as e:
+            logger.debug("ws log dispatch failed: %s", e)
+
+
+def ensure_log_dispatcher() -> None:
+    """在主循环中调用（应用启动、任务开始时）：幂等地启动日志 dispatcher 并绑定当前事件循环。"""
+    global _loop, _queue, _dispatcher
+    loop = asyncio.get_running_loop()
+    if _dispatcher is not None and not _dispatcher.done() and _loop is loop:
+        return
+    with _bridge_lock:
+        _queue = asyncio.Queue()
+        while _early:
+            _queue.put_nowait(_early.popleft())
+        _loop = loop
+        _dispatcher = loop.create_task(_dispatch(_queue))
+
+
+async def stop_log_dispatcher() -> None:
+    """应用关闭时调用：推送完已排队的日志后停止 dispatcher，之后的日志回到启动前缓存。"""
+    global _loop, _queue, _dispatcher
+    with _bridge_lock:
+        task, q = _dispatcher, _queue
+        _loop = _queue = _dispatcher = None
+    if task is None:
+        return
+    while q is not None and not q.empty():
+        await broadcast(*q.get_nowait())
+    task.cancel()
 
 
 async def register(websocket: WebSocket) -> None:
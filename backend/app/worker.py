@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""Standalone crawl worker: claims jobs from the shared job queue and streams results back (python -m app.worker)."""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+# 与 app.main 相同：从 backend/.env 读取配置（须在导入 app.config 之前）
+_env = Path(__file__).resolve().parent.parent / ".env"
+load_dotenv(_env)
+
+from app.config import settings
+from app.schemas import UnifiedPost
+from app.services.cancel_token import CancelToken
+from app.services.checkpoint import CrawlCheckpoint
+from app.services.job_queue import JobSource, create_job_source
+
+logger = logging.getLogger("app.worker")
+
+# 空闲时轮询队列的间隔（秒）
+_IDLE_POLL_SEC = 1.0
+
+
+class _JobSink:
+    """worker 内替代 ResultSink：每页原始数据与帖子作为作业事件写入队列，由 API 端按顺序消费。"""
+
+    def __init__(self, queue: JobSource, job_id: str, limit: int) -> None:
+        self._queue = queue
+        self._job_id = job_id
+        self._limit = limit
+        self.count = 0
+
+    def _push(self, posts: List[UnifiedPost]) -> None:
+        from app.services.raw_store import raw_store
+
+        # 原始数据先于帖子写入，API 端收到帖子时对应 blob 已落盘
+        for p in posts:
+            if p.platform_data.get("has_raw"):
+                blob = raw_store.pop_blob(p.platform, p.post_id)
+                if blob is not None:
+                    self._queue.push_event(self._job_id, "raw", json.dumps([p.platform, p.post_id]), blob)
+        self._queue.push_event(self._job_id, "posts", "[" + ",".join(p.model_dump_json() for p in posts) + "]")
+
+    async def publish(self, posts: List[UnifiedPost]) -> None:
+        from app.services.raw_store import raw_keys, raw_store
+
+        if self._limit > 0:
+            keep = max(0, self._limit - self.count)
+            # 超出条数上限被截掉的帖子不会发给 API 端，其原始数据随之丢弃（含已写入磁盘的）
+            for platform, post_id in raw_keys(posts[keep:]):
+                raw_store.pop_blob(platform, post_id)
+            posts = posts[:keep]
+        if not posts:
+            return
+        self.count += len(posts)
+        await asyncio.to_thread(self._push, posts)
+
+    async def checkpoint(self, keyword: str, state: Dict[str, Any]) -> None:
+        data = json.dumps([keyword, state], ensure_ascii=False)
+        await asyncio.to_thread(self._queue.push_event, self._job_id, "checkpoint", data)
+
+    def drain(self, timeout: float = 60.0) -> None:
+        """结果已在 publish 时写入队列，这里无需等待。"""
+
+
+def _heartbeat_loop(queue: JobSource, job_id: str, worker_id: str, lease_sec: float, stop: threading.Event, done: threading.Event) -> None:
+    """按租约 1/3 的间隔续租；作业被取消或被其他 worker 接管时置 stop，让爬虫协作收尾。"""
+    interval = max(1.0, lease_sec / 3)
+    while not done.wait(interval):
+        try:
+            if not queue.heartbeat(job_id, worker_id, lease_sec):
+                stop.set()
+                return
+        except Exception as e:
+            logger.warning("[Worker] heartbeat failed job=%s: %s", job_id[:8], e)
+
+
+def run_job(queue: JobSource, worker_id: str, job: Dict[str, Any], lease_sec: float) -> None:
+    """执行一个作业：运行平台适配器 run_search_sync（流式模式），结束后 complete。"""
+    from app.crawler.registry import get_crawler
+    from app.services.ws_broadcast import set_log_forwarder
+
+    job_id = job["job_id"]
+    params = job["params"]
+    platform = job["platform"]
+    logger.info("[Worker] job=%s task=%s platform=%s keywords=%s attempt=%s",
+                job_id[:8], job["task_id"][:8], platform, params.get("keywords"), job["attempts"])
+    stop = threading.Event()
+    done = threading.Event()
+    hb = threading.Thread(
+        target=_heartbeat_loop, args=(queue, job_id, worker_id, lease_sec, stop, done), name="job-heartbeat", daemon=True
+    )
+    hb.start()
+    set_log_forwarder(lambda item: queue.push_event(job_id, "log", json.dumps(list(item), ensure_ascii=False)))
+    token = CancelToken(deadline=time.monotonic() + float(params.get("timeout_sec") or 600), should_stop=stop.is_set)
+    sink = _JobSink(queue, job_id, int(params.get("max_count") or 0))
+    error = None
+    try:
+        crawler_cls = get_crawler(platform)
+        if crawler_cls is None or not hasattr(crawler_cls, "run_search_sync"):
+            raise RuntimeError("worker 不支持平台 %s" % platform)
+        crawler_cls.run_search_sync(
+            params["keywords"],
+            int(params.get("max_count") or 0),
+            bool(params.get("enable_comments")),
+            int(params.get("max_comments_per_note") or 0),
+            params.get("time_range") or "all",
+            params.get("content_types"),
+            sink=sink,
+            cancel_token=token,
+            checkpoint=CrawlCheckpoint(params.get("checkpoint"), on_save=sink.checkpoint),
+        )
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        logger.warning("[Worker] job=%s failed: %s", job_id[:8], error)
+    finally:
+        set_log_forwarder(None)
+        done.set()
+        hb.join(timeout=5)
+    try:
+        queue.complete(job_id, worker_id, error)
+    except Exception as e:
+        # 未能交回（如作业代理暂时不可达）：租约过期后作业会被重新领取
+        logger.warning("[Worker] complete failed job=%s: %s", job_id[:8], e)
+    logger.info("[Worker] job=%s finished count=%d", job_id[:8], sink.count)
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="GetSomeHints crawl worker")
+    parser.add_argument("--platforms", default="dy,xhs", help="逗号分隔的平台，如 dy,xhs")
+    parser.add_argument("--worker-id", default="", help="默认 主机名-pid-随机后缀")
+    parser.add_argument("--once", action="store_true", help="执行完一个作业后退出")
+    parser.add_argument("--broker", default="", help="API 地址（经作业代理访问队列），默认取 JOB_BROKER_URL；均为空时直接打开本机队列文件")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s %(message)s", stream=sys.stderr, force=True)
+    logging.getLogger("app").setLevel(logging.INFO)
+
+    platforms = [p.strip() for p in args.platforms.split(",") if p.strip()]
+    worker_id = args.worker_id or "%s-%d-%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:6])
+    lease_sec = float(max(5, settings.JOB_LEASE_SEC))
+    queue = create_job_source(args.broker)
+    logger.info("[Worker] %s started platforms=%s", worker_id, platforms)
+    from app.crawler.browser_watchdog import reap_orphans
+
+    reap_orphans()
+    try:
+        while True:
+            try:
+                job = queue.claim(worker_id, platforms, lease_sec)
+            except Exception as e:
+                logger.warning("[Worker] claim failed: %s", e)
+                job = None
+            if job is None:
+                time.sleep(_IDLE_POLL_SEC)
+                continue
+            run_job(queue, worker_id, job, lease_sec)
+            if args.once:
+                break
+    except KeyboardInterrupt:
+        # 正在执行的作业不 complete：租约过期后由其他 worker 重新领取
+        logger.info("[Worker] %s interrupted", worker_id)
+    finally:
+        from app.crawler.browser_pool import browser_pool
+
+        browser_pool.shutdown()
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,8 @@ import httpx
 from playwright.async_api import BrowserContext, Page
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_not_exception_type
 
-from app.xhs_crawler import config as xhs_config
+from app.crawler.account_pool import account_pool
+from app.xhs_crawler.config import XhsRunConfig
 from app.xhs_crawler.exception import DataFetchError, IPBlockError, NoteNotFoundError
 from app.xhs_crawler.extractor import XiaoHongShuExtractor
 from app.xhs_crawler.field import SearchNoteType, SearchSortType
@@ -31,7 +32,9 @@ class XiaoHongShuClient(ProxyRefreshMixin):
         playwright_page: Page,
         cookie_dict: Dict[str, str],
         proxy_ip_pool: Optional["ProxyIpPool"] = None,
+        run_config: Optional[XhsRunConfig] = None,
     ):
+        self.config = run_config or XhsRunConfig()
         self.proxy = proxy
         self.timeout = timeout
         self.headers = headers
@@ -41,6 +44,7 @@ class XiaoHongShuClient(ProxyRefreshMixin):
         self.IP_ERROR_CODE = 300012
         self.NOTE_NOT_FOUND_CODE = -510000
         self.NOTE_ABNORMAL_CODE = -510001
+        self.LOGIN_EXPIRED_CODE = -100
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
         self._extractor = XiaoHongShuExtractor()
@@ -85,6 +89,7 @@ class XiaoHongShuClient(ProxyRefreshMixin):
             verify_uuid = response.headers.get("Verifyuuid", "")
             msg = f"CAPTCHA appeared, request failed, Verifytype: {verify_type}, Verifyuuid: {verify_uuid}"
             logger.error(msg)
+            account_pool.report_block("xhs", self.config.account, "captcha %s" % response.status_code)
             raise Exception(msg)
         if return_response:
             return response.text
@@ -92,7 +97,10 @@ class XiaoHongShuClient(ProxyRefreshMixin):
         if data.get("success"):
             return data.get("data", data.get("success", {}))
         if data.get("code") == self.IP_ERROR_CODE:
+            account_pool.report_block("xhs", self.config.account, "ip blocked")
             raise IPBlockError(self.IP_ERROR_STR)
+        if data.get("code") == self.LOGIN_EXPIRED_CODE:
+            account_pool.report_block("xhs", self.config.account, "login expired")
         if data.get("code") in (self.NOTE_NOT_FOUND_CODE, self.NOTE_ABNORMAL_CODE):
             raise NoteNotFoundError(f"Note not found or abnormal, code: {data.get('code')}")
         err_msg = data.get("msg") or response.text
@@ -271,7 +279,7 @@ class XiaoHongShuClient(ProxyRefreshMixin):
         crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[Dict]:
-        if not xhs_config.ENABLE_GET_SUB_COMMENTS:
+        if not self.config.enable_get_sub_comments:
             return []
         result = []
         for comment in comments:
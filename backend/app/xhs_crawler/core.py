@@ -5,12 +5,14 @@ import logging
 import os
 import random
 import sys
-from typing import Dict, List, Optional
+import time
+from dataclasses import replace
+from typing import Dict, List, Optional, Set, Tuple
 
 from playwright.async_api import BrowserContext, BrowserType, Page, async_playwright
 from tenacity import RetryError
 
-from app.xhs_crawler import config as xhs_config
+from app.xhs_crawler.config import XhsRunConfig
 from app.xhs_crawler.client import XiaoHongShuClient
 from app.xhs_crawler.exception import DataFetchError, NoteNotFoundError
 from app.xhs_crawler.field import SearchNoteType, SearchSortType
@@ -18,6 +20,8 @@ from app.xhs_crawler.help import get_search_id, parse_creator_info_from_url, par
 from app.xhs_crawler.login import XiaoHongShuLogin
 from app.xhs_crawler.store import (
     batch_update_xhs_note_comments,
+    flush_page,
+    fork_collector,
     get_video_url_arr,
     update_xhs_note,
 )
@@ -25,10 +29,24 @@ from app.xhs_crawler.utils import convert_cookies, logger
 
 # 与 douyin_crawler 一致的抽象（仅接口）
 from app.douyin_crawler.base_crawler import AbstractCrawler
+from app.crawler.account_pool import Account, account_pool
+from app.crawler import browser_watchdog
+from app.crawler.anti_block import RateLimiter
+from app.crawler.browser_pool import BrowserLease, BrowserPool
+from app.crawler.page_filter import goto_wait_until, install_resource_filter, resource_filter_paused
+from app.crawler.session_health import session_health
+from app.services.cancel_token import CancelToken
+from app.services.checkpoint import CrawlCheckpoint
 
 _user_log = logging.getLogger("app.xhs_crawler")
+# 单个关键词连续多少页没有新笔记（全被其他关键词抓过或被过滤）即结束该关键词
+_MAX_STALE_PAGES = 3
 _last_was_progress = False
 REPLACE_ID_SEARCH_PROGRESS = "search_progress"
+# 未配置浏览器数据目录时使用 backend/browser_data（不依赖进程 cwd）
+_DEFAULT_BROWSER_DATA_BASE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "browser_data"
+)
 
 
 def _user_msg(msg: str, level: str = "info", platform: str = "小红书") -> None:
@@ -64,8 +82,30 @@ class XiaoHongShuCrawler(AbstractCrawler):
     browser_context: Optional[BrowserContext] = None
     ip_proxy_pool = None
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        run_config: Optional[XhsRunConfig] = None,
+        cancel_token: Optional[CancelToken] = None,
+        checkpoint: Optional[CrawlCheckpoint] = None,
+        browser_pool: Optional[BrowserPool] = None,
+    ) -> None:
         self.index_url = "https://www.xiaohongshu.com"
+        self.config = run_config or XhsRunConfig.from_env()
+        # 停止/超时检查点：每页搜索、每条详情、每页评论前
+        self.cancel_token = cancel_token or CancelToken()
+        # 断点续爬：每页交出后记录关键词进度，恢复时从断点页继续
+        self.checkpoint = checkpoint or CrawlCheckpoint()
+        # 多关键词并发时共享：已抓取的笔记 id（含断点中已处理的）、请求限速、详情/评论并发
+        self._seen_ids: Set[str] = self.checkpoint.processed_ids()
+        self._limiter = RateLimiter(self.config.max_sleep_sec)
+        self._detail_sem = asyncio.Semaphore(max(1, self.config.max_concurrency))
+        self._comment_sem = asyncio.Semaphore(max(1, self.config.max_concurrency))
+        # 传入 browser_pool 时从池中借用常驻上下文（须在池的事件循环中运行），close 时交还
+        self.browser_pool = browser_pool
+        self._lease: Optional[BrowserLease] = None
+        # 账号池分配的账号：start 时借用，close 时交还
+        self.account: Optional[Account] = None
+        self._account_acquired_at = 0.0
         self.user_agent = (
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
             "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
@@ -74,74 +114,150 @@ class XiaoHongShuCrawler(AbstractCrawler):
     async def start(self) -> None:
         playwright_proxy_format: Optional[Dict] = None
         httpx_proxy_format: Optional[str] = None
-        if xhs_config.ENABLE_IP_PROXY:
+        self._acquire_account()
+        config = self.config
+        if config.enable_ip_proxy:
             from app.proxy.proxy_ip_pool import create_ip_pool
             from app.douyin_crawler.utils import format_proxy_info
             self.ip_proxy_pool = await create_ip_pool(
-                ip_pool_count=xhs_config.IP_PROXY_POOL_COUNT,
+                ip_pool_count=config.ip_proxy_pool_count,
                 enable_validate_ip=True,
             )
             ip_info = await self.ip_proxy_pool.get_proxy()
             playwright_proxy_format, httpx_proxy_format = format_proxy_info(ip_info)
 
+        if self.browser_pool is not None:
+            # 复用浏览器池中常驻的上下文：省去启动浏览器、注入脚本与打开首页
+            self._lease = await self.browser_pool.acquire(config.profile_name, self.open_browser, self._profile_dir())
+            self.browser_context, self.context_page = self._lease.context, self._lease.page
+            logger.info("[XiaoHongShuCrawler] 复用浏览器池中的上下文")
+            await self._run(httpx_proxy_format)
+            return
+
         async with async_playwright() as playwright:
-            chromium = playwright.chromium
             _user_msg("正在启动浏览器")
-            self.browser_context = await self.launch_browser(
-                chromium,
-                playwright_proxy_format,
-                self.user_agent,
-                headless=xhs_config.HEADLESS,
+            self.browser_context, self.context_page = await self.open_browser(playwright, playwright_proxy_format)
+            await self._run(httpx_proxy_format)
+
+    async def open_browser(self, playwright, playwright_proxy: Optional[Dict] = None) -> Tuple[BrowserContext, Page]:
+        """启动浏览器上下文、注入 stealth 脚本并打开首页，返回 (context, page)；浏览器池新建上下文时同样调用。"""
+        browser_context = await self.launch_browser(
+            playwright.chromium,
+            playwright_proxy,
+            self.user_agent,
+            headless=self.config.headless,
+        )
+        try:
+            stealth_path = os.path.join(os.path.dirname(__file__), "libs", "stealth.min.js")
+            if os.path.isfile(stealth_path):
+                await browser_context.add_init_script(path=stealth_path)
+        except Exception:
+            pass
+        # 首页只用于 cookie、localStorage 与签名：不加载图片 / 媒体 / 字体 / 埋点
+        await install_resource_filter(browser_context)
+        page = await browser_context.new_page()
+        await page.goto(self.index_url, wait_until=goto_wait_until())
+        return browser_context, page
+
+    async def _run(self, httpx_proxy_format: Optional[str]) -> None:
+        config = self.config
+        self.xhs_client = await self.create_xhs_client(httpx_proxy_format)
+        if session_health.is_fresh(config.platform, await self.browser_context.cookies(), config.account):
+            logger.info("[XiaoHongShuCrawler] 登录态在缓存有效期内，跳过 pong")
+        elif await self.xhs_client.pong():
+            session_health.mark_verified(config.platform, await self.browser_context.cookies(), config.account)
+        else:
+            login_obj = XiaoHongShuLogin(
+                login_type=config.login_type,
+                browser_context=self.browser_context,
+                context_page=self.context_page,
+                login_phone="",
+                cookie_str=config.cookies,
             )
-            try:
-                stealth_path = os.path.join(os.path.dirname(__file__), "libs", "stealth.min.js")
-                if os.path.isfile(stealth_path):
-                    await self.browser_context.add_init_script(path=stealth_path)
-            except Exception:
-                pass
-            self.context_page = await self.browser_context.new_page()
-            await self.context_page.goto(self.index_url)
-
-            self.xhs_client = await self.create_xhs_client(httpx_proxy_format)
-            if not await self.xhs_client.pong():
-                login_obj = XiaoHongShuLogin(
-                    login_type=xhs_config.LOGIN_TYPE,
-                    browser_context=self.browser_context,
-                    context_page=self.context_page,
-                    login_phone="",
-                    cookie_str=xhs_config.COOKIES,
-                )
+            # 扫码 / 滑块验证需要图片，登录期间暂停资源拦截
+            async with resource_filter_paused(self.browser_context):
                 await login_obj.begin()
-                await self.xhs_client.update_cookies(self.browser_context)
+            await self.xhs_client.update_cookies(self.browser_context)
 
-            from app.xhs_crawler.var import crawler_type_var
-            crawler_type_var.set(xhs_config.CRAWLER_TYPE)
+        from app.xhs_crawler.var import crawler_type_var
+        crawler_type_var.set(config.crawler_type)
 
-            if xhs_config.CRAWLER_TYPE == "search":
-                await self.search()
-            # detail/creator 可后续按需扩展
+        if config.crawler_type == "search":
+            await self.search()
+        # detail/creator 可后续按需扩展
 
-            _user_msg("爬取流程结束")
+        _user_msg("爬取流程结束")
+
+    def _acquire_account(self) -> None:
+        """从账号池借用一个账号：切换到该账号的浏览器数据目录与 Cookie，请求再受账号级速率预算限制。"""
+        # 未启用浏览器池时每次爬取自行打开账号目录，同一目录不能被两个浏览器同时打开
+        self.account = account_pool.acquire(self.config.platform, exclusive=self.browser_pool is None)
+        self._account_acquired_at = time.time()
+        self.config = replace(
+            self.config,
+            account=self.account.name,
+            cookies=self.account.cookies if self.account.name else self.config.cookies,
+        )
+        self._limiter.parent = self.account.limiter
 
     async def close(self) -> None:
+        if self.account is not None:
+            account, self.account = self.account, None
+            account_pool.release(account, self._account_acquired_at)
+        if self._lease is not None:
+            # 池中的上下文不关闭；超时（请求可能卡住）时丢弃，下次借用重建
+            lease, self._lease = self._lease, None
+            self.browser_context = None
+            await self.browser_pool.release(lease, discard=self.cancel_token.expired)
+            logger.info("[XiaoHongShuCrawler.close] Browser context returned to pool")
+            return
+        close_failed = False
         if self.browser_context:
             try:
                 await self.browser_context.close()
             except Exception as e:
                 # 浏览器/context 可能已被用户关闭或提前退出，忽略关闭时的报错
                 logger.debug("[XiaoHongShuCrawler.close] close ignored: %s", e)
+                close_failed = True
             self.browser_context = None
+        profile_dir = self._profile_dir()
+        if (close_failed or self.cancel_token.expired) and profile_dir and browser_watchdog.available():
+            # 关闭失败或超时中断时，浏览器进程可能残留（驱动已退出），按数据目录清理
+            await asyncio.to_thread(browser_watchdog.kill_browser, profile_dir)
         logger.info("[XiaoHongShuCrawler.close] Browser context closed ...")
 
     async def search(self) -> None:
+        config = self.config
+        keywords_str = config.keywords.strip() or "热门"
+        keywords = list(dict.fromkeys(k.strip() for k in keywords_str.split(",") if k.strip())) or ["热门"]
+        # 多关键词并发：共用登录会话、去重集合与请求限速，每个关键词按配额 ceil(max_notes / 关键词数) 抓取
+        budget = -(-max(1, config.max_notes_count) // len(keywords))
+        keyword_sem = asyncio.Semaphore(max(1, config.keyword_concurrency))
+
+        async def run(keyword: str) -> None:
+            async with keyword_sem:
+                await self._search_keyword(keyword, budget)
+
+        _user_msg("开始搜索关键词: %s" % keywords_str)
+        tasks = [asyncio.ensure_future(run(k)) for k in keywords]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # 任一关键词异常（含停止）时取消其余关键词，避免在浏览器关闭后继续请求
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        _user_msg("搜索完成")
+
+    async def _search_keyword(self, keyword: str, budget: int) -> None:
         from app.xhs_crawler.var import source_keyword_var
 
-        keywords_str = os.environ.get("MC_KEYWORDS", "热门").strip() or "热门"
-        max_notes = max(1, int(os.environ.get("CRAWLER_MAX_NOTES_COUNT", "20")))
-        start_page = int(os.environ.get("MC_START_PAGE", "1"))
-        sort_type_str = os.environ.get("MC_SORT_TYPE", "general").strip() or "general"
+        config = self.config
+        start_page = config.start_page
+        sort_type_str = config.sort_type
         sort_type = SearchSortType(sort_type_str) if sort_type_str in [e.value for e in SearchSortType] else SearchSortType.GENERAL
-        note_type_str = getattr(xhs_config, "NOTE_TYPE", "all").strip().lower() or "all"
+        note_type_str = config.note_type.strip().lower() or "all"
         if note_type_str == "video":
             note_type = SearchNoteType.VIDEO
         elif note_type_str == "image":
@@ -149,17 +265,29 @@ class XiaoHongShuCrawler(AbstractCrawler):
         else:
             note_type = SearchNoteType.ALL
 
+        resume = self.checkpoint.get(keyword)
+        if resume.get("done"):
+            _user_msg("关键词「%s」上次已完成，跳过" % keyword)
+            return
         xhs_limit_count = 20
-        total_count = 0
-        _user_msg("开始搜索关键词: %s" % keywords_str)
-        for keyword in [k.strip() for k in keywords_str.split(",") if k.strip()]:
-            source_keyword_var.set(keyword)
+        total_count = len(resume.get("ids") or [])
+        fork_collector()
+        source_keyword_var.set(keyword)
+        page = int(resume.get("page") or start_page)
+        stale_pages = 0
+        search_id = resume.get("search_id") or get_search_id()
+        if resume:
+            _user_msg("从断点继续: 「%s」第 %s 页，已有 %d 条" % (keyword, page, total_count))
+        else:
             _user_msg("正在搜索: 「%s」" % keyword)
-            page = start_page
-            search_id = get_search_id()
-            while total_count < max_notes:
+        # 正常结束（配额满 / 无更多结果）时标记关键词完成；请求失败不标记，恢复时重试
+        finished = True
+        try:
+            while total_count < budget:
+                self.cancel_token.raise_if_cancelled()
+                await self._limiter.wait()
                 try:
-                    _user_msg("正在获取第 %s 页 …" % page)
+                    _user_msg("「%s」正在获取第 %s 页 …" % (keyword, page))
                     notes_res = await self.xhs_client.get_note_by_keyword(
                         keyword=keyword,
                         search_id=search_id,
@@ -169,29 +297,32 @@ class XiaoHongShuCrawler(AbstractCrawler):
                         note_type=note_type,
                     )
                     if not notes_res or not notes_res.get("has_more", False):
-                        _user_msg("没有更多结果")
+                        _user_msg("「%s」没有更多结果" % keyword)
                         break
+                    # 跨关键词去重：已被其他关键词抓到的笔记不再拉详情、不计入配额
                     items = [
                         post_item
                         for post_item in notes_res.get("items", [])
                         if post_item.get("model_type") not in ("rec_query", "hot_query")
+                        and post_item.get("id") not in self._seen_ids
                     ]
                     if not items:
                         page += 1
-                        await asyncio.sleep(xhs_config.CRAWLER_MAX_SLEEP_SEC)
+                        stale_pages += 1
+                        if stale_pages >= _MAX_STALE_PAGES:
+                            _user_msg("「%s」连续 %d 页无新结果" % (keyword, stale_pages))
+                            break
                         continue
-                    # 只处理到 max_notes 条，多出的不拉详情不拉评论
-                    need = max_notes - total_count
-                    if need <= 0:
-                        break
-                    items = items[:need]
-                    semaphore = asyncio.Semaphore(xhs_config.MAX_CONCURRENCY_NUM)
+                    stale_pages = 0
+                    # 只处理到配额条数，多出的不拉详情不拉评论
+                    items = items[:budget - total_count]
+                    self._seen_ids.update(post_item.get("id") for post_item in items)
                     task_list = [
                         self.get_note_detail_async_task(
                             note_id=post_item.get("id"),
                             xsec_source=post_item.get("xsec_source", ""),
                             xsec_token=post_item.get("xsec_token", ""),
-                            semaphore=semaphore,
+                            semaphore=self._detail_sem,
                         )
                         for post_item in items
                     ]
@@ -205,17 +336,21 @@ class XiaoHongShuCrawler(AbstractCrawler):
                             note_ids.append(note_detail.get("note_id", ""))
                             xsec_tokens.append(note_detail.get("xsec_token", ""))
                     total_count += len(note_ids)
-                    _user_progress("正在搜索第 %d 条" % total_count)
+                    _user_progress("正在搜索第 %d 条" % len(self._seen_ids))
                     _user_msg("本页获取 %s 条，关键词「%s」当前共 %s 条" % (len(note_ids), keyword, total_count))
                     await self.batch_get_note_comments(note_ids, xsec_tokens)
-                    if total_count >= max_notes:
-                        break
+                    await flush_page()
                     page += 1
-                    await asyncio.sleep(xhs_config.CRAWLER_MAX_SLEEP_SEC)
+                    await self.checkpoint.save(keyword, page, search_id, note_ids)
                 except DataFetchError as e:
                     logger.error("[XiaoHongShuCrawler.search] Get note detail error: %s", e)
+                    finished = False
                     break
-        _user_msg("搜索完成")
+        finally:
+            # 本关键词未交出的半页（停止/异常时）
+            await flush_page()
+        if finished:
+            await self.checkpoint.save(keyword, page, search_id, [], done=True)
 
     async def get_note_detail_async_task(
         self,
@@ -226,6 +361,8 @@ class XiaoHongShuCrawler(AbstractCrawler):
     ) -> Optional[Dict]:
         note_detail = None
         async with semaphore:
+            self.cancel_token.raise_if_cancelled()
+            await self._limiter.wait()
             try:
                 try:
                     note_detail = await self.xhs_client.get_note_by_id(note_id, xsec_source, xsec_token)
@@ -239,7 +376,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
                         raise Exception("Failed to get note detail, Id: %s" % note_id)
                 note_detail = dict(note_detail)
                 note_detail.update({"xsec_token": xsec_token, "xsec_source": xsec_source})
-                await asyncio.sleep(xhs_config.CRAWLER_MAX_SLEEP_SEC)
+                await asyncio.sleep(self.config.max_sleep_sec)
                 return note_detail
             except NoteNotFoundError:
                 logger.warning("[XiaoHongShuCrawler] Note not found: %s", note_id)
@@ -252,12 +389,11 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 return None
 
     async def batch_get_note_comments(self, note_list: List[str], xsec_tokens: List[str]) -> None:
-        if not xhs_config.ENABLE_GET_COMMENTS:
+        if not self.config.enable_get_comments:
             return
-        semaphore = asyncio.Semaphore(xhs_config.MAX_CONCURRENCY_NUM)
         task_list = [
             asyncio.create_task(
-                self.get_comments(note_id=note_id, xsec_token=xsec_tokens[i], semaphore=semaphore),
+                self.get_comments(note_id=note_id, xsec_token=xsec_tokens[i], semaphore=self._comment_sem),
                 name=note_id,
             )
             for i, note_id in enumerate(note_list)
@@ -266,14 +402,21 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
     async def get_comments(self, note_id: str, xsec_token: str, semaphore: asyncio.Semaphore) -> None:
         async with semaphore:
+            self.cancel_token.raise_if_cancelled()
+            await self._limiter.wait()
             await self.xhs_client.get_note_all_comments(
                 note_id=note_id,
                 xsec_token=xsec_token,
-                crawl_interval=float(xhs_config.CRAWLER_MAX_SLEEP_SEC),
-                callback=batch_update_xhs_note_comments,
-                max_count=xhs_config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                crawl_interval=float(self.config.max_sleep_sec),
+                callback=self._store_comments,
+                max_count=self.config.max_comments_per_note,
             )
-            await asyncio.sleep(xhs_config.CRAWLER_MAX_SLEEP_SEC)
+            await asyncio.sleep(self.config.max_sleep_sec)
+
+    async def _store_comments(self, note_id: str, comments: List[Dict]) -> None:
+        """评论分页回调：先保存本页，再检查停止，已拉到的评论不丢。"""
+        await batch_update_xhs_note_comments(note_id, comments)
+        self.cancel_token.raise_if_cancelled()
 
     async def create_xhs_client(self, httpx_proxy: Optional[str]) -> XiaoHongShuClient:
         cookie_str, cookie_dict = convert_cookies(await self.browser_context.cookies())
@@ -300,8 +443,15 @@ class XiaoHongShuCrawler(AbstractCrawler):
             playwright_page=self.context_page,
             cookie_dict=cookie_dict,
             proxy_ip_pool=self.ip_proxy_pool,
+            run_config=self.config,
         )
 
+    def _profile_dir(self) -> Optional[str]:
+        """当前账号的持久化浏览器数据目录；不保存登录态（非持久化上下文）时为 None。"""
+        if not self.config.save_login_state:
+            return None
+        return os.path.join(self.config.browser_data_base or _DEFAULT_BROWSER_DATA_BASE, self.config.profile_name)
+
     async def launch_browser(
         self,
         chromium: BrowserType,
@@ -309,12 +459,10 @@ class XiaoHongShuCrawler(AbstractCrawler):
         user_agent: Optional[str],
         headless: bool = True,
     ) -> BrowserContext:
-        if xhs_config.SAVE_LOGIN_STATE:
-            user_data_dir = os.path.join(
-                xhs_config.BROWSER_DATA_BASE, xhs_config.USER_DATA_DIR % xhs_config.PLATFORM
-            )
+        config = self.config
+        if config.save_login_state:
             return await chromium.launch_persistent_context(
-                user_data_dir=user_data_dir,
+                user_data_dir=self._profile_dir(),
                 accept_downloads=True,
                 headless=headless,
                 proxy=playwright_proxy,
@@ -328,7 +476,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         )
 
     async def get_notice_media(self, note_detail: Dict) -> None:
-        if not xhs_config.ENABLE_GET_MEIDAS:
+        if not self.config.enable_get_medias:
             return
         note_id = note_detail.get("note_id")
         image_list: List[Dict] = note_detail.get("image_list", [])
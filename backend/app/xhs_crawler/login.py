@@ -8,7 +8,6 @@ from typing import Optional
 from playwright.async_api import BrowserContext, Page
 from tenacity import RetryError, retry, retry_if_result, stop_after_attempt, wait_fixed
 
-from app.xhs_crawler import config as xhs_config
 from app.xhs_crawler.utils import convert_cookies, convert_str_cookie_to_dict, logger, show_qrcode, find_login_qrcode
 
 # 手机验证码缓存：外部可写入 xhs_crawler.login.sms_code_cache[phone] = code
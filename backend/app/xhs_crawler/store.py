@@ -1,22 +1,55 @@
 # -*- coding: utf-8 -*-
 """小红书内存收集器：不写 DB，只收集到列表供上层使用。"""
-from typing import Dict, List
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
-_collector_notes: List[Dict] = []
-_collector_comments: List[tuple] = []
+# 收集列表绑定在运行上下文（线程 / 事件循环任务）上，并行的多次爬取各自收集、互不串扰
+# on_page 非空时为流式模式：每页结束由 flush_page 交出本页数据并清空列表
+PageCallback = Callable[[List[Dict], List[tuple]], Awaitable[None]]
+_collector_var: ContextVar[Optional[Tuple[List[Dict], List[tuple], Optional[PageCallback]]]] = ContextVar(
+    "xhs_collector", default=None
+)
 
 
-def set_collector(notes: List[Dict], comments: List[tuple]) -> None:
-    global _collector_notes, _collector_comments
-    _collector_notes, _collector_comments = notes, comments
+def set_collector(notes: List[Dict], comments: List[tuple], on_page: Optional[PageCallback] = None) -> None:
+    _collector_var.set((notes, comments, on_page))
+
+
+def _collector() -> Tuple[List[Dict], List[tuple], Optional[PageCallback]]:
+    bound = _collector_var.get()
+    if bound is None:
+        bound = ([], [], None)
+        _collector_var.set(bound)
+    return bound
+
+
+def fork_collector() -> None:
+    """
+    并发子任务（如多关键词）开始时在该任务内调用：流式模式下改用本任务独立的页缓冲，
+    flush_page 只交出本任务这一页的帖子与评论；非流式模式仍共用整体收集列表。
+    """
+    notes, comments, on_page = _collector()
+    if on_page is not None:
+        _collector_var.set(([], [], on_page))
+
+
+async def flush_page() -> None:
+    """爬虫每处理完一页（详情 + 评论）后调用；流式模式下把本页数据交给 on_page，收集列表只保留当前页。"""
+    notes, comments, on_page = _collector()
+    if on_page is None or not (notes or comments):
+        return
+    page_notes, page_comments = list(notes), list(comments)
+    notes.clear()
+    comments.clear()
+    await on_page(page_notes, page_comments)
 
 
 async def update_xhs_note(note_item: Dict) -> None:
-    _collector_notes.append(note_item)
+    _collector()[0].append(note_item)
 
 
 async def update_xhs_note_comment(note_id: str, comment_item: Dict) -> None:
-    _collector_comments.append((note_id, comment_item))
+    _collector()[1].append((note_id, comment_item))
 
 
 async def batch_update_xhs_note_comments(note_id: str, comments: List[Dict]) -> None:
@@ -131,14 +131,14 @@ export const HomePage: React.FC = () => {
         byPlatform: response.by_platform as Record<Platform, number>,
       });
 
-      // 开始轮询状态和结果（更频繁地获取结果以实现实时显示）
-      let lastResultCount = 0;
+      // 开始轮询状态和结果（增量游标：每次只取新追加的帖子）
+      let resultCursor = 0;
       const interval = setInterval(async () => {
         try {
-          // 并行获取状态和结果
-          const [statusResponse, resultsResponse] = await Promise.all([
+          // 并行获取状态和增量结果
+          const [statusResponse, resultsPage] = await Promise.all([
             searchApi.getSearchStatus(response.task_id),
-            searchApi.getSearchResults(response.task_id).catch(() => []), // 如果失败返回空数组
+            searchApi.getSearchResultsSince(response.task_id, resultCursor).catch(() => null), // 失败时本轮不更新
           ]);
 
           // 更新状态和进度
@@ -153,15 +153,12 @@ export const HomePage: React.FC = () => {
             byPlatform: statusResponse.by_platform as Record<Platform, number>,
           });
 
-          // 实时更新结果（setResults 会自动去重和保留已有结果）
-          if (resultsResponse && Array.isArray(resultsResponse)) {
-            // 只在结果数量变化时更新，避免不必要的更新导致循环
-            if (resultsResponse.length > 0 && resultsResponse.length !== lastResultCount) {
-              setResults(resultsResponse);
-              lastResultCount = resultsResponse.length;
+          // 实时更新结果（setResults 会自动去重并保留已有结果，故只需传入新增部分）
+          if (resultsPage && Array.isArray(resultsPage.items)) {
+            if (resultsPage.items.length > 0) {
+              setResults(resultsPage.items);
             }
-            // 注意：即使 resultsResponse.length === 0，也不清空已有结果
-            // 因为可能是轮询时的临时状态
+            resultCursor = resultsPage.next_seq;
           }
 
           if (statusResponse.status === 'completed' || statusResponse.status === 'failed') {
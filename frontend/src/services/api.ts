@@ -3,7 +3,7 @@
  */
 import axios from 'axios';
 import { API_BASE_URL } from '../utils/constants';
-import type { SearchRequest, SearchResponse, UnifiedPost, UnifiedComment, AnalysisStats, LlmLeadsResult, LlmScenario } from '../types';
+import type { SearchRequest, SearchResponse, SearchResultsPage, UnifiedPost, UnifiedComment, AnalysisStats, LlmLeadsResult, LlmScenario } from '../types';
 
 const api = axios.create({
   baseURL: API_BASE_URL,
@@ -24,6 +24,30 @@ api.interceptors.response.use(
   }
 );
 
+// 条件请求缓存：每个接口路径只保留最近一次 { 参数, ETag, 数据 }，后端返回 304 时复用上次数据
+const etagCache = new Map<string, { params: string; etag: string; data: unknown }>();
+
+const getWithETag = async <T>(url: string, params?: Record<string, unknown>): Promise<T> => {
+  const paramsKey = JSON.stringify(params ?? {});
+  const cached = etagCache.get(url);
+  const hit = cached && cached.params === paramsKey ? cached : undefined;
+  const res = await axios.get(url, {
+    baseURL: API_BASE_URL,
+    timeout: 30000,
+    params,
+    headers: hit ? { 'If-None-Match': hit.etag } : undefined,
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+  if (res.status === 304 && hit) {
+    return hit.data as T;
+  }
+  const etag = res.headers['etag'];
+  if (etag) {
+    etagCache.set(url, { params: paramsKey, etag, data: res.data });
+  }
+  return res.data as T;
+};
+
 export const searchApi = {
   /**
    * 启动搜索
@@ -36,7 +60,7 @@ export const searchApi = {
    * 获取搜索状态
    */
   getSearchStatus: async (taskId: string): Promise<SearchResponse> => {
-    return api.get(`/api/search/status/${taskId}`);
+    return getWithETag<SearchResponse>(`/api/search/status/${taskId}`);
   },
 
   /**
@@ -47,6 +71,16 @@ export const searchApi = {
     return api.get(`/api/search/results/${taskId}`, { params });
   },
 
+  /**
+   * 增量获取搜索结果：只返回 sinceSeq 之后新追加的帖子，下次轮询传入返回的 next_seq
+   */
+  getSearchResultsSince: async (taskId: string, sinceSeq: number, limit?: number): Promise<SearchResultsPage> => {
+    const params: Record<string, number> = { since_seq: sinceSeq };
+    if (limit) params.limit = limit;
+    // 无新增时后端返回 304，直接复用上次的（空）页
+    return getWithETag<SearchResultsPage>(`/api/search/results/${taskId}`, params);
+  },
+
   /**
    * 停止搜索
    */
@@ -54,6 +88,13 @@ export const searchApi = {
     return api.post(`/api/search/stop/${taskId}`);
   },
 
+  /**
+   * 从断点继续已停止/失败的搜索（结果追加到同一任务）
+   */
+  resumeSearch: async (taskId: string): Promise<SearchResponse> => {
+    return api.post(`/api/search/resume/${taskId}`);
+  },
+
   /**
    * 获取帖子评论
    */
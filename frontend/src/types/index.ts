@@ -62,6 +62,7 @@ export interface SearchRequest {
   sort_type?: string;
   time_range?: 'all' | '1day' | '1week' | '1month' | '3months' | '6months';
   content_types?: ('video' | 'image_text' | 'link')[];
+  priority?: number;
 }
 
 export interface SearchResponse {
@@ -71,6 +72,14 @@ export interface SearchResponse {
   by_platform: Record<Platform, number>;
   progress?: number;
   message: string;
+  queue_position?: number | null;
+}
+
+export interface SearchResultsPage {
+  items: UnifiedPost[];
+  next_seq: number;
+  has_more: boolean;
+  total: number;
 }
 
 export interface AnalysisStats {
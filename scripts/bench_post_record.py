@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""对比任务内部存储的两种帖子表示：pydantic UnifiedPost 与紧凑的 PostRecord（__slots__）。
+
+输出每 N 条帖子的内存占用（tracemalloc）与一次统计聚合（总评论、作者数、按平台均赞、点赞分段）的耗时。
+
+使用方式（在项目根目录执行）：
+  python scripts/bench_post_record.py
+  python scripts/bench_post_record.py --count 100000 --rounds 5
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.schemas import UnifiedAuthor, UnifiedPost  # noqa: E402
+from app.services.post_record import PostRecord  # noqa: E402
+
+
+def make_posts(count: int) -> list[UnifiedPost]:
+    platforms = ("dy", "xhs")
+    return [
+        UnifiedPost(
+            platform=platforms[i % 2],
+            post_id=f"{7300000000000000000 + i}",
+            title=f"标题 {i}",
+            content=f"正文内容 {i} " * 4,
+            author=UnifiedAuthor(
+                author_id=f"u{i % 5000}",
+                author_name=f"作者{i % 5000}",
+                platform=platforms[i % 2],
+                author_avatar=f"https://p3.example.com/avatar/{i % 5000}.jpeg",
+            ),
+            publish_time=str(1700000000 + i),
+            like_count=(i * 37) % 20000,
+            comment_count=(i * 13) % 2000,
+            share_count=i % 50,
+            url=f"https://www.douyin.com/video/{7300000000000000000 + i}",
+            image_urls=[f"https://p3.example.com/img/{i}.webp"],
+            platform_data={"has_raw": True},
+        )
+        for i in range(count)
+    ]
+
+
+def measure(build) -> tuple[list, int]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return items, after - before
+
+
+def aggregate(items, author_id) -> dict:
+    """与 /api/analysis/stats 相同的几次遍历。"""
+    total_comments = sum(p.comment_count for p in items)
+    authors = {(author_id(p), p.platform) for p in items}
+    likes: Counter = Counter()
+    counts: Counter = Counter()
+    buckets = Counter()
+    for p in items:
+        likes[p.platform] += p.like_count
+        counts[p.platform] += 1
+        lc = p.like_count
+        buckets["0-100" if lc <= 100 else "101-1k" if lc <= 1000 else "1k-10k" if lc <= 10000 else "10k+"] += 1
+    return {
+        "total_comments": total_comments,
+        "authors": len(authors),
+        "avg_likes": {k: likes[k] / counts[k] for k in counts},
+        "buckets": dict(buckets),
+    }
+
+
+def time_it(fn, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="UnifiedPost vs PostRecord 内存与聚合耗时")
+    parser.add_argument("--count", type=int, default=100_000, help="帖子条数（默认 100000）")
+    parser.add_argument("--rounds", type=int, default=3, help="聚合计时轮数，取最优")
+    args = parser.parse_args()
+
+    # 两种表示各自独立构建、分别计内存（PostRecord 构建完后中间的 UnifiedPost 即释放）
+    posts, post_bytes = measure(lambda: make_posts(args.count))
+    records, record_bytes = measure(lambda: [PostRecord.from_post(p) for p in make_posts(args.count)])
+
+    assert aggregate(posts, lambda p: p.author.author_id) == aggregate(records, lambda p: p.author_id)
+    t_post = time_it(lambda: aggregate(posts, lambda p: p.author.author_id), args.rounds)
+    t_record = time_it(lambda: aggregate(records, lambda p: p.author_id), args.rounds)
+    t_edge = time_it(lambda: [r.to_post() for r in records[:5000]], args.rounds)
+
+    mb = 1024 * 1024
+    print(f"posts: {args.count}")
+    print(f"UnifiedPost  memory: {post_bytes / mb:8.1f} MB  ({post_bytes / args.count:6.0f} B/post)  aggregate: {t_post * 1000:7.1f} ms")
+    print(f"PostRecord   memory: {record_bytes / mb:8.1f} MB  ({record_bytes / args.count:6.0f} B/post)  aggregate: {t_record * 1000:7.1f} ms")
+    print(f"to_post() at API edge for 5000 records: {t_edge * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()